@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark suite of the hot paths.
+
+The ``bench_*.py`` modules follow the asv conventions (classes with `params`,
+`setup()`, ``time_*`` and ``peakmem_*`` methods), so they can be run with asv
+or offline with :code:`python -m benchmarks.run`.
+"""
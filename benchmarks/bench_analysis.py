@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+from microtex.analysis import Domain_Analyser_2D, FFT_Analyser_2D
+from microtex.modeling.cahn_hilliard import Configuration
+
+
+class FFTAnalyser:
+    """
+    Power spectrum of one frame.
+    """
+
+    params = [[128, 512, 1024]]
+    param_names = ["size"]
+
+    def setup(self, size):
+        config = Configuration(nx=size, ny=size)
+        self.field = config.noisy_field()
+        self.analyser = FFT_Analyser_2D(config)
+
+    def time_analyze_domain(self, size):
+        self.analyser.analyze_domain(self.field)
+
+    def peakmem_analyze_domain(self, size):
+        self.analyser.analyze_domain(self.field)
+
+
+class DomainAnalyser:
+    """
+    Energy of one frame.
+    """
+
+    params = [[128, 512, 1024]]
+    param_names = ["size"]
+
+    def setup(self, size):
+        config = Configuration(nx=size, ny=size)
+        self.field = config.noisy_field()
+        self.analyser = Domain_Analyser_2D(config)
+
+    def time_calculate_energy(self, size):
+        self.analyser.calculate_energy(self.field)
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+
+from microtex.modeling.ising_lattice._model import Ising_Lattice_2D_AB_Model
+
+
+class IsingSweep:
+    """
+    One Monte Carlo sweep (N * N trial moves).
+    """
+
+    params = [[16, 32, 64], ["glauber", "kawasaki"]]
+    param_names = ["size", "kinetics"]
+
+    def setup(self, size, kinetics):
+        self.model = Ising_Lattice_2D_AB_Model(
+            size, 2.0, kinetics, temp_point=1, temp_range=(1.0, 4.0), equistep=0, calcstep=1
+        )
+
+    def time_sweep(self, size, kinetics):
+        getattr(self.model, kinetics)()
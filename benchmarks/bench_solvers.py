@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+
+from microtex.modeling.cahn_hilliard import Cahn_Hilliard_2D_AB_Solver, Configuration
+
+
+class CahnHilliardSolver:
+    """
+    One explicit time step (the inverse is steps per second).
+    """
+
+    params = [[128, 256, 512, 1024, 2048], ["float64", "float32"]]
+    param_names = ["size", "precision"]
+
+    def setup(self, size, precision):
+        self.config = Configuration(nx=size, ny=size, precision=precision)
+        self.field = self.config.noisy_field()
+
+    def time_step(self, size, precision):
+        Cahn_Hilliard_2D_AB_Solver(self.field, self.config)
+
+    def peakmem_step(self, size, precision):
+        Cahn_Hilliard_2D_AB_Solver(self.field, self.config)
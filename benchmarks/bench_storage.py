@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+
+import numpy as np
+
+from microtex.modeling.cahn_hilliard import Configuration
+from microtex.storage import HDF5Reader, HDF5Writer
+
+
+class HDF5WriterAppend:
+    """
+    Append one frame to the store.
+    """
+
+    params = [[256, 1024]]
+    param_names = ["size"]
+
+    def setup(self, size):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        config = Configuration(nx=size, ny=size)
+        self.field = config.noisy_field()
+        self.writer = HDF5Writer(os.path.join(self.tmpdir.name, "store.h5"), self.field, config)
+
+    def teardown(self, size):
+        self.tmpdir.cleanup()
+
+    def time_append(self, size):
+        self.writer.append(self.field)
+
+
+class HDF5ReaderRandomAccess:
+    """
+    Read a random frame from a store of 32 frames.
+    """
+
+    params = [[256, 1024]]
+    param_names = ["size"]
+    frames = 32
+
+    def setup(self, size):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        config = Configuration(nx=size, ny=size)
+        filename = os.path.join(self.tmpdir.name, "store.h5")
+        writer = HDF5Writer(filename, config.noisy_field(), config)
+        for n in range(1, self.frames):
+            writer.append(config.noisy_field(), timestep=n)
+        self.reader = HDF5Reader(filename)
+        self.rng = np.random.default_rng(0)
+
+    def teardown(self, size):
+        self.tmpdir.cleanup()
+
+    def time_get_field(self, size):
+        self.reader.get_field(int(self.rng.integers(self.frames)))
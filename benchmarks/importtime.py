@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+"""
+Import-time budget of the core packages measured with ``python -X importtime``.
+
+Numpy is needed by everything, so the budget applies to the import time of
+the package minus the time spent importing numpy. Numpy is imported first, so
+the standard modules it imports are not counted to the package whichever
+imports them first. The heavy optional
+dependencies must not be imported at all.
+
+Usage:
+    python benchmarks/importtime.py                      # check the default budgets
+    python benchmarks/importtime.py --budget 30 --repeat 10 microtex.modeling
+    python benchmarks/importtime.py --relative 0.3             # at most 30 % of the numpy import time
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+DEFAULT_MODULES = ["microtex.modeling", "microtex.modeling.cahn_hilliard", "microtex.storage", "microtex.analysis"]
+FORBIDDEN = ["h5py", "scipy", "matplotlib", "mpl_toolkits", "IPython", "tqdm", "numba"]
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)")
+
+
+def measure(module):
+    """
+    Import the module in a fresh interpreter.
+
+    :return: The cumulative import time of the module and of numpy [ms] and the imported modules.
+    """
+    code = f"import sys, numpy, {module}; print(' '.join(sys.modules))"
+    # the first import writes the bytecode, the repeated imports load it
+    env = {k: v for k, v in os.environ.items() if k != "PYTHONDONTWRITEBYTECODE"}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True, env=env
+    )
+    total = numpy = 0.0
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            cumulative, name = int(match.group(2)) / 1e3, match.group(4)
+            if name == module:
+                total = cumulative
+            elif name == "numpy":
+                numpy = cumulative
+    return numpy + total, numpy, set(proc.stdout.split())
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--budget", type=float, default=50.0, help="Budget without numpy [ms].")
+    parser.add_argument(
+        "--relative", type=float, help="Budget as a fraction of the numpy import time, robust to the machine load."
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="The best of repeated imports is used.")
+    options = parser.parse_args(args)
+
+    failed = False
+    print(f"{'module':<36} {'total [ms]':>10} {'numpy [ms]':>10} {'own [ms]':>9} {'budget':>7}")
+    for module in options.modules:
+        runs = [measure(module) for _ in range(options.repeat)]
+        total, numpy, imported = min(runs, key=lambda run: run[0] - run[1])
+        own = total - numpy
+        budget = options.budget if options.relative is None else options.relative * numpy
+        heavy = sorted(name for name in FORBIDDEN if name in imported)
+        ok = own <= budget and not heavy
+        failed |= not ok
+        print(
+            f"{module:<36} {total:>10.1f} {numpy:>10.1f} {own:>9.1f} {budget:>7.0f}"
+            f" {'ok' if ok else 'FAILED'} {' '.join(heavy)}"
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
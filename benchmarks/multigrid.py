@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+"""
+Convergence and timing report of the multigrid solver for implicit Cahn-Hilliard steps.
+
+The cost per cycle should grow linearly with the number of grid points and the
+convergence factor should not depend on the grid size.
+
+Usage:
+    python benchmarks/multigrid.py --sizes 128 256 512 1024 --dt 6000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from microtex.modeling.cahn_hilliard import Configuration
+from microtex.modeling.cahn_hilliard._implicit import Cahn_Hilliard_2D_AB_Implicit_Solver
+from microtex.modeling.cahn_hilliard._solver import _rate
+from microtex.numerics.multigrid import Biharmonic_Multigrid_2D
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[128, 256, 512])
+    parser.add_argument("--dt", type=float, default=6000.0)
+    parser.add_argument("--cycle", choices=["V", "FAS"], default="V")
+    parser.add_argument("--tol", type=float, default=1e-8)
+    options = parser.parse_args(args)
+
+    print(f"{'size':>6} {'cycles':>7} {'factor':>7} {'ms/cycle':>9} {'ns/point/cycle':>15} {'solve [s]':>10}")
+    for n in options.sizes:
+        config = Configuration(nx=n, ny=n, dt=options.dt)
+        a, b = Cahn_Hilliard_2D_AB_Implicit_Solver().coefficients(config)
+        mg = Biharmonic_Multigrid_2D.from_configuration(config, a, b, cycle=options.cycle)
+        rhs = config.dt * _rate(config.noisy_field(), config)
+        start = time.perf_counter()
+        _, report = mg.solve(rhs, tol=options.tol)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{n:>6} {report.iterations:>7} {report.convergence_factor:>7.3f} "
+            f"{report.time_per_cycle * 1e3:>9.2f} {report.time_per_cycle / n / n * 1e9:>15.1f} {elapsed:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+"""
+Offline runner of the benchmark suite with baseline comparison.
+
+Every ``time_*`` method is timed (median of repeated samples, each sample runs
+the method enough times to take at least `--min-time`), every ``peakmem_*``
+method reports the peak of traced memory allocations during one call.
+
+Usage:
+    python -m benchmarks.run --quick                        # smallest parameters only
+    python -m benchmarks.run --output results.json          # save the results
+    python -m benchmarks.run --save-baseline                # store benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --threshold 0.25
+
+The exit status is 1 if a benchmark is slower (or uses more memory) than the
+baseline by more than the threshold.
+"""
+
+import argparse
+import gc
+import importlib
+import inspect
+import itertools
+import json
+import platform
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+HERE = Path(__file__).parent
+DEFAULT_BASELINE = HERE / "baseline.json"
+
+
+def discover(pattern=None):
+    """
+    Yield ``(name, class)`` of the benchmark classes in ``bench_*.py`` modules.
+    """
+    for path in sorted(HERE.glob("bench_*.py")):
+        module = importlib.import_module(f"benchmarks.{path.stem}")
+        for _, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ != module.__name__:
+                continue
+            for attr in sorted(dir(cls)):
+                if attr.startswith(("time_", "peakmem_")):
+                    name = f"{path.stem}.{cls.__name__}.{attr}"
+                    if pattern is None or re.search(pattern, name):
+                        yield name, cls, attr
+
+
+def combinations(cls, quick):
+    params = getattr(cls, "params", [])
+    if params and not isinstance(params[0], (list, tuple)):
+        params = [params]
+    if quick:
+        params = [p[:1] for p in params]
+    return list(itertools.product(*params)) or [()]
+
+
+def measure_time(method, args, repeat, min_time):
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            method(*args)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(min_time / elapsed) + 1)
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            method(*args)
+        samples.append((time.perf_counter() - start) / number)
+    return {"value": statistics.median(samples), "min": min(samples), "number": number, "unit": "s"}
+
+
+def measure_peakmem(method, args):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        method(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"value": peak, "unit": "bytes"}
+
+
+def run(pattern=None, quick=False, repeat=5, min_time=0.05, verbose=True):
+    results = {}
+    for name, cls, attr in discover(pattern):
+        for args in combinations(cls, quick):
+            key = f"{name}({', '.join(map(str, args))})"
+            bench = cls()
+            if hasattr(bench, "setup"):
+                bench.setup(*args)
+            try:
+                method = getattr(bench, attr)
+                if attr.startswith("time_"):
+                    results[key] = measure_time(method, args, repeat, min_time)
+                else:
+                    results[key] = measure_peakmem(method, args)
+            finally:
+                if hasattr(bench, "teardown"):
+                    bench.teardown(*args)
+            if verbose:
+                print(f"{key:<70} {format_value(results[key])}", flush=True)
+    return results
+
+
+def format_value(result):
+    if result["unit"] == "s":
+        return f"{result['value'] * 1e3:>12.3f} ms"
+    return f"{result['value'] / 2**20:>12.2f} MiB"
+
+
+def compare(results, baseline, threshold):
+    """
+    :return: The list of ``(key, ratio)`` of benchmarks which regressed.
+    """
+    regressions = []
+    for key, result in results.items():
+        if key in baseline and baseline[key]["value"] > 0:
+            ratio = result["value"] / baseline[key]["value"]
+            if ratio > 1.0 + threshold:
+                regressions.append((key, ratio))
+    return regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-k", "--filter", help="Run only benchmarks matching the regular expression.")
+    parser.add_argument("--quick", action="store_true", help="Run only the first parameter values.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05)
+    parser.add_argument("-o", "--output", help="Save the results to the JSON file.")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the baseline.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative slowdown.")
+    options = parser.parse_args(args)
+
+    results = run(options.filter, options.quick, options.repeat, options.min_time)
+    document = {
+        "created": datetime.now().isoformat(),
+        "machine": platform.node(),
+        "python": platform.python_version(),
+        "results": results,
+    }
+    if options.output:
+        Path(options.output).write_text(json.dumps(document, indent=2))
+    if options.save_baseline:
+        Path(options.baseline).write_text(json.dumps(document, indent=2))
+        return 0
+
+    baseline = Path(options.baseline)
+    if not baseline.exists():
+        print(f"No baseline {baseline}, store one with --save-baseline.")
+        return 0
+    regressions = compare(results, json.loads(baseline.read_text())["results"], options.threshold)
+    for key, ratio in regressions:
+        print(f"REGRESSION {key}: {ratio:.2f}x the baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+"""
+Strong and weak scaling benchmark of the distributed Cahn-Hilliard runner.
+
+Strong scaling keeps the global grid fixed and adds ranks, weak scaling keeps
+the band of each rank fixed. The time is the wall time of the slowest rank and
+doesn't include the start-up of the processes.
+
+Usage:
+    python benchmarks/scaling.py --mode strong --nx 512 --ranks 1 2 4 --steps 200
+    python benchmarks/scaling.py --mode weak --nx 128 --ranks 1 2 4 --steps 200
+"""
+
+import argparse
+import json
+
+from microtex.distributed import run_local
+from microtex.modeling.cahn_hilliard import Configuration
+
+
+def scaling(mode, nx, ny, ranks, steps):
+    rows = []
+    for n in ranks:
+        gx = nx * n if mode == "weak" else nx
+        config = Configuration(nx=gx, ny=ny)
+        _, elapsed = run_local(n, config.noisy_field(), config, steps)
+        rows.append({"ranks": n, "nx": gx, "ny": ny, "steps": steps, "elapsed": elapsed})
+
+    reference = rows[0]["elapsed"] * rows[0]["ranks"]
+    for row in rows:
+        ideal = reference / row["ranks"] if mode == "strong" else reference / rows[0]["ranks"]
+        row["efficiency"] = ideal / row["elapsed"]
+        row["cell_updates_per_second"] = row["nx"] * row["ny"] * steps / row["elapsed"]
+    return rows
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mode", choices=["strong", "weak"], default="strong")
+    parser.add_argument("--nx", type=int, default=256, help="Global rows (strong) or rows per rank (weak).")
+    parser.add_argument("--ny", type=int, default=256)
+    parser.add_argument("--ranks", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--json", help="Save the results to the JSON file.")
+    options = parser.parse_args(args)
+
+    rows = scaling(options.mode, options.nx, options.ny, options.ranks, options.steps)
+    print(f"{'ranks':>6} {'nx':>6} {'ny':>6} {'time [s]':>10} {'MLUPS':>8} {'eff.':>6}")
+    for row in rows:
+        print(
+            f"{row['ranks']:>6} {row['nx']:>6} {row['ny']:>6} {row['elapsed']:>10.3f} "
+            f"{row['cell_updates_per_second'] / 1e6:>8.2f} {row['efficiency']:>6.2f}"
+        )
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump({"mode": options.mode, "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -18,7 +18,7 @@ if __name__ == "__main__":
             "tqdm",
             "numpy>=1.21",
             "numba",
-            "scipy",
+            "scipy>=1.12",
             "overrides",
             "matplotlib",
             "h5py",
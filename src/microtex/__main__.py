@@ -1,10 +1,44 @@
 # -*- coding: utf-8 -*-
 
 
+def warmup(args=None) -> None:
+    """
+    Precompile the stencil kernels into the shared kernel cache, e.g.
+    ``microtex warmup --cache /shared/kernels`` before starting the workers
+    with ``MICROTEX_KERNEL_CACHE=/shared/kernels``.
+    """
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(
+        prog="microtex warmup", description="Precompile the kernels into the kernel cache."
+    )
+    parser.add_argument(
+        "-c", "--cache", help="The kernel cache directory (default MICROTEX_KERNEL_CACHE or ~/.cache/microtex/kernels)."
+    )
+    parser.add_argument(
+        "-d", "--ndim", type=int, nargs="+", default=[1, 2, 3], choices=[1, 2, 3], help="The grid dimensions."
+    )
+    options = parser.parse_args(args)
+    if options.cache:
+        os.environ["MICROTEX_KERNEL_CACHE"] = options.cache
+
+    from microtex.numerics.stencil import kernel_cache_dir, warmup
+
+    report = warmup(ndims=options.ndim)
+    for name, seconds in report.items():
+        print(f"{name:<40} {seconds * 1000:10.1f} ms")
+    print(f"{len(report)} kernels in {kernel_cache_dir()}")
+
+
 def main(args=None) -> None:
     import argparse
     import sys
 
+    args = sys.argv[1:] if args is None else list(args)
+    if args and args[0] == "warmup":
+        return warmup(args[1:])
+
     parser = argparse.ArgumentParser(
         description="The material microstructure simulation."
     )
@@ -24,7 +58,7 @@ def main(args=None) -> None:
 
     parser.add_argument("-V", "--verbose", action="store_true", help="A verbose mode")
 
-    options = parser.parse_args()
+    options = parser.parse_args(args)
 
     print(options)
 
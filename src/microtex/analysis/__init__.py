@@ -5,13 +5,28 @@ The model classes and functions for microstructure (image) analysis.
 """
 
 import numpy as np
-import scipy.stats as stats
 from numpy.typing import NDArray
-from scipy import optimize
 
+from microtex.profiling import stage
 from microtex.quantities import R
 
-__all__ = tuple(["FFT_Analyser_2D", "Domain_Analyser_2D"])
+__all__ = tuple(
+    [
+        "FFT_Analyser_2D",
+        "Domain_Analyser_2D",
+        "Precision_Report",
+        "validate_precision",
+        "Analysis_Task",
+        "make_tasks",
+        "map_reduce",
+        "radial_power_spectra",
+        "spectral_moments",
+        "spectral_peak",
+        "autocorrelation_length",
+        "characteristic_lengths",
+        "coarsening_exponent",
+    ]
+)
 
 
 # 3-params Gaussian curve to fit peak
@@ -43,17 +58,41 @@ class FFT_Analyser_2D:
         self.kvals = 0.5 * (self.kbins[1:] + self.kbins[:-1])
 
     def analyze_domain(self, domain: NDArray) -> None:
-        fi = np.fft.fftn(domain - domain.mean())
-        fa = np.abs(fi) ** 2
-        self.Abins, _, _ = stats.binned_statistic(
-            self.knrm, fa.flatten(), statistic="mean", bins=self.kbins
-        )
-        self.Abins *= np.pi * (self.kbins[1:] ** 2 - self.kbins[:-1] ** 2)
+        import scipy.fft
+        import scipy.stats as stats
+
+        with stage("analysis.fft"):
+            # scipy.fft keeps single precision, the mean is reduced in double precision
+            mean = domain.dtype.type(domain.mean(dtype=np.float64))
+            fi = scipy.fft.fftn(domain - mean)
+            fa = np.abs(fi) ** 2
+            self.Abins, _, _ = stats.binned_statistic(
+                self.knrm, fa.flatten(), statistic="mean", bins=self.kbins
+            )
+            self.Abins *= np.pi * (self.kbins[1:] ** 2 - self.kbins[:-1] ** 2)
 
     def power_spectrum(self):
         return self.configuration.nx / self.kvals, self.Abins
 
+    def analyze_frames(self, frames: NDArray):
+        """
+        Returns the wavelengths and the ``(T, nbins)`` power spectra of a stack
+        of frames, the batched :code:`analyze_domain` and :code:`power_spectrum`.
+        """
+        from microtex.analysis._spectral import radial_power_spectra
+
+        k, spectra = radial_power_spectra(frames)
+        return 1.0 / k, spectra
+
     def fit_gaussian(self, **kwargs):
+        """
+        Fit a Gaussian to the power spectrum of the last analysed domain.
+
+        The nonlinear fit is slow and may fail, it is kept to validate the
+        closed-form estimators of :code:`characteristic_lengths`.
+        """
+        from scipy import optimize
+
         gs = self.configuration.nx / self.kvals
         # set reasonable guess
         if "p0" not in kwargs:
@@ -77,19 +116,54 @@ class Domain_Analyser_2D:
     def __init__(self, configuration) -> None:
         self.configuration = configuration
 
+    def calculate_mass(self, domain: NDArray) -> float:
+        """Returns mean concentration over domain (reduced in double precision)"""
+        return float(np.mean(domain, dtype=np.float64))
+
+    def calculate_free_energy(self, domain: NDArray) -> float:
+        """Returns total free energy (chemical and gradient) of domain per unit area"""
+        c = self.configuration
+        with stage("analysis.free_energy"):
+            f_chem = R * c.T * (domain * np.log(domain) + (1.0 - domain) * np.log(1.0 - domain))
+            f_chem += c.omega * domain * (1.0 - domain)
+            grad_x = (np.roll(domain, -1, axis=1) - domain) / c.dx
+            grad_y = (np.roll(domain, -1, axis=0) - domain) / c.dy
+            f_grad = 0.5 * c.kappa * (grad_x * grad_x + grad_y * grad_y)
+            return float(np.mean(f_chem + f_grad, dtype=np.float64))
+
     def calculate_energy(self, domain: NDArray) -> float:
         """Returns integral value of total diffusion potential over domain"""
-        # Chemical diffusion potential term
-        mu_chem = R * self.configuration.T * (np.log(domain) - np.log(1.0 - domain)) + self.configuration.omega * (1.0 - 2.0 * domain)
-
-        # Gradient diffusion potential term
-        c_e, c_w = np.roll(domain, -1, axis=1), np.roll(domain, 1, axis=1)
-        c_s, c_n = np.roll(domain, -1, axis=0), np.roll(domain, 1, axis=0)
-
-        mu_grad_x = (c_e - 2.0 * domain + c_w) / self.configuration.dx / self.configuration.dx
-        mu_grad_y = (c_n - 2.0 * domain + c_s) / self.configuration.dy / self.configuration.dy
-        mu_grad = -self.configuration.kappa * (mu_grad_x + mu_grad_y)
-
-        # Total diffusion potential
-        mu = mu_chem + mu_grad
-        return np.mean(np.abs(mu))
+        from microtex.modeling._kernels import chemical_potential
+
+        c = self.configuration
+        with stage("analysis.energy"):
+            # chemical and gradient diffusion potential in one stencil pass, rows are y
+            mu = chemical_potential(
+                domain, spacing=(float(c.dy), float(c.dx)), params=(float(R * c.T), float(c.omega), float(c.kappa))
+            )
+            return float(np.mean(np.abs(mu), dtype=np.float64))
+
+
+# The map-reduce driver needs a process pool, the precision validation the
+# Cahn-Hilliard model, they and the batched estimators are imported on first access.
+_LAZY = {
+    "Analysis_Task": "_mapreduce",
+    "make_tasks": "_mapreduce",
+    "map_reduce": "_mapreduce",
+    "Precision_Report": "_precision",
+    "validate_precision": "_precision",
+    "radial_power_spectra": "_spectral",
+    "spectral_moments": "_spectral",
+    "spectral_peak": "_spectral",
+    "autocorrelation_length": "_spectral",
+    "characteristic_lengths": "_spectral",
+    "coarsening_exponent": "_spectral",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        import importlib
+
+        return getattr(importlib.import_module(f"{__name__}.{_LAZY[name]}"), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+"""
+Parallel map-reduce analysis of the simulations in a directory.
+
+The simulations matching a :code:`search_simulations` query are split into
+tasks of consecutive frames, which a process pool analyses. Every worker
+opens its own read-only reader. The result of a task is checkpointed as a
+small NPZ file next to the output, an interrupted run skips the finished
+tasks when started again. The per-frame results are reduced into one
+columnar NPZ table with a row per analysed frame.
+
+An analysis is a picklable (module level) callable which gets the stored
+configuration of a simulation and returns the per-frame function, so the
+set-up (wave vectors, bins) is done once per task:
+
+.. code-block::python
+
+    def spectrum(config):
+        fft = FFT_Analyser_2D(config)
+
+        def analyse(frame):
+            fft.analyze_domain(frame)
+            return {"peak": fft.fit_gaussian()[0][1], "spectrum": fft.Abins}
+
+        return analyse
+
+    table = map_reduce('results/', spectrum, 'spectra.npz', query=dict(T=600), frames=slice(0, None, 10))
+    table['path'], table['timestep'], table['peak'], table['spectrum']     # one row per frame
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+from microtex.profiling import stage
+
+__all__ = tuple(["Analysis_Task", "map_reduce", "make_tasks"])
+
+
+@dataclass(frozen=True)
+class Analysis_Task:
+    """
+    The frames ``range(start, stop, step)`` of one stored simulation.
+    """
+
+    path: str
+    start: int
+    stop: int
+    step: int
+
+    def key(self, analysis: Callable, resolution: Optional[int] = None) -> str:
+        """
+        The name of the task checkpoint, stable between runs of the analysis
+        at the `resolution` while the stored simulation (its modification time
+        and size) is unchanged.
+        """
+        name = f"{getattr(analysis, '__module__', '')}.{getattr(analysis, '__qualname__', repr(analysis))}"
+        stat = os.stat(self.path)
+        text = f"{name}|{resolution}|{self.path}|{stat.st_mtime_ns}|{stat.st_size}|{self.start}|{self.stop}|{self.step}"
+        return hashlib.sha256(text.encode()).hexdigest()[:24]
+
+
+def make_tasks(paths, frames: slice = slice(None), chunk: int = 64) -> List[Analysis_Task]:
+    """
+    Split the `frames` of the stored simulations into tasks of at most `chunk` frames.
+    """
+    from microtex.storage import open_reader
+
+    tasks = []
+    for path in sorted(str(p) for p in paths):
+        selected = range(len(open_reader(path).attrs["timesteps"]))[frames]
+        for first in range(0, len(selected), chunk):
+            part = selected[first : first + chunk]
+            tasks.append(Analysis_Task(path, part.start, part.stop, part.step))
+    return tasks
+
+
+def _run_task(analysis: Callable, task: Analysis_Task, checkpoint: str, resolution: Optional[int]) -> str:
+    from microtex.storage import Attributes, open_reader
+
+    reader = open_reader(task.path)
+    analyse = analysis(Attributes(reader.attrs))
+    frames = range(task.start, task.stop, task.step)
+    rows = []
+    with stage("analysis.map"):
+        for frame in frames:
+            rows.append(analyse(np.asarray(reader.get_field(frame, resolution=resolution))))
+    columns = {name: np.asarray([row[name] for row in rows]) for name in rows[0]} if rows else {}
+    columns["path"] = np.full(len(frames), task.path)
+    columns["frame"] = np.asarray(frames, dtype=np.int64)
+    columns["timestep"] = np.asarray(reader.attrs["timesteps"], dtype=np.int64)[task.start : task.stop : task.step]
+    # written under a temporary name, a checkpoint is either complete or missing
+    temporary = f"{checkpoint}.{os.getpid()}.tmp.npz"
+    np.savez(temporary, **columns)
+    os.replace(temporary, checkpoint)
+    return checkpoint
+
+
+def map_reduce(
+    wdir,
+    analysis: Callable,
+    output,
+    query: Optional[Dict] = None,
+    frames: slice = slice(None),
+    chunk: int = 64,
+    workers: Optional[int] = None,
+    resolution: Optional[int] = None,
+    keep_parts: bool = False,
+) -> Dict[str, NDArray]:
+    """
+    Analyse the frames of the simulations in `wdir` in parallel and store the table.
+
+    Params:
+        wdir: the directory of the simulations (HDF5 files and ``.mmap`` frame stores)
+        analysis: picklable callable, ``analysis(config)`` returns the per-frame
+                  function ``analyse(frame) -> dict`` of scalars or fixed shape arrays
+        output: the NPZ file of the table, the checkpoints are kept in ``<output>.parts``
+                (other files there are removed)
+        query: the attributes the simulations must have, see :code:`search_simulations`
+        frames: the analysed frames of every simulation (slice)
+        chunk: the number of frames of a task
+        workers: the number of processes, 0 analyses in the calling process
+        resolution: read the pyramid level nearest to the resolution (see :code:`HDF5Reader.get_field`)
+        keep_parts: keep the task checkpoints after the reduction
+
+    :return: The columns of the table, the analysis results and 'path', 'frame' and 'timestep'.
+    """
+    from microtex.storage import search_simulations
+
+    output = Path(output)
+    parts = output.with_name(output.name + ".parts")
+    parts.mkdir(parents=True, exist_ok=True)
+    tasks = make_tasks(search_simulations(wdir, **(query or {})), frames, chunk)
+    checkpoints = [str(parts / f"{task.key(analysis, resolution)}.npz") for task in tasks]
+    # checkpoints of changed simulations or other settings and files of crashed workers are stale
+    for stale in set(str(entry) for entry in parts.iterdir()) - set(checkpoints):
+        os.remove(stale)
+    todo = [(task, checkpoint) for task, checkpoint in zip(tasks, checkpoints) if not os.path.exists(checkpoint)]
+
+    if workers == 0:
+        for task, checkpoint in todo:
+            _run_task(analysis, task, checkpoint, resolution)
+    elif todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_run_task, analysis, task, checkpoint, resolution) for task, checkpoint in todo]
+            for future in futures:
+                future.result()
+
+    with stage("analysis.reduce"):
+        tables = []
+        for checkpoint in checkpoints:
+            with np.load(checkpoint) as part:
+                tables.append({name: part[name] for name in part.files})
+        names = list(tables[0]) if tables else ["path", "frame", "timestep"]
+        columns = {name: np.concatenate([table[name] for table in tables]) if tables else np.empty(0) for name in names}
+        np.savez(output, **columns)
+
+    if not keep_parts:
+        for entry in parts.iterdir():
+            os.remove(entry)
+        parts.rmdir()
+    return columns
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+"""
+Validation of the single precision mode against double precision.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field, replace
+from typing import Dict, List
+
+import numpy as np
+
+from microtex.modeling import Solver
+from microtex.modeling.cahn_hilliard import Cahn_Hilliard_2D_AB_Solver, Configuration
+
+__all__ = tuple(["Precision_Report", "validate_precision"])
+
+
+@dataclass
+class Precision_Report:
+    """
+    Drift of a float32 run against the float64 run from the same initial field.
+    """
+
+    steps: List[int] = field(default_factory=list)
+    max_abs_error: List[float] = field(default_factory=list)
+    rel_l2_error: List[float] = field(default_factory=list)
+    mass_drift: List[float] = field(default_factory=list)
+    energy_drift: List[float] = field(default_factory=list)
+    time_per_step: Dict[str, float] = field(default_factory=dict)
+    bytes_per_field: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def speedup(self) -> float:
+        return self.time_per_step["float64"] / self.time_per_step["float32"]
+
+    def summary(self) -> str:
+        lines = [f"{'step':>8} {'max |err|':>10} {'rel L2':>10} {'mass':>10} {'energy':>10}"]
+        for row in zip(
+            self.steps, self.max_abs_error, self.rel_l2_error, self.mass_drift, self.energy_drift
+        ):
+            lines.append(f"{row[0]:>8} " + " ".join(f"{value:>10.2e}" for value in row[1:]))
+        lines.append(
+            f"time/step: float64 {self.time_per_step['float64'] * 1e3:.3f} ms, "
+            f"float32 {self.time_per_step['float32'] * 1e3:.3f} ms (speedup {self.speedup:.2f}x), "
+            f"memory/field: {self.bytes_per_field['float64']} B vs {self.bytes_per_field['float32']} B"
+        )
+        return "\n".join(lines)
+
+
+def validate_precision(
+    config: Configuration,
+    steps: int = 1000,
+    samples: int = 10,
+    solver: Solver = Cahn_Hilliard_2D_AB_Solver,
+    noise: float = 0.01,
+) -> Precision_Report:
+    """
+    Run the model in double and single precision and compare them at `samples`
+    evenly spaced steps. Mass and energy are reduced in double precision for both runs.
+    """
+    from microtex.analysis import Domain_Analyser_2D
+
+    double = replace(config, precision="float64")
+    single = replace(config, precision="float32")
+    analyser = Domain_Analyser_2D(double)
+    checkpoints = set(np.linspace(0, steps, samples + 1, dtype=int)[1:].tolist())
+
+    report = Precision_Report()
+    f64 = double.noisy_field(noise)
+    f32 = f64.astype(np.float32)
+    report.bytes_per_field = {"float64": f64.nbytes, "float32": f32.nbytes}
+    elapsed = {"float64": 0.0, "float32": 0.0}
+    for n in range(1, steps + 1):
+        start = time.perf_counter()
+        f64 = solver(f64, double)
+        elapsed["float64"] += time.perf_counter() - start
+        start = time.perf_counter()
+        f32 = solver(f32, single)
+        elapsed["float32"] += time.perf_counter() - start
+
+        if n in checkpoints:
+            diff = f32.astype(np.float64) - f64
+            e64 = analyser.calculate_energy(f64)
+            report.steps.append(n)
+            report.max_abs_error.append(float(np.abs(diff).max()))
+            report.rel_l2_error.append(float(np.linalg.norm(diff) / np.linalg.norm(f64)))
+            report.mass_drift.append(abs(analyser.calculate_mass(f32) - analyser.calculate_mass(f64)))
+            report.energy_drift.append(abs(analyser.calculate_energy(f32) - e64) / abs(e64))
+
+    report.time_per_step = {key: value / steps for key, value in elapsed.items()}
+    return report
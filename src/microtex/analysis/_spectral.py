@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+
+"""
+Batched estimators of the characteristic length of microstructures.
+
+The estimators work on all frames at once: the radially averaged power
+spectra of `T` frames form a ``(T, nbins)`` matrix and every estimator is a
+closed-form reduction along the wavenumber axis, no per-frame nonlinear fit
+is needed (see :code:`FFT_Analyser_2D.fit_gaussian` for validation).
+
+* first and second spectral moments ``<k>`` and ``sqrt(<k^2>)``,
+* the spectral peak, refined by a parabola through the logarithms of the
+  maximal bin and its neighbours,
+* the first zero crossing of the radially averaged real-space autocorrelation.
+
+Wavenumbers are in cycles per grid spacing, lengths in grid spacings (times
+`spacing`). The lengths feed :code:`coarsening_exponent`, the least squares
+fit of ``L(t) = A t^n``.
+
+.. code-block::python
+
+    reader = HDF5Reader('run.h5')
+    lengths = characteristic_lengths(reader.get_field(slice(1, None)))
+    fit = coarsening_exponent(reader.attrs['timesteps'][1:], lengths['peak'])
+    fit['exponent']   # 1/3 for diffusion limited coarsening
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from microtex.profiling import stage
+
+__all__ = tuple(
+    [
+        "radial_power_spectra",
+        "spectral_moments",
+        "spectral_peak",
+        "autocorrelation_length",
+        "characteristic_lengths",
+        "coarsening_exponent",
+    ]
+)
+
+
+def _fft():
+    # scipy.fft keeps single precision and uses threads, numpy.fft is the fallback
+    try:
+        import scipy.fft as fft
+
+        return fft, {"workers": -1}
+    except ImportError:
+        return np.fft, {}
+
+
+def _spectrum_bins(shape: Tuple[int, int]):
+    """
+    Returns the radial bin index of the half-plane wavenumbers, their weights
+    (the columns mirrored by the real FFT count twice) and the bin centres.
+    """
+    nx, ny = shape
+    kx = np.fft.fftfreq(nx)[:, np.newaxis]
+    ky = np.fft.rfftfreq(ny)[np.newaxis, :]
+    knrm = np.sqrt(kx * kx + ky * ky)
+    # bins of width 1/n centred on the multiples of 1/n, as FFT_Analyser_2D
+    n = min(nx, ny)
+    index = np.rint(knrm * n).astype(np.intp) - 1
+    nbins = n // 2
+    index[(index < 0) | (index >= nbins)] = nbins
+    weights = np.full(knrm.shape, 2.0)
+    weights[:, 0] = 1.0
+    if ny % 2 == 0:
+        weights[:, -1] = 1.0
+    return index, weights, np.arange(1, nbins + 1) / n
+
+
+def radial_power_spectra(frames: NDArray, batch: int = 16) -> Tuple[NDArray, NDArray]:
+    """
+    Radially averaged power spectra of a stack of 2D frames.
+
+    The mean of every frame is removed, the power of every radial bin is the
+    mean power over the bin times its annulus area (as :code:`FFT_Analyser_2D`).
+
+    :param frames: ``(T, nx, ny)`` array (or a single 2D frame)
+    :param batch: the number of frames transformed at once
+    :return: The bin wavenumbers ``(nbins,)`` [cycles per grid spacing] and the spectra ``(T, nbins)``.
+    """
+    frames = np.asarray(frames)
+    if frames.ndim == 2:
+        frames = frames[np.newaxis]
+    fft, options = _fft()
+    index, weights, k = _spectrum_bins(frames.shape[1:])
+    nbins = len(k)
+    flat_index, flat_weights = index.ravel(), weights.ravel()
+    counts = np.bincount(flat_index, flat_weights, minlength=nbins + 1)[:nbins]
+    area = np.pi * ((np.arange(1, nbins + 1) + 0.5) ** 2 - (np.arange(1, nbins + 1) - 0.5) ** 2)
+    spectra = np.empty((len(frames), nbins))
+    with stage("analysis.spectra"):
+        for first in range(0, len(frames), batch):
+            block = frames[first : first + batch]
+            mean = block.mean(axis=(1, 2), dtype=np.float64, keepdims=True).astype(block.dtype)
+            power = np.abs(fft.rfft2(block - mean, **options)) ** 2
+            power = power.reshape(len(block), -1) * flat_weights
+            # one bincount for the whole batch, the bins of frame t are offset by t (nbins + 1)
+            offsets = (np.arange(len(block)) * (nbins + 1))[:, np.newaxis]
+            sums = np.bincount((flat_index + offsets).ravel(), power.ravel(), minlength=len(block) * (nbins + 1))
+            spectra[first : first + len(block)] = sums.reshape(len(block), nbins + 1)[:, :nbins] / counts
+    spectra *= area
+    return k, spectra
+
+
+def spectral_moments(k: NDArray, spectra: NDArray) -> Tuple[NDArray, NDArray]:
+    """
+    Returns the first moment ``<k>`` and the root of the second moment
+    ``sqrt(<k^2>)`` of the spectra ``(T, nbins)`` along the last axis.
+    """
+    spectra = np.asarray(spectra, dtype=np.float64)
+    total = spectra.sum(axis=-1)
+    k1 = spectra @ k / total
+    k2 = np.sqrt(spectra @ (k * k) / total)
+    return k1, k2
+
+
+def spectral_peak(k: NDArray, spectra: NDArray) -> NDArray:
+    """
+    Returns the wavenumber of the spectral maximum of every spectrum, refined
+    by the vertex of the parabola through the logarithms of the maximal bin
+    and its two neighbours (uniformly spaced bins).
+    """
+    spectra = np.atleast_2d(np.asarray(spectra, dtype=np.float64))
+    rows = np.arange(len(spectra))
+    i = spectra.argmax(axis=-1)
+    j = np.clip(i, 1, spectra.shape[-1] - 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        left, centre, right = (np.log(spectra[rows, j + d]) for d in (-1, 0, 1))
+        curvature = left - 2.0 * centre + right
+        offset = np.where(curvature < 0, 0.5 * (left - right) / curvature, 0.0)
+    # the vertex of a maximum at the first or last bin is not bracketed
+    offset = np.where((i == j) & np.isfinite(offset), np.clip(offset, -0.5, 0.5), 0.0)
+    return np.interp(i + offset, np.arange(len(k)), k)
+
+
+def autocorrelation_length(frames: NDArray, batch: int = 16) -> NDArray:
+    """
+    Returns the first zero crossing of the radially averaged autocorrelation
+    of every frame [grid spacings], linearly interpolated between the radii
+    (``nan`` if it does not cross zero within half the domain).
+    """
+    frames = np.asarray(frames)
+    if frames.ndim == 2:
+        frames = frames[np.newaxis]
+    fft, options = _fft()
+    nx, ny = frames.shape[1:]
+    dx = np.minimum(np.arange(nx), nx - np.arange(nx))[:, np.newaxis]
+    dy = np.minimum(np.arange(ny), ny - np.arange(ny))[np.newaxis, :]
+    radius = np.rint(np.sqrt(dx * dx + dy * dy)).astype(np.intp).ravel()
+    nr = min(nx, ny) // 2 + 1
+    radius[radius >= nr] = nr
+    counts = np.bincount(radius, minlength=nr + 1)[:nr]
+    lengths = np.empty(len(frames))
+    with stage("analysis.autocorrelation"):
+        for first in range(0, len(frames), batch):
+            block = frames[first : first + batch]
+            mean = block.mean(axis=(1, 2), dtype=np.float64, keepdims=True).astype(block.dtype)
+            power = np.abs(fft.rfft2(block - mean, **options)) ** 2
+            correlation = fft.irfft2(power, s=(nx, ny), **options).reshape(len(block), -1)
+            offsets = (np.arange(len(block)) * (nr + 1))[:, np.newaxis]
+            sums = np.bincount((radius + offsets).ravel(), correlation.ravel(), minlength=len(block) * (nr + 1))
+            c = sums.reshape(len(block), nr + 1)[:, :nr] / counts
+            c /= c[:, :1]
+            lengths[first : first + len(block)] = _zero_crossing(c)
+    return lengths
+
+
+def _zero_crossing(c: NDArray) -> NDArray:
+    negative = c <= 0
+    found = negative.any(axis=-1)
+    j = np.where(found, negative.argmax(axis=-1), 1)
+    rows = np.arange(len(c))
+    before, after = c[rows, j - 1], c[rows, j]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = (j - 1) + before / (before - after)
+    return np.where(found, r, np.nan)
+
+
+def characteristic_lengths(frames: NDArray, spacing: float = 1.0, batch: int = 16) -> Dict[str, NDArray]:
+    """
+    Returns the characteristic lengths of a stack of frames by all estimators:
+    'k1' and 'k2' (inverse first and second spectral moments), 'peak'
+    (inverse refined spectral peak) and 'autocorrelation' (first zero of the
+    autocorrelation), each of shape ``(T,)`` in units of `spacing`.
+    """
+    k, spectra = radial_power_spectra(frames, batch)
+    k1, k2 = spectral_moments(k, spectra)
+    return {
+        "k1": spacing / k1,
+        "k2": spacing / k2,
+        "peak": spacing / spectral_peak(k, spectra),
+        "autocorrelation": spacing * autocorrelation_length(frames, batch),
+    }
+
+
+def coarsening_exponent(
+    times: NDArray, lengths: NDArray, start: Optional[float] = None, stop: Optional[float] = None
+) -> Dict[str, NDArray]:
+    """
+    Least squares fit of ``log L = log A + n log t`` over the times in ``[start, stop]``.
+
+    :param times: the times ``(T,)`` (non-positive times are skipped)
+    :param lengths: the lengths ``(T,)`` or ``(T, m)`` for `m` estimators fitted at once
+    :return: The 'exponent' `n`, 'prefactor' `A` and the 'stderr' of the exponent
+             (scalars, or ``(m,)`` arrays for 2D `lengths`).
+    """
+    times = np.asarray(times, dtype=np.float64)
+    lengths = np.asarray(lengths, dtype=np.float64)
+    columns = lengths.reshape(len(times), -1)
+    use = (times > 0) & np.all(np.isfinite(columns) & (columns > 0), axis=1)
+    if start is not None:
+        use &= times >= start
+    if stop is not None:
+        use &= times <= stop
+    if use.sum() < 3:
+        raise ValueError("The fit needs at least three positive times with finite lengths.")
+    x = np.log(times[use])
+    y = np.log(columns[use])
+    design = np.stack([np.ones_like(x), x], axis=1)
+    (intercept, exponent), residuals, _, _ = np.linalg.lstsq(design, y, rcond=None)
+    dof = len(x) - 2
+    sigma2 = ((y - design @ np.stack([intercept, exponent])) ** 2).sum(axis=0) / max(dof, 1)
+    stderr = np.sqrt(sigma2 / ((x - x.mean()) ** 2).sum())
+    result = {"exponent": exponent, "prefactor": np.exp(intercept), "stderr": stderr}
+    if lengths.ndim == 1:
+        result = {key: float(value[0]) for key, value in result.items()}
+    return result
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+"""
+Domain-decomposed (multi-node) runs of the models.
+
+The global domain is split into row bands, each rank steps its own band and
+exchanges halo rows with its neighbours through a pluggable :code:`Transport`.
+The package ships with :code:`LocalTransport`, a multi-process stand-in for
+testing on a single machine, and :code:`MPITransport` for clusters (requires
+the optional :code:`mpi4py` package).
+
+.. code-block::python
+
+    from microtex.distributed import run_local
+
+    field, elapsed = run_local(4, config.noisy_field(), config, steps=1000)
+"""
+
+from microtex.distributed._decomposition import Row_Decomposition_2D as Row_Decomposition_2D
+from microtex.distributed._runner import (
+    Distributed_Cahn_Hilliard_2D_AB_Runner as Distributed_Cahn_Hilliard_2D_AB_Runner,
+    assemble_hyperslabs as assemble_hyperslabs,
+    part_filename as part_filename,
+    run_local as run_local,
+)
+from microtex.distributed._transport import (
+    LocalTransport as LocalTransport,
+    MPITransport as MPITransport,
+    Transport as Transport,
+    TransportError as TransportError,
+    launch_local as launch_local,
+)
+
+__all__ = tuple(
+    [
+        "Row_Decomposition_2D",
+        "Distributed_Cahn_Hilliard_2D_AB_Runner",
+        "assemble_hyperslabs",
+        "part_filename",
+        "run_local",
+        "Transport",
+        "TransportError",
+        "LocalTransport",
+        "MPITransport",
+        "launch_local",
+    ]
+)
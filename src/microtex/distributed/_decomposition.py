@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+"""
+Domain decomposition of periodic 2D grids into row bands.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+__all__ = tuple(["Row_Decomposition_2D"])
+
+
+@dataclass(frozen=True)
+class Row_Decomposition_2D:
+    """
+    Split the rows (axis 0) of a periodic ``nx x ny`` grid into contiguous bands.
+
+    The first ``nx % ranks`` bands get one extra row. Each band is padded with
+    `halo` rows taken from the neighbouring bands (periodic wrap-around), the
+    Cahn-Hilliard solver needs two halo rows because of its fourth-order term.
+    """
+
+    nx: int
+    ny: int
+    ranks: int
+    halo: int = 2
+
+    def __post_init__(self):
+        if self.ranks < 1:
+            raise ValueError("Number of ranks must be positive.")
+        if self.nx // self.ranks < self.halo:
+            raise ValueError(
+                f"Band of {self.nx // self.ranks} rows is thinner than the halo ({self.halo})."
+            )
+
+    def bounds(self, rank: int) -> Tuple[int, int]:
+        """
+        :return: The half-open row interval ``[start, stop)`` owned by `rank`.
+        """
+        base, extra = divmod(self.nx, self.ranks)
+        start = rank * base + min(rank, extra)
+        return start, start + base + (1 if rank < extra else 0)
+
+    def shape(self, rank: int) -> Tuple[int, int]:
+        """
+        :return: The shape of the band owned by `rank` (without halos).
+        """
+        start, stop = self.bounds(rank)
+        return stop - start, int(self.ny)
+
+    def neighbours(self, rank: int) -> Tuple[int, int]:
+        """
+        :return: The ranks owning the rows above (``start - 1``) and below (``stop``).
+        """
+        return (rank - 1) % self.ranks, (rank + 1) % self.ranks
+
+    def scatter(self, field: NDArray) -> List[NDArray]:
+        """
+        Split the global field into bands.
+        """
+        return [field[slice(*self.bounds(rank))].copy() for rank in range(self.ranks)]
+
+    def gather(self, bands: List[NDArray]) -> NDArray:
+        """
+        Assemble bands into the global field.
+        """
+        return np.concatenate(bands, axis=0)
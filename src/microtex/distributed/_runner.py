@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+
+"""
+Distributed stepping of the Cahn-Hilliard 2D AB model over row bands.
+
+Every rank owns a contiguous band of rows (see :code:`Row_Decomposition_2D`),
+before each step the two outermost rows are exchanged with the neighbouring
+ranks and the ordinary (serial) solver is applied to the padded band. The rows
+spoiled by the solver's periodic wrap-around are exactly the halo rows, so the
+interior is identical to the serial result.
+
+.. code-block::python
+
+    from microtex.distributed import run_local
+
+    field, elapsed = run_local(4, config.noisy_field(), config, steps=1000, filename="run.h5")
+"""
+
+from __future__ import annotations
+
+import time
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from microtex.distributed._decomposition import Row_Decomposition_2D
+from microtex.distributed._transport import Transport, launch_local
+from microtex.modeling import Solver
+from microtex.modeling.cahn_hilliard import Cahn_Hilliard_2D_AB_Solver, Configuration
+from microtex.storage import HDF5Writer
+
+__all__ = tuple(
+    ["Distributed_Cahn_Hilliard_2D_AB_Runner", "assemble_hyperslabs", "part_filename", "run_local"]
+)
+
+# Message tags of the halo exchange.
+_TAG_UP, _TAG_DOWN = 11, 12
+
+
+def part_filename(filename, rank: int) -> Path:
+    """
+    :return: The path of the HDF5 file holding the hyperslab of `rank`.
+    """
+    path = Path(filename)
+    return path.with_name(f"{path.stem}.rank{rank:04d}{path.suffix}")
+
+
+class Distributed_Cahn_Hilliard_2D_AB_Runner:
+    """
+    Run the Cahn-Hilliard 2D AB model on the band of rows owned by this rank.
+
+    Params:
+        transport: communication backend (local processes, MPI, ...)
+        config: model configuration of the global domain
+        solver: serial solver applied to the padded band (default Cahn_Hilliard_2D_AB_Solver)
+        halo: number of exchanged rows, two for the fourth-order term
+
+    Usage:
+        runner = Distributed_Cahn_Hilliard_2D_AB_Runner(transport, config)
+        band = runner.run(runner.local_band(field), steps=1000, filename="run.h5", samples=[10, 100])
+    """
+
+    def __init__(
+        self,
+        transport: Transport,
+        config: Configuration,
+        solver: Solver = Cahn_Hilliard_2D_AB_Solver,
+        halo: int = 2,
+    ) -> None:
+        self.transport = transport
+        self.config = config
+        self.solver = solver
+        self.halo = halo
+        self.decomposition = Row_Decomposition_2D(
+            int(config.nx), int(config.ny), transport.size, halo
+        )
+        self.elapsed = 0.0
+
+    @property
+    def bounds(self) -> Tuple[int, int]:
+        """
+        :return: The row interval owned by this rank.
+        """
+        return self.decomposition.bounds(self.transport.rank)
+
+    def local_band(self, field: NDArray) -> NDArray:
+        """
+        Cut the band of this rank from the global field.
+        """
+        return field[slice(*self.bounds)].copy()
+
+    def exchange_halos(self, band: NDArray) -> NDArray:
+        """
+        Return the band padded with `halo` rows of the neighbouring ranks.
+        """
+        h = self.halo
+        up, down = self.decomposition.neighbours(self.transport.rank)
+        # Own top rows are the bottom halo of the rank above and vice versa.
+        bottom = self.transport.sendrecv(band[:h], dest=up, source=down, tag=_TAG_UP)
+        top = self.transport.sendrecv(band[-h:], dest=down, source=up, tag=_TAG_DOWN)
+        return np.concatenate((top, band, bottom), axis=0)
+
+    def step(self, band: NDArray) -> NDArray:
+        """
+        Make one time step of the band.
+        """
+        h = self.halo
+        return self.solver(self.exchange_halos(band), self.config)[h:-h]
+
+    def run(
+        self,
+        band: NDArray,
+        steps: int,
+        filename=None,
+        samples: Iterable[int] = (),
+    ) -> NDArray:
+        """
+        Make `steps` time steps. If `filename` is given, the initial band and the
+        bands at `samples` steps are stored in the rank's own HDF5 file and rank 0
+        assembles them into a virtual dataset `filename` readable by :code:`HDF5Reader`.
+        """
+        writer = None
+        if filename is not None:
+            writer = HDF5Writer(part_filename(filename, self.transport.rank), band, self.config)
+            writer.set_attr("hyperslab", self.bounds)
+        samples = set(samples)
+        timesteps = [0]
+
+        start = time.perf_counter()
+        for n in range(1, steps + 1):
+            band = self.step(band)
+            if writer is not None and n in samples:
+                writer.append(band, timestep=n)
+                timesteps.append(n)
+        self.elapsed = time.perf_counter() - start
+
+        if writer is not None:
+            self.transport.barrier()
+            if self.transport.rank == 0:
+                assemble_hyperslabs(filename, self.transport.size, len(timesteps))
+            self.transport.barrier()
+        return band
+
+
+def assemble_hyperslabs(filename, ranks: int, frames: Optional[int] = None) -> None:
+    """
+    Create the HDF5 file `filename` with a virtual `fields` dataset that maps the
+    hyperslabs stored by every rank. The attributes are copied from rank 0.
+    """
+    import h5py
+
+    parts: List[Tuple] = []
+    for rank in range(ranks):
+        path = part_filename(filename, rank)
+        with h5py.File(path, "r") as h5f:
+            dset = h5f["fields"]
+            parts.append((path, tuple(dset.attrs["hyperslab"]), dset.shape, dset.dtype))
+            if rank == 0:
+                attrs = dict(dset.attrs)
+
+    frames = min(shape[0] for _, _, shape, _ in parts) if frames is None else frames
+    nx = max(stop for _, (_, stop), _, _ in parts)
+    ny = parts[0][2][2]
+    layout = h5py.VirtualLayout(shape=(frames, nx, ny), dtype=parts[0][3])
+    for path, (start, stop), shape, _ in parts:
+        # Relative names are resolved against the directory of the virtual file.
+        source = h5py.VirtualSource(path.name, "fields", shape=shape)
+        layout[:, start:stop, :] = source[:frames]
+
+    with h5py.File(filename, mode="w") as h5f:
+        dset = h5f.create_virtual_dataset("fields", layout, fillvalue=np.nan)
+        for key, value in attrs.items():
+            if key != "hyperslab":
+                dset.attrs[key] = value
+        dset.attrs["ranks"] = ranks
+
+
+def _run_rank(transport, field, config, steps, filename, samples):
+    runner = Distributed_Cahn_Hilliard_2D_AB_Runner(transport, config)
+    band = runner.run(runner.local_band(field), steps, filename=filename, samples=samples)
+    return band, runner.elapsed
+
+
+def run_local(
+    nranks: int,
+    field: NDArray,
+    config: Configuration,
+    steps: int,
+    filename=None,
+    samples: Iterable[int] = (),
+) -> Tuple[NDArray, float]:
+    """
+    Run the distributed model on `nranks` local processes.
+
+    :return: The final global field and the wall time of the slowest rank [s].
+    """
+    results = launch_local(nranks, _run_rank, field, config, steps, filename, list(samples))
+    bands, elapsed = zip(*results)
+    return np.concatenate(bands, axis=0), max(elapsed)
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+"""
+Point-to-point message transports used by the distributed runners.
+
+The runners only rely on the small :code:`Transport` interface below, so the
+same code runs over MPI on a cluster or over the local multi-process stand-in
+on a single machine.
+"""
+
+from __future__ import annotations
+
+import multiprocessing as mp
+import operator
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Tuple
+
+__all__ = tuple(["Transport", "TransportError", "LocalTransport", "MPITransport", "launch_local"])
+
+
+class TransportError(Exception):
+    """
+    An exception class for transports.
+    """
+
+
+class Transport(ABC):
+    """
+    Abstract base class for rank-to-rank communication.
+
+    Concrete transports implement :code:`send`, :code:`recv` and :code:`barrier`,
+    the collective operations are built on top of them.
+    """
+
+    @property
+    @abstractmethod
+    def rank(self) -> int:
+        """
+        :return: The rank of this process.
+        """
+
+    @property
+    @abstractmethod
+    def size(self) -> int:
+        """
+        :return: The number of ranks.
+        """
+
+    @abstractmethod
+    def send(self, obj: Any, dest: int, tag: int = 0) -> None:
+        """
+        Send a picklable object to the rank `dest`.
+        """
+
+    @abstractmethod
+    def recv(self, source: int, tag: int = 0) -> Any:
+        """
+        Receive an object from the rank `source`, blocks until it arrives.
+        """
+
+    @abstractmethod
+    def barrier(self) -> None:
+        """
+        Block until all ranks reach the barrier.
+        """
+
+    def sendrecv(self, obj: Any, dest: int, source: int, tag: int = 0) -> Any:
+        """
+        Send `obj` to `dest` and receive an object from `source`.
+        """
+        self.send(obj, dest, tag)
+        return self.recv(source, tag)
+
+    def gather(self, obj: Any, root: int = 0, tag: int = 1 << 20) -> List[Any]:
+        """
+        Gather objects from all ranks on `root`, other ranks get ``None``.
+        """
+        if self.rank != root:
+            self.send(obj, root, tag)
+            return None
+        return [obj if rank == root else self.recv(rank, tag) for rank in range(self.size)]
+
+    def bcast(self, obj: Any, root: int = 0, tag: int = 1 << 21) -> Any:
+        """
+        Broadcast an object from `root` to all ranks.
+        """
+        if self.rank == root:
+            for rank in range(self.size):
+                if rank != root:
+                    self.send(obj, rank, tag)
+            return obj
+        return self.recv(root, tag)
+
+    def allreduce(self, value: Any, op: Callable = operator.add) -> Any:
+        """
+        Reduce values from all ranks with the binary `op` and return the result everywhere.
+        """
+        values = self.gather(value)
+        result = None
+        if self.rank == 0:
+            result = values[0]
+            for other in values[1:]:
+                result = op(result, other)
+        return self.bcast(result)
+
+
+class LocalTransport(Transport):
+    """
+    Multi-process stand-in transport for a single machine.
+
+    Each rank owns an inbox queue, messages which arrive out of order are kept
+    in a mailbox until they are requested. Use :code:`launch_local()` to create
+    the ranks.
+    """
+
+    def __init__(self, rank: int, inboxes: List["mp.Queue"], barrier: "mp.Barrier") -> None:
+        self._rank = rank
+        self._inboxes = inboxes
+        self._barrier = barrier
+        self._mailbox: Dict[Tuple[int, int], List[Any]] = {}
+
+    @property
+    def rank(self) -> int:
+        return self._rank
+
+    @property
+    def size(self) -> int:
+        return len(self._inboxes)
+
+    def send(self, obj: Any, dest: int, tag: int = 0) -> None:
+        self._inboxes[dest].put((self._rank, tag, obj))
+
+    def recv(self, source: int, tag: int = 0) -> Any:
+        key = (source, tag)
+        while not self._mailbox.get(key):
+            src, msgtag, obj = self._inboxes[self._rank].get()
+            self._mailbox.setdefault((src, msgtag), []).append(obj)
+        return self._mailbox[key].pop(0)
+
+    def barrier(self) -> None:
+        self._barrier.wait()
+
+
+class MPITransport(Transport):
+    """
+    Transport backed by :code:`mpi4py` (optional dependency).
+    """
+
+    def __init__(self, comm=None) -> None:
+        try:
+            from mpi4py import MPI
+        except ImportError as ex:
+            raise TransportError("The MPI transport requires the 'mpi4py' package.") from ex
+        self._comm = MPI.COMM_WORLD if comm is None else comm
+
+    @property
+    def rank(self) -> int:
+        return self._comm.Get_rank()
+
+    @property
+    def size(self) -> int:
+        return self._comm.Get_size()
+
+    def send(self, obj: Any, dest: int, tag: int = 0) -> None:
+        self._comm.send(obj, dest=dest, tag=tag)
+
+    def recv(self, source: int, tag: int = 0) -> Any:
+        return self._comm.recv(source=source, tag=tag)
+
+    def barrier(self) -> None:
+        self._comm.Barrier()
+
+    def sendrecv(self, obj: Any, dest: int, source: int, tag: int = 0) -> Any:
+        return self._comm.sendrecv(obj, dest=dest, sendtag=tag, source=source, recvtag=tag)
+
+    def gather(self, obj: Any, root: int = 0, tag: int = 0) -> List[Any]:
+        return self._comm.gather(obj, root=root)
+
+    def bcast(self, obj: Any, root: int = 0, tag: int = 0) -> Any:
+        return self._comm.bcast(obj, root=root)
+
+
+def _local_worker(rank, inboxes, barrier, results, target, args):
+    transport = LocalTransport(rank, inboxes, barrier)
+    try:
+        results.put((rank, True, target(transport, *args)))
+    except Exception as ex:
+        results.put((rank, False, repr(ex)))
+        raise
+
+
+def launch_local(nranks: int, target: Callable, *args) -> List[Any]:
+    """
+    Run :code:`target(transport, *args)` on `nranks` local processes.
+
+    The `target` must be picklable i.e. defined at module level.
+
+    :return: The list of values returned by each rank.
+    """
+    if nranks < 1:
+        raise ValueError("Number of ranks must be positive.")
+    ctx = mp.get_context()
+    inboxes = [ctx.Queue() for _ in range(nranks)]
+    barrier = ctx.Barrier(nranks)
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=_local_worker, args=(rank, inboxes, barrier, results, target, args))
+        for rank in range(nranks)
+    ]
+    for proc in procs:
+        proc.start()
+
+    outputs, errors = [None] * nranks, []
+    for _ in range(nranks):
+        rank, ok, value = results.get()
+        if ok:
+            outputs[rank] = value
+        else:
+            # The other ranks may wait for messages which never come.
+            errors.append(f"rank {rank}: {value}")
+            break
+    for proc in procs:
+        if errors:
+            proc.terminate()
+        proc.join()
+
+    if errors:
+        raise TransportError("Local run failed on " + "; ".join(errors))
+    return outputs
@@ -30,6 +30,7 @@ from microtex.modeling._model import Model2D as Model2D
 from microtex.modeling._model import Model3D as Model3D
 from microtex.modeling._model import ModelError as ModelError
 from microtex.modeling._model import ModelND as ModelND
+from microtex.modeling._model import configuration_digest as configuration_digest
 from microtex.modeling._model import make_samples as make_samples
 from microtex.modeling._solver import Solver as Solver
 
@@ -42,5 +43,6 @@ __all__ = tuple(
         "Model3D",
         "Solver",
         "Configuration",
+        "configuration_digest",
     ]
 )
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+"""
+Fused stencil kernels of the regular solution phase-field models.
+
+The molar free energy of the binary regular solution is
+``f(c) = RT (c ln c + (1 - c) ln(1 - c)) + omega c (1 - c)`` plus the gradient
+energy ``kappa / 2 |grad c|^2``, its variational derivative (the diffusion
+potential) is ``mu = RT (ln c - ln(1 - c)) + omega (1 - 2c) - kappa laplacian(c)``.
+The kernels are :code:`microtex.numerics.stencil` passes, the pointwise terms
+are evaluated in the stencil loop.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from microtex.numerics.stencil import fused_flux, fused_laplacian
+
+__all__ = tuple(["chemical_potential", "ab_rate", "ab_step", "allen_cahn_step"])
+
+
+def _chemical_potential(c, lap, params):
+    RT, omega, kappa = params
+    return RT * (np.log(c) - np.log(1.0 - c)) + omega * (1.0 - 2.0 * c) - kappa * lap
+
+
+def _ab_rate(c, mu, lap, grad, params):
+    # M laplacian(mu) + dM/dc grad(c) . grad(mu) with M = M0 p q, dM/dc = M0 ((1 - Db/Da) p + q (1 - 2c))
+    # where p = c (1 - c) and q = c + Db/Da (1 - c)
+    mobility, DbDa = params
+    one_minus = 1.0 - c
+    p = c * one_minus
+    q = c + DbDa * one_minus
+    return mobility * (p * q * lap + ((1.0 - DbDa) * p + q * (one_minus - c)) * grad)
+
+
+def _ab_step(c, mu, lap, grad, params):
+    mobility, DbDa, dt = params
+    one_minus = 1.0 - c
+    p = c * one_minus
+    q = c + DbDa * one_minus
+    return c + dt * (mobility * (p * q * lap + ((1.0 - DbDa) * p + q * (one_minus - c)) * grad))
+
+
+def _allen_cahn_step(c, lap, params):
+    RT, omega, kappa, Ldt = params
+    return c - Ldt * (RT * (np.log(c) - np.log(1.0 - c)) + omega * (1.0 - 2.0 * c) - kappa * lap)
+
+
+# mu = chemical_potential(c, spacing=..., params=(RT, omega, kappa))
+chemical_potential = fused_laplacian(_chemical_potential, 3, register=True)
+
+# dc/dt = ab_rate(c, mu, spacing=..., params=(Da / RT, Db / Da)) of the AB Cahn-Hilliard model
+ab_rate = fused_flux(_ab_rate, 2, register=True)
+
+# c + dt dc/dt = ab_step(c, mu, spacing=..., params=(Da / RT, Db / Da, dt))
+ab_step = fused_flux(_ab_step, 3, register=True)
+
+# c - L dt mu = allen_cahn_step(c, spacing=..., params=(RT, omega, kappa, L dt))
+allen_cahn_step = fused_laplacian(_allen_cahn_step, 4, register=True)
@@ -8,6 +8,10 @@ The model classes and functions.
 
 from __future__ import annotations
 
+import dataclasses
+import hashlib
+import json
+import numbers
 import pickle
 from abc import ABC, abstractclassmethod, abstractmethod
 from os import PathLike
@@ -28,6 +32,7 @@ __all__ = tuple(
         "Model3D",
         "ModelError",
         "Configuration",
+        "configuration_digest",
     ]
 )
 
@@ -36,8 +41,60 @@ def make_samples(min: int, max: int, count: int) -> Iterable[int]:
 
     """
     Make a geometrically spaced integers from minimum to maximum.
+
+    The values are rounded and duplicates (at small values) removed, so fewer
+    than `count` integers are returned when the range is too narrow.
+    """
+    return np.unique(np.rint(np.geomspace(min, max, num=count)).astype(np.int64)).tolist()
+
+
+def _canonical(value):
+    """
+    Converts a configuration value to a JSON serializable value which compares
+    equal exactly when the original values do e.g. ``256`` and ``256.0``.
+    Numbers stay JSON numbers (floats are written exactly by their repr), so
+    they never collide with strings.
+    """
+    if isinstance(value, np.ndarray):
+        return [_canonical(v) for v in value.tolist()]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, numbers.Real):
+        value = float(value)
+        return int(value) if value.is_integer() else value
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, type):
+        return value.__name__
+    return repr(value)
+
+
+def configuration_digest(config) -> str:
+    """
+    Stable SHA-256 hex digest of a configuration.
+
+    Unlike :code:`hash()` the digest does not change between interpreter runs,
+    so it can key caches, job queues and result stores. Equal configurations
+    have equal digests.
+
+    :param config: :code:`Configuration` or a dataclass configuration
+    :return: The hex digest.
     """
-    return np.array(np.geomspace(min, max, num=count, dtype="uint")).tolist()
+    if isinstance(config, Configuration):
+        document = {"type": type(config).__qualname__, "model": config.model, "values": config.values}
+    elif dataclasses.is_dataclass(config) and not isinstance(config, type):
+        values = {f.name: getattr(config, f.name) for f in dataclasses.fields(config)}
+        document = {"type": type(config).__qualname__, "values": values}
+    else:
+        raise TypeError(f"Cannot digest configuration of type {type(config).__name__}.")
+    text = json.dumps(_canonical(document), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode()).hexdigest()
 
 
 class Configuration(ABC):
@@ -47,7 +104,7 @@ class Configuration(ABC):
     """
 
     def __init__(self, model: Type, **kwargs):
-        self._model = model.__name__()
+        self._model = model if isinstance(model, str) else model.__name__
         self._values = dict(**kwargs)
 
     @property
@@ -64,15 +121,21 @@ class Configuration(ABC):
         """
         return self._values
 
+    @property
+    def digest(self) -> str:
+        """
+        Get the stable digest of the configuration, see :code:`configuration_digest`.
+        """
+        return configuration_digest(self)
+
     def __eq__(self, that: object) -> bool:
-        return (
-            isinstance(self, that)
-            and self.model == that.model
-            and self.values == that.values
-        )
+        if not isinstance(that, Configuration):
+            return NotImplemented
+        return type(self) is type(that) and self.digest == that.digest
 
     def __hash__(self) -> int:
-        return hash((type(self), self.model, self.values))
+        # The values may be unhashable (lists, arrays), hash their canonical digest.
+        return hash(self.digest)
 
 
 class ModelLike(Protocol):
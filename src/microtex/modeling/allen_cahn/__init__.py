@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+
+"""
+Allen-Cahn 2D model of a non-conserved order parameter (e.g. order-disorder
+or grain structure) on the compiled stencil engine.
+"""
+
+from microtex.modeling.allen_cahn._model import (
+    Allen_Cahn_2D_Model as Allen_Cahn_2D_Model
+)
+
+from microtex.modeling.allen_cahn._solver import (
+    Configuration as Configuration,
+    Allen_Cahn_2D_Solver as Allen_Cahn_2D_Solver,
+)
+
+
+__all__ = tuple([
+        "Configuration",
+        "Allen_Cahn_2D_Model",
+        "Allen_Cahn_2D_Solver",
+])
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+
+"""
+This module contains a model classes.
+"""
+
+from __future__ import annotations
+
+from numpy.typing import NDArray
+
+from microtex.modeling import Model2D, Solver
+from microtex.profiling import stage
+
+
+class Allen_Cahn_2D_Model(Model2D):
+    """
+    The Allen-Cahn 2D phase-field model of a non-conserved order parameter.
+
+    model = Allen_Cahn_2D_Model(domain=config.noisy_field(), solver=Allen_Cahn_2D_Solver, c=config)
+    for field in model.solve(1000):
+        ...
+    """
+
+    def __init__(self, domain: NDArray, solver: Solver, **properties):
+        super().__init__(name=type(self).__name__, alias="ac_2d", domain=domain, solver=solver)
+        self.properties = properties
+
+    def solve(self, steps: int = 10_000):
+        for n in range(steps):
+            with stage("model.step"):
+                self._states.append(self.solver(**self.properties, domain=self._states[-1]))
+            yield self._states[-1]
@@ -5,6 +5,11 @@ from microtex.modeling.cahn_hilliard._model import (
     Cahn_Hilliard_2D_AB_Model as Cahn_Hilliard_2D_AB_Model
 )
 
+from microtex.modeling.cahn_hilliard._plan import (
+    Cahn_Hilliard_2D_AB_Plan as Cahn_Hilliard_2D_AB_Plan,
+    get_plan as get_plan,
+)
+
 from microtex.modeling.cahn_hilliard._solver import (
     Configuration as Configuration,
     Cahn_Hilliard_2D_AB_Solver as Cahn_Hilliard_2D_AB_Solver,
@@ -15,4 +20,33 @@ __all__ = tuple([
         "Configuration",
         "Cahn_Hilliard_2D_AB_Model",
         "Cahn_Hilliard_2D_AB_Solver",
+        "Cahn_Hilliard_2D_AB_Implicit_Solver",
+        "Cahn_Hilliard_2D_AB_Out_Of_Core_Solver",
+        "Cahn_Hilliard_2D_AB_Plan",
+        "get_plan",
+        "Multicomponent_Configuration",
+        "Cahn_Hilliard_2D_Multicomponent_Model",
+        "Cahn_Hilliard_2D_Multicomponent_Plan",
+        "Cahn_Hilliard_2D_Multicomponent_Solver",
 ])
+
+
+# The implicit solver needs scipy.sparse, the out-of-core solver a thread
+# pool and the multicomponent model its compiled kernels, they are imported
+# on first access only.
+_LAZY = {
+    "Cahn_Hilliard_2D_AB_Implicit_Solver": "_implicit",
+    "Cahn_Hilliard_2D_AB_Out_Of_Core_Solver": "_out_of_core",
+    "Multicomponent_Configuration": "_multicomponent",
+    "Cahn_Hilliard_2D_Multicomponent_Model": "_multicomponent",
+    "Cahn_Hilliard_2D_Multicomponent_Plan": "_multicomponent",
+    "Cahn_Hilliard_2D_Multicomponent_Solver": "_multicomponent",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        import importlib
+
+        return getattr(importlib.import_module(f"{__name__}.{_LAZY[name]}"), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
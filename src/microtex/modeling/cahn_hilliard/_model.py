@@ -11,6 +11,7 @@ from typing import Any, Callable
 from numpy.typing import NDArray
 
 from microtex.modeling import Model2D, Solver
+from microtex.profiling import stage
 
 
 class Cahn_Hilliard_2D_AB_Model(Model2D):
@@ -38,5 +39,6 @@ class Cahn_Hilliard_2D_AB_Model(Model2D):
     def solve(self, steps: int = 10_000):
         # dt, R, La, T, ac, Da, Db
         for n in range(steps):
-            self._states.append(self.solver(**self.properties, domain=self._states[-1]))
+            with stage("model.step"):
+                self._states.append(self.solver(**self.properties, domain=self._states[-1]))
             yield self._states[-1]
@@ -0,0 +1,393 @@
+# -*- coding: utf-8 -*-
+
+"""
+Cahn-Hilliard 2D model of N-component (ternary and higher) regular solutions.
+
+The mole fractions of the `C` components are stored as one contiguous
+``(C, nx, ny)`` array (structure of arrays), ``sum_i c_i = 1`` at every node.
+The free energy per mole is
+
+    f = RT sum_i c_i ln c_i + sum_{i<j} omega_ij c_i c_j + sum_i kappa_i / 2 |grad c_i|^2
+
+with the symmetric interaction matrix `omega` (zero diagonal). The components
+evolve by ``dc_i/dt = div(sum_j M_ij grad mu_j)`` with the diffusion potentials
+``mu_j = RT ln c_j + sum_k omega_jk c_k - kappa_j laplacian(c_j)`` and the
+symmetric mobility matrix `M` whose rows sum to zero, so the mole fractions
+keep summing to one. By default `M` is the vacancy mechanism mobility of the
+tracer diffusion coefficients ``D_i`` at the local composition
+
+    M_ij = (D_i c_i delta_ij - D_i c_i D_j c_j / sum_k D_k c_k) / RT
+
+which vanishes with ``c_i`` like the mobility of the binary model, a constant
+`mobility` matrix can be given instead. The fluxes are in conservative form
+(the mobility of a cell face is the mean of its nodes), every component is
+conserved to rounding.
+
+A time step is two passes over memory, each over all components at a node:
+the potentials of all components, then the fluxes of all components with
+the Euler update (compiled kernels, see :code:`microtex.numerics.stencil`).
+
+.. code-block::python
+
+    config = Multicomponent_Configuration(components=("Fe", "Cr", "Co"), c0=(0.5, 0.3, 0.2))
+    field = config.noisy_field()                 # (3, nx, ny)
+    for n in range(steps):
+        field = Cahn_Hilliard_2D_Multicomponent_Solver(field, config)
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from microtex.modeling import ModelND, Solver
+from microtex.modeling._model import configuration_digest
+from microtex.numerics.stencil import PRECISIONS, Compiled_Kernel
+from microtex.profiling import count, stage
+from microtex.quantities import R
+
+__all__ = tuple(
+    [
+        "Multicomponent_Configuration",
+        "Cahn_Hilliard_2D_Multicomponent_Plan",
+        "Cahn_Hilliard_2D_Multicomponent_Solver",
+        "Cahn_Hilliard_2D_Multicomponent_Model",
+    ]
+)
+
+
+def _matrix(rows) -> Tuple[Tuple[float, ...], ...]:
+    return tuple(tuple(float(v) for v in row) for row in rows)
+
+
+def _vector(values) -> Tuple[float, ...]:
+    return tuple(float(v) for v in values)
+
+
+@dataclass(frozen=True)
+class Multicomponent_Configuration:
+    components: Tuple[str, ...] = ("A", "B", "C")       # Names of the components
+    T: float = 600                                       # Temperature
+    nx: float = 2 ** 8                                   # Number of grid along x direction
+    ny: float = 2 ** 8                                   # Number of grid along y direction
+    dx: float = 2.0e-9                                   # Spacing of grids in x direction [m]
+    dy: float = 2.0e-9                                   # Spacing of grids in y direction [m]
+    dt: float = 60                                       # Time increment [s]
+    c0: Tuple[float, ...] = (0.4, 0.3, 0.3)              # Average composition [atomic fraction]
+    kappa: Tuple[float, ...] = (3.0e-14, 3.0e-14, 3.0e-14)  # Gradient coefficients [Jm2/mol]
+    omega: Tuple[Tuple[float, ...], ...] = (             # Interaction matrix [J/mol]
+        (0.0, 16000.0, 16000.0),
+        (16000.0, 0.0, 16000.0),
+        (16000.0, 16000.0, 0.0),
+    )
+    Q: Tuple[float, ...] = (240000.0, 240000.0, 240000.0)  # Activation energies of diffusion [J/mol]
+    A: Tuple[float, ...] = (1.0, 1.0, 1.0)                 # Prefactors of diffusion [m2/s]
+    mobility: Optional[Tuple[Tuple[float, ...], ...]] = None  # Constant mobility matrix (default from D and c)
+    precision: str = "float64"  # Floating point type of fields ('float32' or 'float64')
+
+    def __post_init__(self):
+        # lists and arrays are stored as tuples, the configuration stays hashable
+        object.__setattr__(self, "components", tuple(str(name) for name in self.components))
+        for name in ("c0", "kappa", "Q", "A"):
+            object.__setattr__(self, name, _vector(getattr(self, name)))
+        object.__setattr__(self, "omega", _matrix(self.omega))
+        if self.mobility is not None:
+            object.__setattr__(self, "mobility", _matrix(self.mobility))
+
+        if self.precision not in ("float32", "float64"):
+            raise ValueError(f"Unsupported precision '{self.precision}'.")
+        n = len(self.components)
+        if n < 2:
+            raise ValueError("The model needs at least two components.")
+        for name in ("c0", "kappa", "Q", "A"):
+            if len(getattr(self, name)) != n:
+                raise ValueError(f"'{name}' needs {n} values, one per component.")
+        omega = np.asarray(self.omega)
+        if omega.shape != (n, n) or not np.allclose(omega, omega.T) or np.any(np.diag(omega) != 0):
+            raise ValueError(f"'omega' must be a symmetric {n}x{n} matrix with zero diagonal.")
+        if min(self.c0) <= 0 or abs(sum(self.c0) - 1.0) > 1e-9:
+            raise ValueError(f"The mean composition must be positive and sum to one, got {self.c0}.")
+        if self.mobility is not None:
+            M = np.asarray(self.mobility)
+            if M.shape != (n, n) or not np.allclose(M, M.T):
+                raise ValueError(f"'mobility' must be a symmetric {n}x{n} matrix.")
+            if np.any(np.abs(M.sum(axis=1)) > 1e-9 * np.abs(M).max()):
+                raise ValueError("The rows of 'mobility' must sum to zero, else the components are not conserved.")
+
+    @property
+    def C(self) -> int:
+        """
+        The number of components.
+        """
+        return len(self.components)
+
+    @property
+    def dtype(self) -> np.dtype:
+        """
+        The numpy dtype of fields.
+        """
+        return np.dtype(self.precision)
+
+    @property
+    def D(self) -> NDArray:
+        """
+        Tracer diffusion coefficients of the components [m2/s].
+        """
+        return np.asarray(self.A) * np.exp(-np.asarray(self.Q) / R / self.T)
+
+    @property
+    def mobility_matrix(self) -> NDArray:
+        """
+        The mobility matrix ``(C, C)`` [m2 mol/(J s)], the constant `mobility`
+        or the composition dependent one at the mean composition.
+        """
+        if self.mobility is not None:
+            return np.asarray(self.mobility)
+        x = np.asarray(self.c0) * self.D
+        return (np.diag(x) - np.outer(x, x) / x.sum()) / (R * self.T)
+
+    @property
+    def digest(self) -> str:
+        """
+        Stable SHA-256 digest of the configuration values.
+        """
+        return configuration_digest(self)
+
+    @classmethod
+    def keys(self):
+        return ['components', 'T', 'nx', 'ny', 'dx', 'dy', 'c0', 'kappa', 'omega', 'Q', 'A', 'mobility', 'dt',
+                'precision']
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def noisy_field(self, noise=0.01, rng=None) -> NDArray:
+        """
+        Uniform noise of amplitude `noise` around `c0` of the first ``C - 1``
+        components, the last one is the balance, drawn from `rng` (a seed,
+        :code:`Random_Stream` or generator, default fresh entropy).
+        """
+        from microtex.rng import as_generator
+
+        shape = (self.C, int(self.nx), int(self.ny))
+        field = np.empty(shape)
+        field[:-1] = np.asarray(self.c0[:-1])[:, np.newaxis, np.newaxis]
+        field[:-1] += as_generator(rng).random((self.C - 1,) + shape[1:]) * noise - noise / 2
+        field[-1] = 1.0 - field[:-1].sum(axis=0)
+        return field.astype(self.dtype, copy=False)
+
+
+def _potential_2d(c, mu, h2, RT, omega, kappa):
+    C, n0, n1 = c.shape
+    for i in range(n0):
+        im = i - 1 if i > 0 else n0 - 1
+        ip = i + 1 if i < n0 - 1 else 0
+        for j in range(n1):
+            jm = j - 1 if j > 0 else n1 - 1
+            jp = j + 1 if j < n1 - 1 else 0
+            for a in range(C):
+                ca = c[a, i, j]
+                lap = (c[a, im, j] + c[a, ip, j] - 2.0 * ca) * h2[0] + (c[a, i, jm] + c[a, i, jp] - 2.0 * ca) * h2[1]
+                m = RT * np.log(ca) - kappa[a] * lap
+                for b in range(C):
+                    m += omega[a, b] * c[b, i, j]
+                mu[a, i, j] = m
+
+
+def _vacancy_mobility(c, i, j, D, RT, M):
+    # M_ab = (x_a delta_ab - x_a x_b / sum_k x_k) / RT with x_a = D_a c_a at node (i, j)
+    C = D.shape[0]
+    total = 0.0
+    for a in range(C):
+        total += D[a] * c[a, i, j]
+    scale = 1.0 / (total * RT)
+    for a in range(C):
+        xa = D[a] * c[a, i, j]
+        for b in range(C):
+            M[a, b] = -xa * D[b] * c[b, i, j] * scale
+        M[a, a] += xa / RT
+
+
+def _step_2d(c, mu, out, h2, mobility, D, RT, variable, dt):
+    # Conservative fluxes, the mobility of a face is the mean of its two nodes.
+    # The node mobilities of the rows i - 1, i and i + 1 are kept in a ring of
+    # three rows, every node mobility is computed once per step.
+    C, n0, n1 = c.shape
+    if not variable:
+        # a constant mobility factors out: M laplacian(mu)
+        lap = np.empty(C)
+        for i in range(n0):
+            im = i - 1 if i > 0 else n0 - 1
+            ip = i + 1 if i < n0 - 1 else 0
+            for j in range(n1):
+                jm = j - 1 if j > 0 else n1 - 1
+                jp = j + 1 if j < n1 - 1 else 0
+                for b in range(C):
+                    mb = mu[b, i, j]
+                    lap[b] = (mu[b, im, j] + mu[b, ip, j] - 2.0 * mb) * h2[0] + (
+                        mu[b, i, jm] + mu[b, i, jp] - 2.0 * mb
+                    ) * h2[1]
+                for a in range(C):
+                    rate = 0.0
+                    for b in range(C):
+                        rate += mobility[a, b] * lap[b]
+                    out[a, i, j] = c[a, i, j] + dt * rate
+        return
+
+    rows = np.empty((3, n1, C, C))
+    for r in range(3):
+        for j in range(n1):
+            _vacancy_mobility(c, (n0 - 1 + r) % n0, j, D, RT, rows[r, j])
+    prev, cur, nxt = 0, 1, 2
+    for i in range(n0):
+        im = i - 1 if i > 0 else n0 - 1
+        ip = i + 1 if i < n0 - 1 else 0
+        if i > 0:
+            prev, cur, nxt = cur, nxt, prev
+            for j in range(n1):
+                _vacancy_mobility(c, ip, j, D, RT, rows[nxt, j])
+        for j in range(n1):
+            jm = j - 1 if j > 0 else n1 - 1
+            jp = j + 1 if j < n1 - 1 else 0
+            for a in range(C):
+                rate = 0.0
+                for b in range(C):
+                    m = rows[cur, j, a, b]
+                    mb = mu[b, i, j]
+                    rate += (
+                        (m + rows[prev, j, a, b]) * (mu[b, im, j] - mb) + (m + rows[nxt, j, a, b]) * (mu[b, ip, j] - mb)
+                    ) * h2[0] + (
+                        (m + rows[cur, jm, a, b]) * (mu[b, i, jm] - mb) + (m + rows[cur, jp, a, b]) * (mu[b, i, jp] - mb)
+                    ) * h2[1]
+                out[a, i, j] = c[a, i, j] + dt * (0.5 * rate)
+
+
+def _potential_signatures(ndim: int):
+    return [
+        f"void({dtype}[:, :, ::1], {dtype}[:, :, ::1], UniTuple(float64, 2), float64, float64[:, ::1], float64[::1])"
+        for dtype in PRECISIONS
+    ]
+
+
+def _step_signatures(ndim: int):
+    return [
+        f"void({dtype}[:, :, ::1], {dtype}[:, :, ::1], {dtype}[:, :, ::1], UniTuple(float64, 2), float64[:, ::1],"
+        " float64[::1], float64, boolean, float64)"
+        for dtype in PRECISIONS
+    ]
+
+
+_potential = Compiled_Kernel("multicomponent_potential", {2: _potential_2d}, _potential_signatures, register=True)
+_step = Compiled_Kernel(
+    "multicomponent_step", {2: _step_2d}, _step_signatures, {"_vacancy_mobility": _vacancy_mobility}, register=True
+)
+
+
+class Cahn_Hilliard_2D_Multicomponent_Plan:
+    """
+    Solver plan of the N-component Cahn-Hilliard 2D model for one configuration, grid and dtype.
+
+    Params:
+        config: the model configuration
+        shape: the grid shape (default ``(nx, ny)``)
+        dtype: the dtype of fields (default the configuration precision)
+
+    The plan keeps the coefficient matrices and a per-thread potential work array.
+    """
+
+    def __init__(self, config: Multicomponent_Configuration, shape: Tuple[int, int] = None, dtype=None) -> None:
+        self.config = config
+        self.shape = (config.C,) + ((int(config.nx), int(config.ny)) if shape is None else tuple(shape))
+        self.dtype = config.dtype if dtype is None else np.dtype(dtype)
+        if len(self.shape) != 3 or min(self.shape[1:]) < 3:
+            raise ValueError(f"The plan needs a 2D grid of at least 3x3 points, got {self.shape[1:]}.")
+        self.RT = float(R * config.T)
+        self.dt = float(config.dt)
+        self.omega = np.ascontiguousarray(config.omega, dtype=np.float64)
+        self.kappa = np.ascontiguousarray(config.kappa, dtype=np.float64)
+        self.mobility = np.ascontiguousarray(config.mobility_matrix, dtype=np.float64)
+        self.D = np.ascontiguousarray(config.D, dtype=np.float64)
+        self.variable = config.mobility is None
+        # rows are y, columns are x
+        self.h2 = (1.0 / float(config.dy) ** 2, 1.0 / float(config.dx) ** 2)
+        self._local = threading.local()
+
+    def _check(self, domain: NDArray) -> NDArray:
+        if domain.shape != self.shape:
+            raise ValueError(f"The plan is for shape {self.shape}, got {domain.shape}.")
+        return np.ascontiguousarray(domain, dtype=self.dtype)
+
+    def workspace(self) -> NDArray:
+        """
+        The potential work array of the calling thread.
+        """
+        mu = getattr(self._local, "mu", None)
+        if mu is None:
+            mu = self._local.mu = np.empty(self.shape, self.dtype)
+        return mu
+
+    def chemical_potential(self, domain: NDArray, out: NDArray = None) -> NDArray:
+        """
+        Returns the diffusion potentials of all components ``(C, nx, ny)``.
+        """
+        domain = self._check(domain)
+        out = np.empty(self.shape, self.dtype) if out is None else out
+        with stage("ch.chemical_potential"):
+            _potential.loop(2)(domain, out, self.h2, self.RT, self.omega, self.kappa)
+        return out
+
+    def step(self, domain: NDArray, out: NDArray = None) -> NDArray:
+        """
+        Returns the fields after one explicit Euler step (into `out`, not `domain`).
+        """
+        domain = self._check(domain)
+        mu = self.chemical_potential(domain, out=self.workspace())
+        out = np.empty(self.shape, self.dtype) if out is None else out
+        with stage("ch.flux"):
+            _step.loop(2)(domain, mu, out, self.h2, self.mobility, self.D, self.RT, self.variable, self.dt)
+        return out
+
+
+@lru_cache(maxsize=32)
+def _cached_plan(config, shape: Tuple[int, int], dtype: np.dtype) -> Cahn_Hilliard_2D_Multicomponent_Plan:
+    return Cahn_Hilliard_2D_Multicomponent_Plan(config, shape, dtype)
+
+
+def Cahn_Hilliard_2D_Multicomponent_Solver(domain: NDArray, c: Multicomponent_Configuration) -> NDArray:
+    """
+    N-component Cahn-Hilliard 2D phase-field model solver with finite differences
+    and periodic boundaries, one explicit Euler step of the ``(C, nx, ny)`` fields.
+    """
+    with stage("ch.step"):
+        count("cells", domain[0].size)
+        return _cached_plan(c, domain.shape[1:], domain.dtype).step(domain)
+
+
+class Cahn_Hilliard_2D_Multicomponent_Model(ModelND):
+    """
+    The Cahn-Hilliard 2D phase-field model of N-component solid solutions, the
+    states are the ``(C, nx, ny)`` fields of the components.
+
+    model = Cahn_Hilliard_2D_Multicomponent_Model(
+        domain=config.noisy_field(), solver=Cahn_Hilliard_2D_Multicomponent_Solver, c=config
+    )
+    for fields in model.solve(1000):
+        ...
+    """
+
+    def __init__(self, domain: NDArray, solver: Solver, **properties):
+        super().__init__(name=type(self).__name__, alias="ch_2d_nc", domain=domain, solver=solver)
+        if domain.ndim != 3:
+            raise ValueError("Domain must have the shape (components, nx, ny).")
+        self.properties = properties
+
+    def solve(self, steps: int = 10_000):
+        for n in range(steps):
+            with stage("model.step"):
+                self._states.append(self.solver(**self.properties, domain=self._states[-1]))
+            yield self._states[-1]
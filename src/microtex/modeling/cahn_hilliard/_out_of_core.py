@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+
+"""
+Out-of-core stepping of the Cahn-Hilliard 2D AB model for grids larger than RAM.
+
+The state lives in two memory mapped ``.npy`` files, a step reads the one and
+writes the other. The domain is swept in row bands: every band is read with
+two halo rows on each side (periodic wrap-around), the plan computes the
+chemical potential and the next state of the padded band, and the interior
+rows are written back. As for :code:`Distributed_Cahn_Hilliard_2D_AB_Runner`,
+the rows spoiled by the wrap-around of the padded band are exactly the halo
+rows, so the result is identical to the in-memory solver and a step is a
+single pass over the data.
+
+A reader thread prefetches the next band and a writer thread stores the
+previous one while the current band is computed, so the disk stays busy and
+only a few bands are held in memory whatever the grid size.
+
+.. code-block::python
+
+    solver = Cahn_Hilliard_2D_AB_Out_Of_Core_Solver(Configuration(nx=2**15, ny=2**15), '/scratch/run', memory=2**30)
+    solver.initialize(rng=2024)
+    state = solver.run(1000)       # np.memmap of the state after 1000 steps
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from microtex.modeling.cahn_hilliard._plan import get_plan
+from microtex.profiling import count, stage
+
+__all__ = tuple(["Cahn_Hilliard_2D_AB_Out_Of_Core_Solver"])
+
+
+# Halo rows of a band, two for the fourth-order term.
+HALO = 2
+# Arrays of band size held at once: two input and two output buffers and the plan workspace.
+_BAND_ARRAYS = 4 + 8
+
+
+class Cahn_Hilliard_2D_AB_Out_Of_Core_Solver:
+    """
+    Explicit Cahn-Hilliard 2D AB solver keeping the state in memory mapped files.
+
+    Params:
+        config: the model configuration
+        directory: the directory of the state files ``state0.npy`` and ``state1.npy``
+        band_rows: the number of rows computed at once (default from `memory`)
+        memory: the memory budget of the band buffers [bytes]
+
+    The current state is :code:`state`, a read-only :code:`np.memmap` which any
+    reader (:code:`np.load(..., mmap_mode='r')`) can open as well.
+
+    Usage:
+        solver = Cahn_Hilliard_2D_AB_Out_Of_Core_Solver(config, '/scratch/run')
+        solver.initialize(field)
+        for state in solver.iterate(1000):
+            ...
+    """
+
+    def __init__(self, config, directory, band_rows: int = None, memory: int = 256 * 2**20) -> None:
+        self.config = config
+        self.shape = (int(config.nx), int(config.ny))
+        self.dtype = config.dtype
+        if self.shape[0] < 2 * HALO:
+            raise ValueError(f"The grid needs at least {2 * HALO} rows, got {self.shape[0]}.")
+        if band_rows is None:
+            row_bytes = _BAND_ARRAYS * self.shape[1] * self.dtype.itemsize
+            band_rows = memory // row_bytes - 2 * HALO
+        self.band_rows = int(min(max(band_rows, HALO), self.shape[0]))
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.files = (self.directory / "state0.npy", self.directory / "state1.npy")
+        self._maps = [None, None]
+        self._current = 0
+        self.steps_done = 0
+
+    @property
+    def bands(self) -> Iterator[Tuple[int, int]]:
+        """
+        The half-open row intervals swept by a step.
+        """
+        for start in range(0, self.shape[0], self.band_rows):
+            yield start, min(start + self.band_rows, self.shape[0])
+
+    def _map(self, k: int) -> np.memmap:
+        if self._maps[k] is None:
+            path = self.files[k]
+            if path.exists():
+                self._maps[k] = np.load(path, mmap_mode="r+")
+            else:
+                self._maps[k] = np.lib.format.open_memmap(path, mode="w+", dtype=self.dtype, shape=self.shape)
+            if self._maps[k].shape != self.shape or self._maps[k].dtype != self.dtype:
+                raise ValueError(f"{path} does not hold a {self.dtype} field of shape {self.shape}.")
+        return self._maps[k]
+
+    @property
+    def state(self) -> np.memmap:
+        """
+        The current state (read-only view of the memory mapped file).
+        """
+        view = self._map(self._current).view()
+        view.flags.writeable = False
+        return view
+
+    def initialize(self, field: NDArray = None, noise: float = 0.01, rng=None) -> np.memmap:
+        """
+        Write the initial state, the given `field` (array or memmap) or uniform
+        noise around `c0` generated band by band (see :code:`Configuration.noisy_field`).
+        """
+        from microtex.rng import as_generator
+
+        state = self._map(self._current)
+        generator = as_generator(rng)
+        for start, stop in self.bands:
+            if field is not None:
+                state[start:stop] = field[start:stop]
+            else:
+                band = generator.random((stop - start, self.shape[1]))
+                state[start:stop] = self.config.c0 + band * noise - noise / 2
+        state.flush()
+        self.steps_done = 0
+        return self.state
+
+    def _read(self, source: NDArray, start: int, stop: int, out: NDArray) -> NDArray:
+        """
+        Copy the rows ``[start - HALO, stop + HALO)`` of `source` (periodic) into `out`.
+        """
+        nx = self.shape[0]
+        with stage("ooc.read"):
+            if start >= HALO and stop + HALO <= nx:
+                np.copyto(out, source[start - HALO : stop + HALO])
+            else:
+                np.take(source, np.arange(start - HALO, stop + HALO) % nx, axis=0, out=out)
+        return out
+
+    def _write(self, target: NDArray, start: int, stop: int, band: NDArray) -> None:
+        with stage("ooc.write"):
+            target[start:stop] = band[HALO:-HALO]
+
+    def step(self) -> np.memmap:
+        """
+        Make one time step, a single pass over the state files.
+
+        :return: The new state.
+        """
+        source = self._map(self._current)
+        target = self._map(1 - self._current)
+        bands = list(self.bands)
+        padded = (self.band_rows + 2 * HALO, self.shape[1])
+        inputs = [np.empty(padded, self.dtype) for _ in range(2)]
+        outputs = [np.empty(padded, self.dtype) for _ in range(2)]
+        writes = [None, None]
+
+        with stage("ch.step"), ThreadPoolExecutor(1) as reader, ThreadPoolExecutor(1) as writer:
+            count("cells", source.size)
+            start, stop = bands[0]
+            pending = reader.submit(self._read, source, start, stop, inputs[0][: stop - start + 2 * HALO])
+            for k, (start, stop) in enumerate(bands):
+                band = pending.result()
+                if k + 1 < len(bands):
+                    following = bands[k + 1]
+                    buffer = inputs[(k + 1) % 2][: following[1] - following[0] + 2 * HALO]
+                    pending = reader.submit(self._read, source, *following, buffer)
+                # the output buffer is reused once its write two bands ago finished
+                if writes[k % 2] is not None:
+                    writes[k % 2].result()
+                out = outputs[k % 2][: band.shape[0]]
+                plan = get_plan(self.config, band.shape, self.dtype)
+                plan.step(band, out=out)
+                writes[k % 2] = writer.submit(self._write, target, start, stop, out)
+            for write in writes:
+                if write is not None:
+                    write.result()
+
+        self._current = 1 - self._current
+        self.steps_done += 1
+        return self.state
+
+    def iterate(self, steps: int) -> Iterator[np.memmap]:
+        """
+        Make `steps` time steps, yielding the state after each of them.
+        """
+        for _ in range(steps):
+            yield self.step()
+
+    def run(self, steps: int) -> np.memmap:
+        """
+        Make `steps` time steps and flush the state to disk.
+
+        :return: The final state.
+        """
+        for _ in self.iterate(steps):
+            pass
+        self.flush()
+        return self.state
+
+    def flush(self) -> None:
+        """
+        Write the modified pages of the state files to disk.
+        """
+        for state in self._maps:
+            if state is not None:
+                state.flush()
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+"""
+Precompiled Cahn-Hilliard solver plans.
+
+Like an FFTW plan, a :code:`Cahn_Hilliard_2D_AB_Plan` is created once for a
+configuration, grid shape and dtype. It precomputes the scalar coefficients
+(diffusion coefficients, mobility prefactor, grid spacings) and keeps
+per-thread work arrays. A time step is
+two fused passes of the compiled stencil engine (:code:`microtex.numerics.stencil`):
+the chemical potential into a work array and the flux with the Euler update
+into the result.
+
+Plans are cached by :code:`get_plan`, keyed by the (hashable, frozen)
+configuration, so repeated and ensemble runs with equal configurations share
+the same plan.
+
+.. code-block::python
+
+    plan = get_plan(config)
+    for n in range(steps):
+        field = plan.step(field)
+"""
+
+from __future__ import annotations
+
+import threading
+from functools import cached_property, lru_cache
+from typing import Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from microtex.modeling._kernels import ab_rate, ab_step, chemical_potential
+from microtex.numerics.stencil import laplacian
+from microtex.profiling import stage
+from microtex.quantities import R
+
+__all__ = tuple(["Cahn_Hilliard_2D_AB_Plan", "get_plan"])
+
+
+_WORKSPACE = ("mu",)
+
+
+class Cahn_Hilliard_2D_AB_Plan:
+    """
+    Solver plan of the Cahn-Hilliard 2D AB model for one configuration, grid and dtype.
+
+    Params:
+        config: the model configuration
+        shape: the grid shape (default ``(nx, ny)``), e.g. a row band with halos
+        dtype: the dtype of fields (default the configuration precision)
+
+    The plan computes the same finite difference right-hand side as
+    :code:`Cahn_Hilliard_2D_AB_Solver`, reusing work arrays between calls. The
+    work arrays are per thread, a plan can be shared by threads.
+    """
+
+    def __init__(self, config, shape: Tuple[int, int] = None, dtype=None) -> None:
+        self.config = config
+        self.shape = (int(config.nx), int(config.ny)) if shape is None else tuple(shape)
+        self.dtype = config.dtype if dtype is None else np.dtype(dtype)
+        if len(self.shape) != 2 or min(self.shape) < 3:
+            raise ValueError(f"The plan needs a 2D grid of at least 3x3 points, got {self.shape}.")
+
+        # the kernels compute in double precision and return fields of the plan dtype
+        self.Da = config.Da
+        self.Db = config.Db
+        self.dt = float(config.dt)
+        self.RT = float(R * config.T)
+        self.omega = float(config.omega)
+        self.kappa = float(config.kappa)
+        self.DbDa = self.Db / self.Da
+        self.mobility = self.Da / self.RT
+        # rows are y, columns are x
+        self.spacing = (float(config.dy), float(config.dx))
+        self._local = threading.local()
+
+    @cached_property
+    def max_mobility(self) -> float:
+        """
+        Maximum of the concentration dependent mobility over ``0 <= c <= 1``.
+        """
+        x = np.linspace(0.0, 1.0, 1001)
+        return float(np.max((x * self.Db + (1.0 - x) * self.Da) * x * (1.0 - x) / self.RT))
+
+    def workspace(self) -> dict:
+        """
+        Work arrays of the calling thread.
+        """
+        work = getattr(self._local, "work", None)
+        if work is None:
+            work = self._local.work = {name: np.empty(self.shape, self.dtype) for name in _WORKSPACE}
+        return work
+
+    def laplacian(self, a: NDArray, out: NDArray = None) -> NDArray:
+        """
+        Periodic 5-point Laplacian of `a` into `out`.
+        """
+        return laplacian(a, spacing=self.spacing, out=out)
+
+    def chemical_potential(self, domain: NDArray, out: NDArray = None) -> NDArray:
+        """
+        Returns the diffusion potential ``RT (ln c - ln(1 - c)) + omega (1 - 2c) - kappa laplacian(c)``.
+        """
+        if domain.shape != self.shape:
+            raise ValueError(f"The plan is for shape {self.shape}, got {domain.shape}.")
+        with stage("ch.chemical_potential"):
+            return chemical_potential(domain, spacing=self.spacing, params=(self.RT, self.omega, self.kappa), out=out)
+
+    def rate(self, domain: NDArray, out: NDArray = None) -> NDArray:
+        """
+        Returns the time derivative of the concentration field.
+        """
+        mu = self.chemical_potential(domain, out=self.workspace()["mu"])
+        with stage("ch.flux"):
+            return ab_rate(domain, mu, spacing=self.spacing, params=(self.mobility, self.DbDa), out=out)
+
+    def step(self, domain: NDArray, out: NDArray = None) -> NDArray:
+        """
+        Returns the field after one explicit Euler step (into `out`, not `domain`).
+        """
+        mu = self.chemical_potential(domain, out=self.workspace()["mu"])
+        with stage("ch.flux"):
+            return ab_step(domain, mu, spacing=self.spacing, params=(self.mobility, self.DbDa, self.dt), out=out)
+
+
+@lru_cache(maxsize=32)
+def _cached_plan(config, shape: Tuple[int, int], dtype: np.dtype) -> Cahn_Hilliard_2D_AB_Plan:
+    return Cahn_Hilliard_2D_AB_Plan(config, shape, dtype)
+
+
+def get_plan(config, shape: Tuple[int, int] = None, dtype=None) -> Cahn_Hilliard_2D_AB_Plan:
+    """
+    Returns the cached plan of the configuration, grid shape and dtype.
+    """
+    shape = (int(config.nx), int(config.ny)) if shape is None else tuple(int(n) for n in shape)
+    dtype = config.dtype if dtype is None else np.dtype(dtype)
+    return _cached_plan(config, shape, dtype)
@@ -14,6 +14,9 @@ from typing import Tuple
 import numpy as np
 from numpy.typing import NDArray
 
+from microtex.modeling._model import configuration_digest
+from microtex.modeling.cahn_hilliard._plan import get_plan
+from microtex.profiling import count, stage
 from microtex.quantities import R
 
 
@@ -35,46 +38,68 @@ class Configuration:
     Aa: float = 1.0
     Qb: float = 240000.0
     Ab: float = 1.0
+    precision: str = "float64"  # Floating point type of fields ('float32' or 'float64')
+
+    def __post_init__(self):
+        if self.precision not in ("float32", "float64"):
+            raise ValueError(f"Unsupported precision '{self.precision}'.")
+
+    @property
+    def dtype(self) -> np.dtype:
+        """
+        The numpy dtype of fields.
+        """
+        return np.dtype(self.precision)
 
     @property
     def Da(self) -> float:
         """
         Diffusion coefficient of A atom [m2/s].
         """
-        return self.Aa * np.exp(-self.Qa / R / self.T)
+        # Python float, a numpy scalar would promote float32 fields to float64.
+        return float(self.Aa * np.exp(-self.Qa / R / self.T))
 
     @property
     def Db(self) -> float:
         """
         Diffusion coefficient of B atom [m2/s].
         """
-        return self.Ab * np.exp(-self.Qb / R / self.T)
+        return float(self.Ab * np.exp(-self.Qb / R / self.T))
 
     @property
     def D(self) -> Tuple:
         return self.Da, self.Db
 
+    @property
+    def digest(self) -> str:
+        """
+        Stable SHA-256 digest of the configuration values.
+        """
+        return configuration_digest(self)
+
     @classmethod
     def keys(self):
-        return ['T', 'nx', 'ny', 'dx', 'dy', 'c0', 'kappa', 'omega', 'Da', 'Db', 'dt']
+        return ['T', 'nx', 'ny', 'dx', 'dy', 'c0', 'kappa', 'omega', 'Da', 'Db', 'dt', 'precision']
 
     def __getitem__(self, key):
         return getattr(self, key)
 
-    def noisy_field(self, noise=0.01) -> NDArray:
-        return self.c0 + np.random.rand(self.nx, self.ny) * noise - noise / 2
+    def noisy_field(self, noise=0.01, rng=None) -> NDArray:
+        """
+        Uniform noise of amplitude `noise` around `c0`, drawn from `rng` (a seed,
+        :code:`Random_Stream` or generator, default fresh entropy).
+        """
+        from microtex.rng import as_generator
+
+        field = self.c0 + as_generator(rng).random((int(self.nx), int(self.ny))) * noise - noise / 2
+        return field.astype(self.dtype, copy=False)
 
 
-def _get_neighbours(c: NDArray) -> Tuple[NDArray, NDArray, NDArray, NDArray]:
-    """Returns rolled arrays representing four neighbour values
-    east(E), west (W), south (S) and north (N)
+def _rate(domain: NDArray, c: Configuration) -> NDArray:
+    """
+    Returns the time derivative of the concentration field, see :code:`Cahn_Hilliard_2D_AB_Solver`.
     """
-    return (
-        np.roll(c, -1, axis=1),
-        np.roll(c, 1, axis=1),
-        np.roll(c, -1, axis=0),
-        np.roll(c, 1, axis=0),
-    )
+    return get_plan(c, domain.shape, domain.dtype).rate(domain)
 
 
 def Cahn_Hilliard_2D_AB_Solver(domain: NDArray, c: Configuration) -> NDArray:
@@ -84,6 +109,8 @@ def Cahn_Hilliard_2D_AB_Solver(domain: NDArray, c: Configuration) -> NDArray:
     The numpy vectorized version of Cahn-Hilliard solver.
     Update a conserved order parameter, in our case, the concetration field $c(\vb{x}, t)$.
     Calculate free energy derivative at domain nodes.
+    The derived coefficients and work arrays come from the cached plan of the
+    configuration, see :code:`Cahn_Hilliard_2D_AB_Plan`.
     The four neighbour nodes of the central node (C) are east(E), west (W),north (N)
     and south (S).
 
@@ -93,37 +120,9 @@ def Cahn_Hilliard_2D_AB_Solver(domain: NDArray, c: Configuration) -> NDArray:
              |
              S
     """
-    # Chemical potential term.
-    mu_chem = R * c.T * (np.log(domain) - np.log(1.0 - domain)) + c.omega * (1.0 - 2.0 * domain)
-
-    # Gradient potential term.
-    c_e, c_w, c_s, c_n = _get_neighbours(domain)
-    mu_grad = -c.kappa * (
-        (c_e - 2.0 * domain + c_w) / c.dx / c.dx + (c_n - 2.0 * domain + c_s) / c.dy / c.dy
-    )
-
-    # Total chemical potential.
-    mu = mu_chem + mu_grad
-
-    # Gradient of chemical potential
-    mu_e, mu_w, mu_s, mu_n = _get_neighbours(mu)
-    nabla_mu = (mu_w - 2.0 * mu + mu_e) / c.dx / c.dx + (mu_n - 2.0 * mu + mu_s) / c.dy / c.dy
-
-    DbDa = c.Db / c.Da
-
-    M = (c.Da / R / c.T) * (domain + DbDa * (1.0 - domain)) * domain * (1.0 - domain)
-
-    dm_dc = (c.Da / R / c.T) * (
-        (1.0 - DbDa) * domain * (1.0 - domain)
-        + (domain + DbDa * (1.0 - domain)) * (1.0 - 2.0 * domain)
-    )
-
-    dc2_dx2 = ((c_e - c_w) * (mu_e - mu_w)) / (4.0 * c.dx * c.dx)
-    dc2_dy2 = ((c_n - c_s) * (mu_n - mu_s)) / (4.0 * c.dy * c.dy)
-
-    dc_dt = M * nabla_mu + dm_dc * (dc2_dx2 + dc2_dy2)
-
-    return domain + dc_dt * c.dt
+    with stage("ch.step"):
+        count("cells", domain.size)
+        return get_plan(c, domain.shape, domain.dtype).step(domain)
 
 
 def Cahn_Hilliard_1D_AB_Solver_Naive(domain: NDArray, c: Configuration) -> NDArray:
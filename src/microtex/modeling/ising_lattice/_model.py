@@ -3,17 +3,13 @@
 import warnings
 from typing import Tuple
 
-import matplotlib.pyplot as plt
 import numpy as np
-from IPython.display import clear_output
-from matplotlib import animation
-from numpy.random import rand
 from overrides import overrides
-from tqdm import tqdm_notebook as tqdm
 
 warnings.filterwarnings("ignore", category=RuntimeWarning)
 
-from microtex.modeling import Model2D
+from microtex.modeling import Model2D, ModelError
+from microtex.rng import as_generator
 
 
 class Ising_Lattice_2D_AB_Model(Model2D):
@@ -31,14 +27,21 @@ class Ising_Lattice_2D_AB_Model(Model2D):
 
     :param equstep:
     :param calcstep:
+    :param rng: Seed, :code:`Random_Stream` or generator of the run (default fresh entropy).
+
+    The random numbers of a sweep (sites and acceptance thresholds) are drawn
+    in bulk, one block per sweep.
     """
 
-    def __init__(self, N, temp, kinetics, temp_point, temp_range, equistep, calcstep):
+    def __init__(self, N, temp, kinetics, temp_point, temp_range, equistep, calcstep, rng=None):
+
+        self.rng = as_generator(rng)
+        self.state = 2 * self.rng.integers(2, size=(N, N)) - 1
 
         super().__init__(
             name="Ising Lattice 2D",
             alias="ising2D",
-            domain=None,
+            domain=self.state,
             solver=None,
             config=None,
         )
@@ -47,7 +50,6 @@ class Ising_Lattice_2D_AB_Model(Model2D):
         self.kinetics = kinetics
         self.temp_point = temp_point
         self.beta = 1.0 / temp
-        self.state = 2 * np.random.randint(2, size=(N, N)) - 1
 
         self.low_T = temp_range[0]
         self.high_T = temp_range[1]
@@ -137,8 +139,7 @@ class Ising_Lattice_2D_AB_Model(Model2D):
         spin_1, spin_2 = 0, 0
         while spin_1 == spin_2:
             # Choose randomly 2 dinstinct sites i & j
-            row_1, col_1 = np.random.randint(0, self.N), np.random.randint(0, self.N)
-            row_2, col_2 = np.random.randint(0, self.N), np.random.randint(0, self.N)
+            row_1, col_1, row_2, col_2 = self.rng.integers(0, self.N, size=4).tolist()
             spin_1, spin_2 = self.state[row_1, col_1], self.state[row_2, col_2]
 
         return ((row_1, col_1), (row_2, col_2))
@@ -147,92 +148,67 @@ class Ising_Lattice_2D_AB_Model(Model2D):
         """
         Simulate one time step with Glauber kinetics.
         """
-        for i in range(self.N):
-            for j in range(self.N):
-                row, col = np.random.randint(0, self.N), np.random.randint(0, self.N)
-                spin = self.state[row, col]
-
-                # Finding nearest neighbour with periodic boundary condition.
-                bottom = self.state[(row + 1) % self.N, col]
-                right = self.state[row, (col + 1) % self.N]
-                left = self.state[(row - 1) % self.N, col]
-                top = self.state[row, (col - 1) % self.N]
-
-                neighbours = bottom + right + left + top
-
-                # Calculate ∆E = E_nu - E_mu = 2E_nu
-                delta_e = 2 * spin * neighbours
-
-                # If ∆E ≤ 0, spin flip always flipped
-                if delta_e < 0:
-                    spin *= -1
-
-                # Else, flipped with P = exp(-∆E/kT)
-                elif rand() < np.exp(-delta_e * self.beta):
-                    spin *= -1
-
-                self.state[row, col] = spin
+        N, state = self.N, self.state
+        # One block of random numbers per sweep, Python lists index fastest.
+        rows, cols = self.rng.integers(0, N, size=(2, N * N)).tolist()
+        thresholds = self.rng.random(N * N).tolist()
+        # Boltzmann factors of the possible ∆E = 4, 8
+        boltzmann = {4: np.exp(-4 * self.beta), 8: np.exp(-8 * self.beta)}
+
+        for row, col, u in zip(rows, cols, thresholds):
+            spin = state[row, col]
+
+            # Finding nearest neighbour with periodic boundary condition.
+            neighbours = (
+                state[(row + 1) % N, col]
+                + state[row, (col + 1) % N]
+                + state[(row - 1) % N, col]
+                + state[row, (col - 1) % N]
+            )
+
+            # Calculate ∆E = E_nu - E_mu = 2E_nu
+            delta_e = 2 * spin * neighbours
+
+            # If ∆E ≤ 0, spin flip always flipped, else flipped with P = exp(-∆E/kT)
+            if delta_e <= 0 or u < boltzmann[delta_e]:
+                state[row, col] = -spin
 
     def kawasaki(self) -> None:
         """
         Simulate one-time step with Kawasaki dynamics.
         """
-        for i in range(self.N):
-            for j in range(self.N):
-                # Choose the random spins.
-                r1, c1 = np.random.randint(0, self.N), np.random.randint(0, self.N)
-                r2, c2 = np.random.randint(0, self.N), np.random.randint(0, self.N)
-                s1, s2 = self.state[r1, c1], self.state[r2, c2]
-
-                # Check if cells are same, if so, choose other spins.
-                if r1 == r2 and c1 == c2:
-                    ((r1, c1), (r2, c2)) = self.different_lattice()
-                    s1, s2 = self.state[r1, c1], self.state[r2, c2]
-
-                # Consider the exchange as two consecutive single spin flips.
-                # Find the nearest neighbor with periodic boundary conditions.
-
-                # top, right, bottom, left neighbours
-                t1 = self.state[r1, (c1 - 1) % self.N]
-                t2 = self.state[r2, (c2 - 1) % self.N]
-
-                r1 = self.state[r1, (c1 + 1) % self.N]
-                r2 = self.state[r2, (c2 + 1) % self.N]
-
-                b1 = self.state[(r1 + 1) % self.N, c1]
-                b2 = self.state[(r2 + 1) % self.N, c2]
+        N, state = self.N, self.state
+        sites = self.rng.integers(0, N, size=(4, N * N)).tolist()
+        thresholds = self.rng.random(N * N).tolist()
 
-                l1 = self.state[(r1 - 1) % self.N, c1]
-                l2 = self.state[(r2 - 1) % self.N, c2]
+        for r1, c1, r2, c2, u in zip(*sites, thresholds):
+            s1, s2 = state[r1, c1], state[r2, c2]
 
-                n1 = b1 + r1 + l1 + t1  # neighbour 1
-                n2 = b2 + r2 + l2 + t2  # neighbour 2
+            # Exchanging equal spins changes nothing.
+            if s1 == s2:
+                continue
 
-                # Calculate ∆E as a sum of E changes for 2 moves separately.
-                ΔE = (2 * s1 * n1) + (2 * s2 * n2)
+            # Consider the exchange as two consecutive single spin flips.
+            # Sum of the nearest neighbours with periodic boundary conditions.
+            n1 = state[(r1 + 1) % N, c1] + state[r1, (c1 + 1) % N] + state[(r1 - 1) % N, c1] + state[r1, (c1 - 1) % N]
+            n2 = state[(r2 + 1) % N, c2] + state[r2, (c2 + 1) % N] + state[(r2 - 1) % N, c2] + state[r2, (c2 - 1) % N]
 
-                # If ΔE decreased then exchange is made, else the exchange is made with P = exp(-∆E/kT)
-                if ΔE < 0:
-                    s1 *= -1
-                    s2 *= -1
-                    # print("flip A")
-                elif rand() < np.exp(-ΔE * self.beta):
-                    s1 *= -1
-                    s2 *= -1
-                    # print("flip B")
-                self.state[r1, c1], self.state[r2, c2] = s1, s2
+            # Calculate ∆E as a sum of E changes for 2 moves separately,
+            # the bond of neighbouring sites is counted twice by the single flips.
+            ΔE = (2 * s1 * n1) + (2 * s2 * n2)
+            if (r1 == r2 and (c1 - c2) % N in (1, N - 1)) or (c1 == c2 and (r1 - r2) % N in (1, N - 1)):
+                ΔE -= 4 * s1 * s2
 
-        # print(self.T)
+            # If ΔE decreased then exchange is made, else the exchange is made with P = exp(-∆E/kT)
+            if ΔE <= 0 or u < np.exp(-ΔE * self.beta):
+                state[r1, c1], state[r2, c2] = s2, s1
 
     @overrides
     def solve(self) -> "array":
         """
         Monte Carlo simulation step to modify lattice with selected kinetics.
         """
-        try:
-            getattr(self, self.kinetics)()
-            # self.kawasaki()
-            # print(f"{i + 1}. SIMULATION DONE")
-        except Exception:
-            raise IsingError("Unknown kinetics given.")
+        if self.kinetics not in ("glauber", "kawasaki"):
+            raise ModelError("Unknown kinetics given.")
+        getattr(self, self.kinetics)()
         return self.state.copy()  # MUST be copy!
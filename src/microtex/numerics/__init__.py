@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+
+"""
+Numerical building blocks shared by the solvers e.g. sparse finite difference operators.
+"""
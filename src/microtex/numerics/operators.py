@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+"""
+Sparse finite difference operators for periodic 2D grids.
+
+The operators act on fields flattened in C order, ``field.ravel()``, of shape
+``(nx, ny)``. The axes follow :code:`Cahn_Hilliard_2D_AB_Solver`: the spacing
+`dx` is used along the columns (axis 1) and `dy` along the rows (axis 0).
+
+The matrices are cached by ``(nx, ny, dx, dy)`` and shared between the callers,
+so they must not be modified in place.
+
+Example:
+    >>> L = laplacian_2d(4, 4, 1.0, 1.0)
+    >>> L @ np.ones(16)  # zero for constant fields
+"""
+
+from functools import lru_cache
+
+import numpy as np
+import scipy.sparse as sp
+
+__all__ = tuple(["second_difference_1d", "laplacian_2d", "biharmonic_2d"])
+
+
+def second_difference_1d(n: int, h: float) -> sp.csr_matrix:
+    """
+    The periodic 1D second difference matrix ``(u[i-1] - 2u[i] + u[i+1]) / h^2``.
+    """
+    i = np.arange(n)
+    rows = np.concatenate([i, i, i])
+    cols = np.concatenate([(i - 1) % n, i, (i + 1) % n])
+    data = np.concatenate([np.ones(n), -2.0 * np.ones(n), np.ones(n)]) / (h * h)
+    # Duplicate entries (n <= 2) are summed by the conversion.
+    return sp.coo_matrix((data, (rows, cols)), shape=(n, n)).tocsr()
+
+
+@lru_cache(maxsize=16)
+def laplacian_2d(nx: int, ny: int, dx: float, dy: float) -> sp.csr_matrix:
+    """
+    The periodic 5-point Laplacian matrix of size ``(nx * ny, nx * ny)``.
+    """
+    nx, ny = int(nx), int(ny)
+    return (
+        sp.kron(sp.eye(nx), second_difference_1d(ny, dx))
+        + sp.kron(second_difference_1d(nx, dy), sp.eye(ny))
+    ).tocsr()
+
+
+@lru_cache(maxsize=16)
+def biharmonic_2d(nx: int, ny: int, dx: float, dy: float) -> sp.csr_matrix:
+    """
+    The periodic 13-point biharmonic matrix, the square of :code:`laplacian_2d`.
+    """
+    L = laplacian_2d(nx, ny, dx, dy)
+    return (L @ L).tocsr()
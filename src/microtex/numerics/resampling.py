@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+"""
+Resampling of fields to coarser grids.
+"""
+
+import numpy as np
+from numpy.typing import NDArray
+
+__all__ = tuple(["block_mean", "halve"])
+
+
+def block_mean(field: NDArray, factor: int) -> NDArray:
+    """
+    Downsample by the means of ``factor x factor`` blocks over the last two
+    axes, the edges which do not fill a block are cropped.
+    """
+    if factor <= 1:
+        return field
+    *batch, h, w = field.shape
+    h, w = (h // factor) * factor, (w // factor) * factor
+    blocks = field[..., :h, :w].reshape(*batch, h // factor, factor, w // factor, factor)
+    return blocks.mean(axis=(-3, -1), dtype=np.float64).astype(np.result_type(field.dtype, np.float32))
+
+
+def halve(field: NDArray) -> NDArray:
+    """
+    Means of ``2 x 2`` blocks over the last two axes in the precision of the
+    field (at least single), faster than :code:`block_mean(field, 2)`.
+    """
+    *batch, h, w = field.shape
+    a = field[..., : h - h % 2, : w - w % 2]
+    dtype = np.result_type(field.dtype, np.float32)
+    result = a[..., 0::2, 0::2].astype(dtype)
+    result += a[..., 1::2, 0::2]
+    result += a[..., 0::2, 1::2]
+    result += a[..., 1::2, 1::2]
+    result *= 0.25
+    return result
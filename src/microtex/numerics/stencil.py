@@ -0,0 +1,472 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compiled finite difference stencils on periodic 1D, 2D and 3D grids.
+
+A stencil kernel makes one pass over the grid: at every node it evaluates
+the second order central Laplacian (and for the flux kernels the dot
+product of the central gradients of two fields) and hands them to a
+pointwise function, whose result is written to the output. The pointwise
+terms of a model (chemical potential, mobility, time step) are thereby fused
+into the stencil pass, without temporary arrays.
+
+.. code-block::python
+
+    def potential(c, lap, params):
+        RT, omega, kappa = params
+        return RT * (np.log(c) - np.log(1.0 - c)) + omega * (1.0 - 2.0 * c) - kappa * lap
+
+    chemical_potential = fused_laplacian(potential, params=3)
+    mu = chemical_potential(c, spacing=(dy, dx), params=(RT, omega, kappa))
+
+The kernels are compiled by numba on first use of a dimension, for float32
+and float64 fields (explicit signatures), numba is imported then, not with
+this module. The compiled loops are cached on disk in :code:`kernel_cache_dir`
+(``MICROTEX_KERNEL_CACHE``): the source of a kernel is written to a module
+there, which numba caches, so a process loads the kernels compiled by any
+earlier one. ``microtex warmup`` (:code:`warmup`) compiles all kernels of the
+models ahead of short-lived workers sharing the directory, without a
+writable directory the kernels are compiled in memory. The kernels release
+the GIL, so threads (e.g. row bands) can run them concurrently. The spacing
+is given per axis in axis order, for the ``(nx, ny)`` fields of the 2D
+models that is ``(dy, dx)``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import inspect
+import os
+import sys
+import textwrap
+import threading
+import time
+import types
+from typing import TYPE_CHECKING, Callable, Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+from numpy.typing import NDArray
+
+from microtex.profiling import stage
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+__all__ = tuple(
+    [
+        "Compiled_Kernel",
+        "Stencil_Kernel",
+        "fused_laplacian",
+        "fused_flux",
+        "laplacian",
+        "gradient_dot",
+        "biharmonic",
+        "kernel_cache_dir",
+        "warmup",
+        "PRECISIONS",
+        "WARMUP_MODULES",
+    ]
+)
+
+
+# The loop templates: the source of a template and of the pointwise function
+# are written to a kernel module in the cache directory, where `_point` is the
+# compiled pointwise function (see Compiled_Kernel.source).
+
+
+def _laplacian_1d(a, out, h2, params):
+    n0 = a.shape[0]
+    for i in range(n0):
+        im = i - 1 if i > 0 else n0 - 1
+        ip = i + 1 if i < n0 - 1 else 0
+        ac = a[i]
+        lap = (a[im] + a[ip] - 2.0 * ac) * h2[0]
+        out[i] = _point(ac, lap, params)  # noqa: F821
+
+
+def _laplacian_2d(a, out, h2, params):
+    n0, n1 = a.shape
+    for i in range(n0):
+        im = i - 1 if i > 0 else n0 - 1
+        ip = i + 1 if i < n0 - 1 else 0
+        for j in range(n1):
+            jm = j - 1 if j > 0 else n1 - 1
+            jp = j + 1 if j < n1 - 1 else 0
+            ac = a[i, j]
+            lap = (a[im, j] + a[ip, j] - 2.0 * ac) * h2[0] + (a[i, jm] + a[i, jp] - 2.0 * ac) * h2[1]
+            out[i, j] = _point(ac, lap, params)  # noqa: F821
+
+
+def _laplacian_3d(a, out, h2, params):
+    n0, n1, n2 = a.shape
+    for i in range(n0):
+        im = i - 1 if i > 0 else n0 - 1
+        ip = i + 1 if i < n0 - 1 else 0
+        for j in range(n1):
+            jm = j - 1 if j > 0 else n1 - 1
+            jp = j + 1 if j < n1 - 1 else 0
+            for k in range(n2):
+                km = k - 1 if k > 0 else n2 - 1
+                kp = k + 1 if k < n2 - 1 else 0
+                ac = a[i, j, k]
+                lap = (
+                    (a[im, j, k] + a[ip, j, k] - 2.0 * ac) * h2[0]
+                    + (a[i, jm, k] + a[i, jp, k] - 2.0 * ac) * h2[1]
+                    + (a[i, j, km] + a[i, j, kp] - 2.0 * ac) * h2[2]
+                )
+                out[i, j, k] = _point(ac, lap, params)  # noqa: F821
+
+
+# the flux loops take the Laplacian of b and the gradient product of a and b
+
+
+def _flux_1d(a, b, out, h2, params):
+    n0 = a.shape[0]
+    w0 = 0.25 * h2[0]
+    for i in range(n0):
+        im = i - 1 if i > 0 else n0 - 1
+        ip = i + 1 if i < n0 - 1 else 0
+        bc = b[i]
+        lap = (b[im] + b[ip] - 2.0 * bc) * h2[0]
+        grad = (a[ip] - a[im]) * (b[ip] - b[im]) * w0
+        out[i] = _point(a[i], bc, lap, grad, params)  # noqa: F821
+
+
+def _flux_2d(a, b, out, h2, params):
+    n0, n1 = a.shape
+    w0, w1 = 0.25 * h2[0], 0.25 * h2[1]
+    for i in range(n0):
+        im = i - 1 if i > 0 else n0 - 1
+        ip = i + 1 if i < n0 - 1 else 0
+        for j in range(n1):
+            jm = j - 1 if j > 0 else n1 - 1
+            jp = j + 1 if j < n1 - 1 else 0
+            bc = b[i, j]
+            lap = (b[im, j] + b[ip, j] - 2.0 * bc) * h2[0] + (b[i, jm] + b[i, jp] - 2.0 * bc) * h2[1]
+            grad = (a[ip, j] - a[im, j]) * (b[ip, j] - b[im, j]) * w0 + (a[i, jp] - a[i, jm]) * (
+                b[i, jp] - b[i, jm]
+            ) * w1
+            out[i, j] = _point(a[i, j], bc, lap, grad, params)  # noqa: F821
+
+
+def _flux_3d(a, b, out, h2, params):
+    n0, n1, n2 = a.shape
+    w0, w1, w2 = 0.25 * h2[0], 0.25 * h2[1], 0.25 * h2[2]
+    for i in range(n0):
+        im = i - 1 if i > 0 else n0 - 1
+        ip = i + 1 if i < n0 - 1 else 0
+        for j in range(n1):
+            jm = j - 1 if j > 0 else n1 - 1
+            jp = j + 1 if j < n1 - 1 else 0
+            for k in range(n2):
+                km = k - 1 if k > 0 else n2 - 1
+                kp = k + 1 if k < n2 - 1 else 0
+                bc = b[i, j, k]
+                lap = (
+                    (b[im, j, k] + b[ip, j, k] - 2.0 * bc) * h2[0]
+                    + (b[i, jm, k] + b[i, jp, k] - 2.0 * bc) * h2[1]
+                    + (b[i, j, km] + b[i, j, kp] - 2.0 * bc) * h2[2]
+                )
+                grad = (
+                    (a[ip, j, k] - a[im, j, k]) * (b[ip, j, k] - b[im, j, k]) * w0
+                    + (a[i, jp, k] - a[i, jm, k]) * (b[i, jp, k] - b[i, jm, k]) * w1
+                    + (a[i, j, kp] - a[i, j, km]) * (b[i, j, kp] - b[i, j, km]) * w2
+                )
+                out[i, j, k] = _point(a[i, j, k], bc, lap, grad, params)  # noqa: F821
+
+
+_TEMPLATES = {
+    "laplacian": (_laplacian_1d, _laplacian_2d, _laplacian_3d),
+    "flux": (_flux_1d, _flux_2d, _flux_3d),
+}
+_ARITY = {"laplacian": 1, "flux": 2}
+PRECISIONS = ("float32", "float64")
+
+_MODULE = """# Generated by microtex.numerics.stencil, do not edit.
+
+import math
+
+import numba
+import numpy as np
+{helpers}
+{template}
+
+loop = numba.njit({signatures!r}, nogil=True, cache={cache})({template_name})
+"""
+
+_HELPER = """
+{source}
+{alias} = numba.njit(inline="always")({name})
+"""
+
+_KERNELS: List["Compiled_Kernel"] = []
+
+# the modules defining the kernels of the models, compiled by warmup
+WARMUP_MODULES = ("microtex.modeling._kernels", "microtex.modeling.cahn_hilliard._multicomponent")
+
+
+def kernel_cache_dir() -> Path:
+    """
+    Returns the directory of the compiled kernels: ``MICROTEX_KERNEL_CACHE``,
+    else ``$XDG_CACHE_HOME/microtex/kernels`` (default ``~/.cache``).
+    """
+    from pathlib import Path
+
+    directory = os.environ.get("MICROTEX_KERNEL_CACHE")
+    if directory:
+        return Path(directory)
+    return Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "microtex" / "kernels"
+
+
+def _write_if_changed(path: Path, text: str) -> None:
+    # numba keys its cache to the modification time of the source, keep it unless the text changed
+    try:
+        if path.read_text() == text:
+            return
+    except OSError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    temporary.write_text(text)
+    os.replace(temporary, path)
+
+
+def _inverse_squares(spacing: Union[float, Sequence[float]], ndim: int) -> Tuple[float, ...]:
+    spacing = np.broadcast_to(np.asarray(spacing, dtype=np.float64), (ndim,))
+    return tuple(1.0 / (float(h) * float(h)) for h in spacing)
+
+
+class Compiled_Kernel:
+    """
+    A numba loop compiled on first use of a grid dimension and cached on disk.
+
+    The source of the loop template of the dimension and of its helper
+    functions is written to a module in :code:`kernel_cache_dir`, which numba
+    compiles with explicit signatures and caches, so other processes load the
+    loop instead of compiling it. Without a writable cache directory the loop
+    is compiled in memory, for this process only. The kernels of the models
+    are defined at module level with `register`, so :code:`warmup` compiles them.
+
+    Params:
+        name: the name of the kernel
+        templates: the module level loop function of every dimension (its source is compiled)
+        signatures: returns the numba signatures of a dimension
+        helpers: module level functions called by the templates, by the name they are called
+        register: compile the kernel in :code:`warmup`
+    """
+
+    def __init__(
+        self,
+        name: str,
+        templates: Dict[int, Callable],
+        signatures: Callable[[int], List[str]],
+        helpers: Dict[str, Callable] = None,
+        register: bool = False,
+    ) -> None:
+        self.name = name
+        self.templates = dict(templates)
+        self.signatures = signatures
+        self.helpers = dict(helpers or {})
+        self._loops: Dict[int, Callable] = {}
+        self._lock = threading.Lock()
+        if register:
+            _KERNELS.append(self)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.name!r})"
+
+    def source(self, ndim: int, cache: bool = True) -> str:
+        """
+        Returns the source of the kernel module of `ndim` dimensions, numba
+        caches the loop of the module file if `cache`.
+        """
+        if ndim not in self.templates:
+            raise ValueError(f"The kernel {self.name!r} has no loop over {ndim}D grids.")
+        template = self.templates[ndim]
+        helpers = "".join(
+            _HELPER.format(source=textwrap.dedent(inspect.getsource(f)), alias=alias, name=f.__name__)
+            for alias, f in self.helpers.items()
+        )
+        return _MODULE.format(
+            helpers=helpers,
+            template=inspect.getsource(template),
+            template_name=template.__name__,
+            signatures=self.signatures(ndim),
+            cache=cache,
+        )
+
+    def loop(self, ndim: int) -> Callable:
+        """
+        Returns the compiled loop over grids of `ndim` dimensions.
+        """
+        loop = self._loops.get(ndim)
+        if loop is None:
+            with self._lock:
+                loop = self._loops.get(ndim)
+                if loop is None:
+                    source = self.source(ndim)
+                    digest = hashlib.sha256(source.encode()).hexdigest()[:16]
+                    module = f"microtex_{self.name}_{ndim}d_{digest}"
+                    path = kernel_cache_dir() / f"{module}.py"
+                    try:
+                        _write_if_changed(path, source)
+                    except OSError:
+                        path = None
+                    with stage("stencil.load"):
+                        if path is None:
+                            # the cache directory is missing or read-only, compile for this process
+                            namespace = types.ModuleType(module)
+                            exec(compile(self.source(ndim, cache=False), f"<{module}>", "exec"), vars(namespace))
+                        else:
+                            spec = importlib.util.spec_from_file_location(module, path)
+                            namespace = importlib.util.module_from_spec(spec)
+                            # numba imports the module by name when it loads the cached loops
+                            sys.modules[module] = namespace
+                            spec.loader.exec_module(namespace)
+                    loop = self._loops[ndim] = namespace.loop
+        return loop
+
+
+class Stencil_Kernel(Compiled_Kernel):
+    """
+    A stencil pass with a fused pointwise function, see :code:`fused_laplacian`
+    and :code:`fused_flux`.
+
+    The loops are compiled for float32 and float64 C-contiguous fields, see
+    :code:`Compiled_Kernel`.
+
+    Params:
+        kind: 'laplacian' or 'flux'
+        pointwise: module level function of scalars (using ``np`` and ``math``), its source is compiled
+        params: the number of float parameters of the pointwise function
+        name: the name of the kernel (default the name of `pointwise` and the kind)
+        register: compile the kernel in :code:`warmup`
+    """
+
+    def __init__(
+        self, kind: str, pointwise: Callable, params: int = 0, name: str = None, register: bool = False
+    ) -> None:
+        if kind not in _TEMPLATES:
+            raise ValueError(f"Unknown stencil kind '{kind}', expected one of {sorted(_TEMPLATES)}.")
+        self.kind = kind
+        self.pointwise = pointwise
+        self.params = int(params)
+        self.arity = _ARITY[kind]
+        super().__init__(
+            name or f"{pointwise.__name__.strip('_')}_{kind}",
+            dict(enumerate(_TEMPLATES[kind], start=1)),
+            self._signatures,
+            {"_point": pointwise},
+            register,
+        )
+
+    def _signatures(self, ndim: int) -> List[str]:
+        array = "[" + ", ".join([":"] * (ndim - 1) + ["::1"]) + "]"
+        params = f"UniTuple(float64, {self.params})" if self.params else "Tuple(())"
+        return [
+            f"void({', '.join([dtype + array] * (self.arity + 1))}, UniTuple(float64, {ndim}), {params})"
+            for dtype in PRECISIONS
+        ]
+
+    def __call__(
+        self, *fields: NDArray, spacing: Union[float, Sequence[float]] = 1.0, params: Tuple = (), out: NDArray = None
+    ) -> NDArray:
+        """
+        Apply the kernel to the fields, the result is written to `out` (default a
+        new array like the first field).
+
+        Params:
+            fields: the fields of equal shape, one for Laplacian and two for flux kernels
+            spacing: the grid spacing, a scalar or one per axis
+            params: a tuple of float parameters passed to the pointwise function
+            out: the output array, not one of the fields (the stencil reads neighbours)
+        """
+        if len(fields) != self.arity:
+            raise TypeError(f"The {self.kind} kernel {self.name!r} takes {self.arity} fields, got {len(fields)}.")
+        if len(params) != self.params:
+            raise TypeError(f"The kernel {self.name!r} takes {self.params} parameters, got {len(params)}.")
+        a = fields[0]
+        if not 1 <= a.ndim <= 3:
+            raise ValueError(f"Stencils work on 1D, 2D and 3D grids, got {a.ndim} dimensions.")
+        if min(a.shape) < 3:
+            raise ValueError(f"Stencils need at least 3 points per axis, got {a.shape}.")
+        if any(f.shape != a.shape for f in fields):
+            raise ValueError(f"The fields have different shapes {[f.shape for f in fields]}.")
+        # the loops are compiled for C-contiguous single and double precision fields
+        if out is not None and out.shape != a.shape:
+            raise ValueError(f"The output has shape {out.shape}, expected {a.shape}.")
+        if out is not None and any(np.shares_memory(out, f) for f in fields):
+            raise ValueError("The output must not share memory with the fields, the stencil reads neighbours.")
+        dtype = np.result_type(*fields, np.float32)
+        fields = [np.ascontiguousarray(f, dtype=dtype) for f in fields]
+        if out is None:
+            out = np.empty(a.shape, dtype)
+        target = out if out.dtype == dtype and out.flags.c_contiguous else np.empty(a.shape, dtype)
+        self.loop(a.ndim)(*fields, target, _inverse_squares(spacing, a.ndim), tuple(float(p) for p in params))
+        if target is not out:
+            out[...] = target
+        return out
+
+
+def fused_laplacian(pointwise: Callable, params: int = 0, register: bool = False) -> Stencil_Kernel:
+    """
+    Returns the kernel ``out = pointwise(a, laplacian(a), params)``.
+
+    `pointwise(value, laplacian, params)` is a module level function of
+    scalars and the tuple of `params` floats, which numba can compile. The
+    kernels of :code:`WARMUP_MODULES` are created with `register`.
+    """
+    return Stencil_Kernel("laplacian", pointwise, params, register=register)
+
+
+def fused_flux(pointwise: Callable, params: int = 0, register: bool = False) -> Stencil_Kernel:
+    """
+    Returns the kernel ``out = pointwise(a, b, laplacian(b), grad(a) . grad(b), params)``.
+
+    The gradients are central differences, e.g. the flux ``div(M(a) grad(b))``
+    expands to ``M(a) laplacian(b) + M'(a) grad(a) . grad(b)``.
+    """
+    return Stencil_Kernel("flux", pointwise, params, register=register)
+
+
+def _laplacian(value, lap, params):
+    return lap
+
+
+def _gradient_dot(a, b, lap, grad, params):
+    return grad
+
+
+laplacian = fused_laplacian(_laplacian, register=True)
+gradient_dot = fused_flux(_gradient_dot, register=True)
+
+
+def biharmonic(
+    a: NDArray, spacing: Union[float, Sequence[float]] = 1.0, out: NDArray = None, work: NDArray = None
+) -> NDArray:
+    """
+    Returns the periodic biharmonic ``laplacian(laplacian(a))`` (13-point
+    stencil in 2D), `work` holds the intermediate Laplacian.
+    """
+    work = laplacian(a, spacing=spacing, out=work)
+    return laplacian(work, spacing=spacing, out=out)
+
+
+def warmup(modules: Sequence[str] = WARMUP_MODULES, ndims: Sequence[int] = (1, 2, 3)) -> Dict[str, float]:
+    """
+    Compile (or load) the loops of the registered kernels, of the kernel
+    `modules` and this one, for the dimensions `ndims` into the
+    :code:`kernel_cache_dir`.
+
+    :return: The seconds spent per kernel and dimension.
+    """
+    for module in modules:
+        importlib.import_module(module)
+    report = {}
+    for kernel in list(_KERNELS):
+        for ndim in sorted(set(ndims) & set(kernel.templates)):
+            start = time.perf_counter()
+            kernel.loop(ndim)
+            report[f"{kernel.name}/{ndim}d"] = time.perf_counter() - start
+    return report
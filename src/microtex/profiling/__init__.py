@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+
+"""
+Opt-in instrumentation of the hot paths.
+
+The solvers, writers and analysers wrap their stages in :code:`stage()` and
+count processed cells or bytes with :code:`count()`. Without an active
+:code:`Profiler` both are no-ops costing one global lookup, so they can stay in
+the code permanently.
+
+.. code-block::python
+
+    from microtex.profiling import Profiler
+
+    with Profiler(track_allocations=True) as profiler:
+        for n in range(100):
+            field = Cahn_Hilliard_2D_AB_Solver(field, config)
+
+    print(profiler.summary())
+    profiler.to_json("profile.json")
+    profiler.to_chrome_trace("trace.json")  # open in chrome://tracing or Perfetto
+
+The self time of a stage is its total time minus the time of nested stages,
+e.g. the self time of ``model.step`` is the Python overhead around the solver.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+__all__ = tuple(["Profiler", "stage", "count", "active_profiler"])
+
+
+_ACTIVE: Optional["Profiler"] = None
+_NULL = nullcontext()
+
+
+def active_profiler() -> Optional["Profiler"]:
+    """
+    :return: The active profiler or ``None``.
+    """
+    return _ACTIVE
+
+
+def stage(name: str):
+    """
+    Context manager timing the named stage when a profiler is active.
+    """
+    if _ACTIVE is None:
+        return _NULL
+    return _Stage(_ACTIVE, name)
+
+
+def count(name: str, value: int = 1) -> None:
+    """
+    Increment the named counter when a profiler is active.
+    """
+    if _ACTIVE is not None:
+        _ACTIVE.counters[name] += value
+
+
+class _Stage:
+    __slots__ = ("profiler", "name", "start", "children", "current", "peak")
+
+    def __init__(self, profiler: "Profiler", name: str) -> None:
+        self.profiler = profiler
+        self.name = name
+        self.children = 0
+
+    def __enter__(self):
+        stack = self.profiler._stack()
+        if self.profiler.track_allocations:
+            self.current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+            self.peak = self.current
+        stack.append(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        end = time.perf_counter_ns()
+        stack = self.profiler._stack()
+        stack.pop()
+        duration = end - self.start
+        allocation = None
+        if self.profiler.track_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            self.peak = max(self.peak, peak)
+            allocation = (self.peak - self.current, current - self.current)
+        if stack:
+            stack[-1].children += duration
+            if allocation is not None:
+                stack[-1].peak = max(stack[-1].peak, self.peak)
+        self.profiler._record(self.name, self.start, duration, self.children, allocation)
+        return False
+
+
+class Profiler:
+    """
+    Collect stage timings, counters and (optionally) allocations.
+
+    Params:
+        track_allocations: trace allocations with :code:`tracemalloc` (slow), records the
+                           peak and net allocated bytes of every stage call
+        trace: keep the individual stage events for :code:`to_chrome_trace()`
+        max_events: the maximal number of kept events
+    """
+
+    def __init__(self, track_allocations: bool = False, trace: bool = True, max_events: int = 1_000_000):
+        self.track_allocations = track_allocations
+        self.trace = trace
+        self.max_events = max_events
+        self.durations: Dict[str, List[int]] = defaultdict(list)
+        self.self_durations: Dict[str, List[int]] = defaultdict(list)
+        self.allocations: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.events: List[Tuple[str, int, int, int]] = []
+        self._local = threading.local()
+        self._previous = None
+        self._started_tracemalloc = False
+        self.start = self.stop = None
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, name, start, duration, children, allocation):
+        self.durations[name].append(duration)
+        self.self_durations[name].append(duration - children)
+        if allocation is not None:
+            self.allocations[name].append(allocation)
+        if self.trace and len(self.events) < self.max_events:
+            self.events.append((name, start, duration, threading.get_ident()))
+
+    def __enter__(self) -> "Profiler":
+        global _ACTIVE
+        self._previous, _ACTIVE = _ACTIVE, self
+        if self.track_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        global _ACTIVE
+        self.stop = time.perf_counter_ns()
+        _ACTIVE = self._previous
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        return False
+
+    @property
+    def elapsed(self) -> float:
+        """
+        :return: The wall time of the profiled block [s].
+        """
+        stop = time.perf_counter_ns() if self.stop is None else self.stop
+        return (stop - self.start) * 1e-9
+
+    def histogram(self, name: str, bins: int = 20) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Histogram of the stage durations with logarithmically spaced bins.
+
+        :return: The bin edges [s] and the counts.
+        """
+        values = np.asarray(self.durations[name], dtype=np.float64) * 1e-9
+        low, high = values.min(), values.max()
+        edges = np.geomspace(max(low, 1e-9), max(high, low * 1.001, 2e-9), bins + 1)
+        counts, _ = np.histogram(values, bins=edges)
+        return edges, counts
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        Per-stage statistics (times in seconds).
+        """
+        result = {}
+        for name, values in self.durations.items():
+            total = np.asarray(values, dtype=np.float64) * 1e-9
+            own = np.asarray(self.self_durations[name], dtype=np.float64) * 1e-9
+            edges, counts = self.histogram(name)
+            result[name] = {
+                "calls": len(values),
+                "total": float(total.sum()),
+                "self": float(own.sum()),
+                "mean": float(total.mean()),
+                "min": float(total.min()),
+                "max": float(total.max()),
+                "p50": float(np.percentile(total, 50)),
+                "p95": float(np.percentile(total, 95)),
+                "histogram": {"edges": edges.tolist(), "counts": counts.tolist()},
+            }
+            if self.allocations.get(name):
+                peak, net = np.asarray(self.allocations[name]).T
+                result[name]["allocations"] = {
+                    "allocating_calls": int(np.count_nonzero(peak > 0)),
+                    "peak_bytes": int(peak.max()),
+                    "mean_peak_bytes": float(peak.mean()),
+                    "net_bytes": int(net.sum()),
+                }
+        return result
+
+    def cell_updates_per_second(self, stage_name: str = "ch.step") -> float:
+        """
+        Cell updates per second of the solver stage, uses the ``cells`` counter.
+        """
+        total = sum(self.durations.get(stage_name, ())) * 1e-9
+        return self.counters.get("cells", 0) / total if total else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "elapsed": self.elapsed,
+            "cell_updates_per_second": self.cell_updates_per_second(),
+            "counters": dict(self.counters),
+            "stages": self.stats(),
+        }
+
+    def to_json(self, path: os.PathLike) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def to_chrome_trace(self, path: os.PathLike) -> None:
+        """
+        Save the stage events in the Chrome trace event format.
+        """
+        pid = os.getpid()
+        events = [
+            {
+                "name": name,
+                "cat": name.split(".")[0],
+                "ph": "X",
+                "ts": (start - self.start) / 1e3,
+                "dur": duration / 1e3,
+                "pid": pid,
+                "tid": tid,
+            }
+            for name, start, duration, tid in self.events
+        ]
+        events.extend(
+            {"name": name, "ph": "C", "ts": 0, "pid": pid, "args": {name: value}}
+            for name, value in self.counters.items()
+        )
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def summary(self) -> str:
+        lines = [f"{'stage':<28} {'calls':>7} {'total [s]':>10} {'self [s]':>10} {'mean [ms]':>10} {'p95 [ms]':>10}"]
+        stats = sorted(self.stats().items(), key=lambda item: -item[1]["total"])
+        for name, s in stats:
+            lines.append(
+                f"{name:<28} {s['calls']:>7} {s['total']:>10.4f} {s['self']:>10.4f} "
+                f"{s['mean'] * 1e3:>10.3f} {s['p95'] * 1e3:>10.3f}"
+            )
+        if "cells" in self.counters:
+            lines.append(f"cell updates per second: {self.cell_updates_per_second():.3e}")
+        return "\n".join(lines)
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+"""
+Independent, reproducible random number streams.
+
+Every random stream of a computation descends from one recorded root seed
+through :code:`numpy.random.SeedSequence.spawn`: a run spawns a stream per
+replica, a replica per worker or thread. The streams are statistically
+independent, and any of them is recreated from its lineage, the root entropy
+and the spawn key, which the writers store next to the results.
+
+.. code-block::python
+
+    from microtex.rng import Random_Stream
+
+    root = Random_Stream(seed=2024)            # or Random_Stream() for fresh entropy
+    replicas = root.spawn(8)                   # one stream per ensemble member
+    field = config.noisy_field(rng=replicas[0])
+
+    writer = HDF5Writer('run.h5', field, config, rng=replicas[0])
+    same = Random_Stream.from_attrs(HDF5Reader('run.h5').attrs)
+"""
+
+from __future__ import annotations
+
+import numbers
+import threading
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+__all__ = tuple(["Random_Stream", "as_generator", "as_stream"])
+
+
+class Random_Stream:
+    """
+    A node of the seed tree with its :code:`numpy.random.Generator`.
+
+    Params:
+        seed: the root seed (``None`` draws fresh entropy from the OS)
+        spawn_key: the path of the node in the seed tree (normally set by :code:`spawn`)
+    """
+
+    def __init__(self, seed: Optional[int] = None, spawn_key: Sequence[int] = ()) -> None:
+        self.sequence = np.random.SeedSequence(seed, spawn_key=tuple(spawn_key))
+        self._generator = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_sequence(cls, sequence: np.random.SeedSequence) -> "Random_Stream":
+        return cls(sequence.entropy, sequence.spawn_key)
+
+    @property
+    def entropy(self) -> int:
+        return self.sequence.entropy
+
+    @property
+    def spawn_key(self) -> tuple:
+        return tuple(self.sequence.spawn_key)
+
+    @property
+    def generator(self) -> np.random.Generator:
+        """
+        The generator of this stream (PCG64), created on first use.
+        """
+        if self._generator is None:
+            self._generator = np.random.Generator(np.random.PCG64(self.sequence))
+        return self._generator
+
+    def spawn(self, n: int) -> List["Random_Stream"]:
+        """
+        Returns `n` new independent child streams (e.g. replicas or workers).
+        """
+        with self._lock:
+            return [Random_Stream.from_sequence(child) for child in self.sequence.spawn(n)]
+
+    def thread_generator(self) -> np.random.Generator:
+        """
+        Returns the generator of the calling thread, a child stream spawned on
+        the first call of each thread. Generators are not thread safe.
+        """
+        generator = getattr(self._local, "generator", None)
+        if generator is None:
+            generator = self._local.generator = self.spawn(1)[0].generator
+        return generator
+
+    @property
+    def lineage(self) -> Dict:
+        """
+        The root entropy (as string, it may exceed 64 bits) and the spawn key.
+        """
+        return {"entropy": str(self.entropy), "spawn_key": list(self.spawn_key)}
+
+    @classmethod
+    def from_lineage(cls, lineage: Dict) -> "Random_Stream":
+        return cls(int(lineage["entropy"]), [int(k) for k in lineage["spawn_key"]])
+
+    def to_attrs(self) -> Dict:
+        """
+        The lineage as HDF5 attributes ``rng_entropy`` and ``rng_spawn_key``.
+        """
+        return {"rng_entropy": str(self.entropy), "rng_spawn_key": np.asarray(self.spawn_key, dtype=np.int64)}
+
+    @classmethod
+    def from_attrs(cls, attrs) -> "Random_Stream":
+        """
+        Recreate the stream recorded by :code:`to_attrs` (e.g. from :code:`HDF5Reader.attrs`).
+        """
+        return cls(int(attrs["rng_entropy"]), [int(k) for k in np.atleast_1d(attrs["rng_spawn_key"])])
+
+    def __repr__(self) -> str:
+        return f"Random_Stream(entropy={self.entropy}, spawn_key={self.spawn_key})"
+
+
+def as_generator(rng: Union[None, int, np.random.Generator, Random_Stream]) -> np.random.Generator:
+    """
+    Returns a generator of a seed, a stream or a generator (``None`` gives fresh entropy).
+    """
+    if isinstance(rng, np.random.Generator):
+        return rng
+    if isinstance(rng, Random_Stream):
+        return rng.generator
+    return np.random.default_rng(rng)
+
+
+def as_stream(rng: Union[int, np.random.Generator, Random_Stream]) -> Random_Stream:
+    """
+    Returns the stream of a seed, a stream or a generator seeded by a
+    :code:`numpy.random.SeedSequence` (e.g. :code:`numpy.random.default_rng`),
+    whose seed lineage can be recorded.
+    """
+    if isinstance(rng, Random_Stream):
+        return rng
+    if isinstance(rng, np.random.Generator):
+        sequence = getattr(rng.bit_generator, "seed_seq", None)
+        if isinstance(sequence, np.random.SeedSequence):
+            return Random_Stream.from_sequence(sequence)
+    elif isinstance(rng, numbers.Integral):
+        return Random_Stream(int(rng))
+    raise TypeError(f"Cannot record the seed lineage of {type(rng).__name__}, pass a Random_Stream or a seed.")
@@ -6,27 +6,105 @@ Contains a ``Simulation`` class.
 
 from __future__ import annotations
 
-from abc import abstractmethod
-from typing import Any
+import inspect
+from typing import Any, Callable, Iterable, Iterator, Optional
 from uuid import UUID
 
-from microtex.modeling import Model
-
-__all__ = tuple(["Simulation"])
+from numpy.typing import NDArray
+
+from microtex.modeling import ModelND
+from microtex.simulation._queue import (
+    JOB_STATES as JOB_STATES,
+    Job as Job,
+    Job_Queue as Job_Queue,
+)
+from microtex.simulation._snapshots import (
+    Change_Snapshots as Change_Snapshots,
+    Geometric_Snapshots as Geometric_Snapshots,
+    Interval_Snapshots as Interval_Snapshots,
+    Snapshot_Policy as Snapshot_Policy,
+    Snapshot_Scheduler as Snapshot_Scheduler,
+)
+from microtex.simulation._stopping import (
+    Autocorrelation_Equilibration as Autocorrelation_Equilibration,
+    Energy_Plateau as Energy_Plateau,
+    L2_Change_Rate as L2_Change_Rate,
+    StoppingCriterion as StoppingCriterion,
+    Structure_Factor_Stagnation as Structure_Factor_Stagnation,
+    integrated_autocorrelation_time as integrated_autocorrelation_time,
+)
+
+__all__ = tuple(
+    [
+        "Simulation",
+        "StoppingCriterion",
+        "L2_Change_Rate",
+        "Energy_Plateau",
+        "Structure_Factor_Stagnation",
+        "Autocorrelation_Equilibration",
+        "integrated_autocorrelation_time",
+        "Snapshot_Scheduler",
+        "Snapshot_Policy",
+        "Geometric_Snapshots",
+        "Interval_Snapshots",
+        "Change_Snapshots",
+        "Job",
+        "Job_Queue",
+        "JOB_STATES",
+    ]
+)
+
+
+def _model_states(model: ModelND, steps: int) -> Iterator[NDArray]:
+    # Cahn-Hilliard models yield states, Monte Carlo models return one state per call.
+    if inspect.isgeneratorfunction(model.solve):
+        yield from model.solve(steps)
+    else:
+        for _ in range(steps):
+            yield model.solve()
 
 
 class Simulation:
     """
     Simulation represents a computer experiment which drives and control a models time evolution.
+
+    The run ends after the given number of steps or earlier, when one of the
+    stopping `criteria` (or the `stop_function`) is met. The reason is kept in
+    :code:`stop_reason`. The states chosen by the `snapshots` scheduler are
+    appended to the `writer` (e.g. :code:`HDF5Writer`) with their step number.
+
+    Usage:
+        simulation = Simulation(uuid4(), "ch", model, config, criteria=[L2_Change_Rate(1e-9)])
+        for state in simulation.run(100_000):
+            ...
+        print(simulation.steps_done, simulation.stop_reason)
+
+        # save when the field changed by more than 0.05, at least every 10000 steps
+        scheduler = Snapshot_Scheduler(Change_Snapshots(0.05), max_interval=10_000)
+        simulation = Simulation(uuid4(), "ch", model, config, snapshots=scheduler, writer=writer)
     """
 
-    def __init__(self, id: UUID, name: str, model: Model, settings: Any) -> None:
+    def __init__(
+        self,
+        id: UUID,
+        name: str,
+        model: ModelND,
+        settings: Any,
+        criteria: Iterable[StoppingCriterion] = (),
+        snapshots: Optional[Snapshot_Scheduler] = None,
+        writer: Any = None,
+    ) -> None:
         self.id = id
         self.name = name
         self.model = model
         self.settings = settings
+        self.criteria = list(criteria)
+        self.snapshots = snapshots
+        self.writer = writer
         self.should_finish: bool = False
-        self.result = []
+        self.stop_reason: Optional[str] = None
+        self.steps_done = 0
+        self.result = None
 
     def __eq__(self, that: object) -> bool:
         return isinstance(self, type(that)) and self.id == that.id
@@ -34,9 +112,36 @@ class Simulation:
     def __hash__(self) -> int:
         return hash((type(self), self.id))
 
-    def run(self, stop_function=None) -> "Generator[FIXME]":
-        while not self.should_finish:
-            result.append((self.model()))
+    def run(
+        self, steps: int, stop_function: Callable[[int, NDArray], bool] = None
+    ) -> Iterator[NDArray]:
+        """
+        Yield the model states until `steps` are done or the run should finish.
+        """
+        self.should_finish = False
+        self.stop_reason = None
+        if self.snapshots is not None and self.steps_done == 0:
+            # changes are measured from the initial state
+            self.snapshots.start(self.model._states[-1])
+        for state in _model_states(self.model, steps):
+            self.steps_done += 1
+            self.result = state
+            if self.snapshots is not None and self.snapshots(self.steps_done, state):
+                if self.writer is not None:
+                    self.writer.append(state, timestep=self.steps_done)
+            yield state
+            for criterion in self.criteria:
+                if criterion.update(self.steps_done, state):
+                    self.stop_reason = criterion.reason
+                    self.should_finish = True
+                    break
+            if not self.should_finish and stop_function is not None:
+                if stop_function(self.steps_done, state):
+                    self.stop_reason = f"stop function at step {self.steps_done}"
+                    self.should_finish = True
+            if self.should_finish:
+                return
+        self.stop_reason = f"step limit {steps} reached"
 
 
 from threading import Thread
@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+
+"""
+Persistent job queue of simulation campaigns in a SQLite file.
+
+A job is a configuration keyed by its :code:`configuration_digest`, so
+submitting a campaign again adds only the new configurations and a restarted
+campaign skips the finished runs. Jobs move from ``pending`` to ``running``
+(leased by a worker) to ``done`` or ``failed``. A running worker renews its
+lease with heartbeats, the job of a worker which stopped sending them (node
+failure, killed process) is handed out again once its lease has expired.
+
+Any number of worker processes, on one or several nodes sharing the file, pull
+jobs concurrently: a job is claimed in an immediate (write locking)
+transaction, so it is leased to one worker at a time. The database uses
+write-ahead logging, which needs a local or cluster file system with working
+locks (not NFS).
+
+.. code-block::python
+
+    queue = Job_Queue('campaign/jobs.sqlite')
+    queue.submit_many(Configuration(T=T, c0=c0) for T in temperatures for c0 in compositions)
+
+    # in every worker process
+    queue.work(run_simulation)        # run_simulation(config) -> JSON serializable result
+    print(queue.counts())             # {'pending': 0, 'running': 0, 'done': 998, 'failed': 2}
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from microtex.modeling import configuration_digest
+
+__all__ = tuple(["Job", "Job_Queue", "JOB_STATES"])
+
+
+JOB_STATES = ("pending", "running", "done", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    digest TEXT PRIMARY KEY,
+    config BLOB NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    priority INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    token TEXT,
+    lease_expires REAL,
+    heartbeat REAL,
+    submitted REAL,
+    started REAL,
+    finished REAL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, priority, submitted);
+"""
+
+
+@dataclass
+class Job:
+    """
+    A job leased to a worker, the `token` identifies the lease.
+    """
+
+    digest: str
+    config: Any
+    attempts: int
+    token: str
+    worker: str
+
+
+def _worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+class Job_Queue:
+    """
+    SQLite job queue of configurations.
+
+    Params:
+        filename: the SQLite file (created if needed)
+        lease: the seconds a job stays leased without a heartbeat
+        max_attempts: the number of runs of a job before it is failed for good
+        timeout: the seconds to wait for the database lock
+
+    Usage:
+        queue = Job_Queue('jobs.sqlite', lease=600)
+        queue.submit(config)
+        while (job := queue.acquire()) is not None:
+            try:
+                queue.complete(job, run(job.config))
+            except Exception as error:
+                queue.fail(job, repr(error))
+    """
+
+    def __init__(self, filename, lease: float = 300.0, max_attempts: int = 3, timeout: float = 60.0) -> None:
+        if lease <= 0:
+            raise ValueError("The lease must be positive.")
+        self.filename = str(filename)
+        self.lease = float(lease)
+        self.max_attempts = int(max_attempts)
+        self.timeout = float(timeout)
+        self._local = threading.local()
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        # one connection per process and thread, connections do not survive a fork
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.filename, timeout=self.timeout, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        db = self._connection()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def __getstate__(self):
+        # the queue is passed to worker processes without its connections
+        state = dict(self.__dict__)
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def submit(self, config, priority: int = 0) -> str:
+        """
+        Add a configuration unless a job of an equal configuration exists.
+
+        :return: The digest of the job.
+        """
+        return self.submit_many([config], priority)[0]
+
+    def submit_many(self, configs: Iterable, priority: int = 0) -> List[str]:
+        """
+        Add the configurations in one transaction, see :code:`submit`.
+        """
+        now = time.time()
+        rows = [(configuration_digest(config), pickle.dumps(config), priority, now) for config in configs]
+        with self._transaction() as db:
+            db.executemany(
+                "INSERT OR IGNORE INTO jobs (digest, config, priority, submitted) VALUES (?, ?, ?, ?)", rows
+            )
+        return [row[0] for row in rows]
+
+    def acquire(self, worker: str = None) -> Optional[Job]:
+        """
+        Lease the next pending job, or a running one whose lease expired.
+
+        :return: The job or ``None`` if there is no job to run.
+        """
+        worker = worker or _worker_name()
+        token = uuid.uuid4().hex
+        now = time.time()
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE jobs SET state = 'failed', error = 'lease expired', finished = ?"
+                " WHERE state = 'running' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts),
+            )
+            row = db.execute(
+                "SELECT digest, config, attempts FROM jobs"
+                " WHERE state = 'pending' OR (state = 'running' AND lease_expires < ?)"
+                " ORDER BY priority DESC, submitted LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            digest, config, attempts = row
+            db.execute(
+                "UPDATE jobs SET state = 'running', attempts = ?, worker = ?, token = ?, lease_expires = ?,"
+                " heartbeat = ?, started = ? WHERE digest = ?",
+                (attempts + 1, worker, token, now + self.lease, now, now, digest),
+            )
+        return Job(digest, pickle.loads(config), attempts + 1, token, worker)
+
+    def _update(self, job: Job, sql: str, values) -> bool:
+        with self._transaction() as db:
+            cursor = db.execute(
+                f"UPDATE jobs SET {sql} WHERE digest = ? AND token = ? AND state = 'running'",
+                tuple(values) + (job.digest, job.token),
+            )
+            return cursor.rowcount == 1
+
+    def heartbeat(self, job: Job) -> bool:
+        """
+        Renew the lease of the job.
+
+        :return: ``False`` if the lease was lost (expired and given to another worker).
+        """
+        now = time.time()
+        return self._update(job, "heartbeat = ?, lease_expires = ?", (now, now + self.lease))
+
+    def complete(self, job: Job, result: Any = None) -> bool:
+        """
+        Mark the job done and store the JSON serializable `result`.
+
+        :return: ``False`` if the lease was lost.
+        """
+        return self._update(
+            job, "state = 'done', finished = ?, result = ?, error = NULL", (time.time(), json.dumps(result))
+        )
+
+    def fail(self, job: Job, error: str = None) -> bool:
+        """
+        Record the error of the job, it is run again until `max_attempts` runs failed.
+
+        :return: ``False`` if the lease was lost.
+        """
+        state = "failed" if job.attempts >= self.max_attempts else "pending"
+        return self._update(job, "state = ?, finished = ?, error = ?", (state, time.time(), error))
+
+    def release(self, job: Job) -> bool:
+        """
+        Return the job to the queue without counting the attempt (e.g. on shutdown).
+        """
+        return self._update(job, "state = 'pending', attempts = attempts - 1", ())
+
+    def requeue(self, state: str = "failed") -> int:
+        """
+        Return the jobs in `state` to the queue with no attempts counted.
+
+        :return: The number of requeued jobs.
+        """
+        with self._transaction() as db:
+            return db.execute(
+                "UPDATE jobs SET state = 'pending', attempts = 0, token = NULL WHERE state = ?", (state,)
+            ).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        """
+        Returns the number of jobs in every state.
+        """
+        rows = self._connection().execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        return dict({state: 0 for state in JOB_STATES}, **dict(rows))
+
+    def state(self, config) -> Optional[str]:
+        """
+        Returns the state of the job of a configuration (``None`` if not submitted).
+        """
+        row = self._connection().execute(
+            "SELECT state FROM jobs WHERE digest = ?", (configuration_digest(config),)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def results(self) -> Dict[str, Any]:
+        """
+        Returns the results of the done jobs by digest.
+        """
+        rows = self._connection().execute("SELECT digest, result FROM jobs WHERE state = 'done'").fetchall()
+        return {digest: json.loads(result) for digest, result in rows}
+
+    def errors(self) -> Dict[str, str]:
+        """
+        Returns the last errors of the failed jobs by digest.
+        """
+        rows = self._connection().execute("SELECT digest, error FROM jobs WHERE state = 'failed'").fetchall()
+        return dict(rows)
+
+    def work(self, function: Callable[[Any], Any], worker: str = None, max_jobs: int = None) -> int:
+        """
+        Run `function(config)` on jobs until the queue is empty (or `max_jobs` ran).
+
+        A background thread renews the lease every third of the lease time.
+        Exceptions of the function or of storing its result fail the job,
+        interrupts release it.
+
+        :return: The number of jobs run.
+        """
+        worker = worker or _worker_name()
+        n = 0
+        while max_jobs is None or n < max_jobs:
+            job = self.acquire(worker)
+            if job is None:
+                break
+            stop = threading.Event()
+            beat = threading.Thread(target=self._beat, args=(job, stop), daemon=True)
+            beat.start()
+            try:
+                # a result that is not JSON serializable fails the job like an exception of the function
+                self.complete(job, function(job.config))
+            except Exception:
+                self.fail(job, traceback.format_exc())
+            except BaseException:
+                self.release(job)
+                raise
+            finally:
+                stop.set()
+                beat.join()
+            n += 1
+        return n
+
+    def _beat(self, job: Job, stop: threading.Event) -> None:
+        while not stop.wait(self.lease / 3):
+            if not self.heartbeat(job):
+                break
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+
+"""
+Snapshot scheduling: which steps of a run are saved.
+
+The stepping loop asks the scheduler after every step whether the state
+should be saved. The geometric and interval policies compare step numbers,
+the change policy measures the change from the last saved state on all cells
+(or on a subsample of cells, O(1) per step independently of the grid size).
+The initial state is the first reference, see :code:`Snapshot_Scheduler.start`.
+
+.. code-block::python
+
+    scheduler = Snapshot_Scheduler(Geometric_Snapshots(1, 100_000, 50), Change_Snapshots(0.05))
+    scheduler.start(field_i)
+    for step, state in enumerate(model.solve(100_000), 1):
+        if scheduler(step, state):
+            writer.append(state, timestep=step)
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+from microtex.modeling import make_samples
+
+__all__ = tuple(
+    ["Snapshot_Policy", "Geometric_Snapshots", "Interval_Snapshots", "Change_Snapshots", "Snapshot_Scheduler"]
+)
+
+
+class Snapshot_Policy(ABC):
+    """
+    Abstract base class of snapshot policies.
+    """
+
+    @abstractmethod
+    def due(self, step: int, state: NDArray) -> bool:
+        """
+        :return: ``True`` if the state after `step` should be saved.
+        """
+
+    def saved(self, step: int, state: NDArray) -> None:
+        """
+        Notification that the state after `step` was saved (by any policy).
+        """
+
+
+class Geometric_Snapshots(Snapshot_Policy):
+    """
+    Save at geometrically spaced steps from `start` to `stop`, see :code:`make_samples`.
+    """
+
+    def __init__(self, start: int, stop: int, count: int) -> None:
+        self.steps = make_samples(start, stop, count)
+        self._next = 0
+
+    def due(self, step: int, state: NDArray) -> bool:
+        while self._next < len(self.steps) and self.steps[self._next] < step:
+            self._next += 1
+        return self._next < len(self.steps) and self.steps[self._next] == step
+
+
+class Interval_Snapshots(Snapshot_Policy):
+    """
+    Save every `every` steps (starting at `offset`).
+    """
+
+    def __init__(self, every: int, offset: int = 0) -> None:
+        if every < 1:
+            raise ValueError("The snapshot interval must be positive.")
+        self.every = every
+        self.offset = offset
+
+    def due(self, step: int, state: NDArray) -> bool:
+        return step >= self.offset and (step - self.offset) % self.every == 0
+
+
+class Change_Snapshots(Snapshot_Policy):
+    """
+    Save when the field has changed by more than `eps` since the last save.
+
+    Params:
+        eps: the change threshold
+        norm: 'max' (largest absolute change) or 'rms' (root mean square change)
+        sample: the number of evenly strided cells the change is measured on
+                (a change localized between them is missed), ``None`` for all
+                cells (O(N) per step)
+        every: measure the change every `every` steps only
+
+    The change is measured from the last saved state, the initial state of
+    :code:`Snapshot_Scheduler.start` (else the first state asked about).
+    """
+
+    def __init__(self, eps: float, norm: str = "max", sample: Optional[int] = None, every: int = 1) -> None:
+        if norm not in ("max", "rms"):
+            raise ValueError(f"Unknown norm '{norm}'.")
+        self.eps = eps
+        self.norm = norm
+        self.sample = sample
+        self.every = every
+        self._index = None
+        self._reference = None
+        self.change = 0.0
+
+    def _cells(self, state: NDArray) -> NDArray:
+        flat = state.reshape(-1)
+        if self.sample is None or flat.size <= self.sample:
+            return flat
+        if self._index is None:
+            self._index = np.linspace(0, flat.size - 1, self.sample).astype(np.intp)
+        return flat[self._index]
+
+    def due(self, step: int, state: NDArray) -> bool:
+        if self._reference is None:
+            self._reference = np.array(self._cells(state), dtype=np.float64)
+            return False
+        if step % self.every:
+            return False
+        diff = self._cells(state) - self._reference
+        self.change = float(np.abs(diff).max() if self.norm == "max" else np.sqrt(np.mean(diff * diff)))
+        return self.change > self.eps
+
+    def saved(self, step: int, state: NDArray) -> None:
+        self._reference = np.array(self._cells(state), dtype=np.float64)
+        self.change = 0.0
+
+
+class Snapshot_Scheduler:
+    """
+    Combine snapshot policies, a state is saved when any policy is due.
+
+    Params:
+        policies: the snapshot policies
+        min_interval: the minimal number of steps between snapshots
+        max_interval: save at least every `max_interval` steps
+
+    The saved steps are kept in :code:`steps`.
+    """
+
+    def __init__(self, *policies: Snapshot_Policy, min_interval: int = 1, max_interval: int = None) -> None:
+        self.policies = list(policies)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.steps: List[int] = []
+        self._last = 0
+
+    def start(self, state: NDArray, step: int = 0) -> None:
+        """
+        The run starts from `state` after `step` (e.g. the initial frame of
+        the writer), it is the reference of the change policies and of
+        `max_interval`.
+        """
+        self._last = step
+        for policy in self.policies:
+            policy.saved(step, state)
+
+    def __call__(self, step: int, state: NDArray) -> bool:
+        # every policy is consulted, the change policy keeps its reference
+        due = [policy.due(step, state) for policy in self.policies]
+        since = step - self._last
+        if since < self.min_interval:
+            return False
+        if not any(due) and (self.max_interval is None or since < self.max_interval):
+            return False
+        self._last = step
+        self.steps.append(step)
+        for policy in self.policies:
+            policy.saved(step, state)
+        return True
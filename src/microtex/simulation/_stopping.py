@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+
+"""
+Stopping criteria which end a simulation once the state stops changing.
+
+Each criterion is updated with ``update(step, state)`` after every step, but
+does its (array sized) work only every `every` steps, so the cost per step is
+negligible. The plateau criteria keep a window of scalars, the change rate
+keeps the reference state of the last check (or a sample of its cells). When
+a criterion returns ``True`` its :code:`reason` describes why.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Callable, Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+__all__ = tuple(
+    [
+        "StoppingCriterion",
+        "L2_Change_Rate",
+        "Energy_Plateau",
+        "Structure_Factor_Stagnation",
+        "Autocorrelation_Equilibration",
+        "integrated_autocorrelation_time",
+    ]
+)
+
+
+class StoppingCriterion(ABC):
+    """
+    Abstract base class for stopping criteria.
+    """
+
+    def __init__(self, every: int = 1) -> None:
+        if every < 1:
+            raise ValueError("The check interval must be positive.")
+        self.every = every
+        self.reason: Optional[str] = None
+
+    def update(self, step: int, state: NDArray) -> bool:
+        """
+        :return: ``True`` if the simulation should stop after `step`.
+        """
+        if step % self.every:
+            return False
+        return self.check(step, state)
+
+    @abstractmethod
+    def check(self, step: int, state: NDArray) -> bool:
+        """
+        Evaluate the criterion, set :code:`reason` when it is met.
+        """
+
+
+class L2_Change_Rate(StoppingCriterion):
+    """
+    Stop when the relative L2 change per step ``|c_n - c_m| / |c_n| / (n - m)``
+    between two checks falls below `tol`.
+
+    The state of the last check is kept as reference (a copy of the grid),
+    with `sample` only that many evenly strided cells are kept and compared,
+    which may miss a change localized between them.
+
+    Params:
+        tol: the change rate tolerance
+        every: check interval in steps
+        sample: the number of compared cells, ``None`` for all cells
+    """
+
+    def __init__(self, tol: float, every: int = 100, sample: Optional[int] = None) -> None:
+        super().__init__(every)
+        self.tol = tol
+        self.sample = sample
+        self._index = None
+        self._previous = None
+        self._previous_step = None
+        self.rate = np.inf
+
+    def _cells(self, state: NDArray) -> NDArray:
+        flat = np.asarray(state).reshape(-1)
+        if self.sample is not None and flat.size > self.sample:
+            if self._index is None:
+                self._index = np.linspace(0, flat.size - 1, self.sample).astype(np.intp)
+            flat = flat[self._index]
+        return np.array(flat, dtype=np.float64)
+
+    def check(self, step: int, state: NDArray) -> bool:
+        cells = self._cells(state)
+        previous, previous_step = self._previous, self._previous_step
+        self._previous, self._previous_step = cells, step
+        if previous is None:
+            return False
+        norm = np.linalg.norm(cells) or 1.0
+        previous -= cells
+        self.rate = np.linalg.norm(previous) / norm / (step - previous_step)
+        if self.rate < self.tol:
+            self.reason = f"L2 change rate {self.rate:.3e} < {self.tol:.3e} at step {step}"
+            return True
+        return False
+
+
+class _Plateau(StoppingCriterion):
+    """
+    Stop when a scalar quantity changes by less than `rtol` (relative) over the
+    last `window` checks.
+    """
+
+    label = "value"
+
+    def __init__(self, rtol: float, window: int = 5, every: int = 100) -> None:
+        super().__init__(every)
+        self.rtol = rtol
+        self.values = deque(maxlen=window + 1)
+
+    @abstractmethod
+    def measure(self, state: NDArray) -> float:
+        ...
+
+    def check(self, step: int, state: NDArray) -> bool:
+        self.values.append(self.measure(state))
+        if len(self.values) < self.values.maxlen:
+            return False
+        change = (max(self.values) - min(self.values)) / (abs(self.values[-1]) or 1.0)
+        if change < self.rtol:
+            self.reason = (
+                f"{self.label} changed by {change:.3e} < {self.rtol:.3e} over "
+                f"{self.values.maxlen - 1} checks at step {step}"
+            )
+            return True
+        return False
+
+
+class Energy_Plateau(_Plateau):
+    """
+    Stop when the free energy reaches a plateau.
+
+    Params:
+        energy: callable returning the free energy of a state e.g.
+                :code:`Domain_Analyser_2D(config).calculate_free_energy`
+        rtol: relative change tolerance over the window
+        window: number of checks in the window
+        every: check interval in steps
+    """
+
+    label = "free energy"
+
+    def __init__(self, energy: Callable[[NDArray], float], rtol=1e-6, window=5, every=100) -> None:
+        super().__init__(rtol, window, every)
+        self.energy = energy
+
+    def measure(self, state: NDArray) -> float:
+        return float(self.energy(state))
+
+
+class Structure_Factor_Stagnation(_Plateau):
+    """
+    Stop when the characteristic length from the first moment of the radially
+    averaged structure factor stops growing.
+
+    Params:
+        analyser: :code:`FFT_Analyser_2D` of the configuration
+        rtol: relative change tolerance over the window
+        window: number of checks in the window
+        every: check interval in steps
+    """
+
+    label = "structure factor peak"
+
+    def __init__(self, analyser, rtol=1e-3, window=5, every=100) -> None:
+        super().__init__(rtol, window, every)
+        self.analyser = analyser
+
+    def measure(self, state: NDArray) -> float:
+        self.analyser.analyze_domain(state)
+        sizes, spectrum = self.analyser.power_spectrum()
+        spectrum = np.nan_to_num(spectrum)
+        return float(np.sum(sizes * spectrum) / (np.sum(spectrum) or 1.0))
+
+
+def integrated_autocorrelation_time(series: NDArray, c: float = 5.0) -> float:
+    """
+    Integrated autocorrelation time with Sokal's automatic windowing.
+    """
+    x = np.asarray(series, dtype=np.float64)
+    x = x - x.mean()
+    n = len(x)
+    if n < 2 or not np.any(x):
+        return 1.0
+    f = np.fft.rfft(x, n=2 * n)
+    acf = np.fft.irfft(f * np.conjugate(f))[:n]
+    acf /= acf[0]
+    taus = 2.0 * np.cumsum(acf) - 1.0
+    windows = np.arange(n) < c * taus
+    m = int(np.argmin(windows)) if not np.all(windows) else n - 1
+    return max(float(taus[m]), 1.0)
+
+
+class Autocorrelation_Equilibration(StoppingCriterion):
+    """
+    Stop when an observable (e.g. Ising magnetisation or energy) has equilibrated.
+
+    The observable is recorded every `every` steps in a window of `window`
+    samples. The window is equilibrated when it spans at least `min_tau`
+    integrated autocorrelation times and the means of its two halves agree
+    within `z` standard errors (corrected for autocorrelation).
+
+    Params:
+        observable: callable returning a scalar of the state (default mean)
+        window: number of samples
+        z: allowed difference of half-window means in standard errors
+        min_tau: minimal window length in autocorrelation times
+        every: sampling interval in steps
+    """
+
+    def __init__(self, observable: Callable = np.mean, window=200, z=2.0, min_tau=20.0, every=1) -> None:
+        super().__init__(every)
+        self.observable = observable
+        self.samples = deque(maxlen=window)
+        self.z = z
+        self.min_tau = min_tau
+        self.tau = np.inf
+
+    def check(self, step: int, state: NDArray) -> bool:
+        self.samples.append(float(self.observable(state)))
+        if len(self.samples) < self.samples.maxlen:
+            return False
+        x = np.asarray(self.samples)
+        self.tau = integrated_autocorrelation_time(x)
+        if len(x) < self.min_tau * self.tau:
+            return False
+        half = len(x) // 2
+        first, second = x[:half], x[half:]
+        error = np.sqrt(self.tau * (first.var() + second.var()) / half)
+        if abs(first.mean() - second.mean()) <= self.z * error:
+            self.reason = (
+                f"observable equilibrated (tau {self.tau:.1f} samples, mean {second.mean():.4g}) "
+                f"at step {step}"
+            )
+            return True
+        return False
@@ -1,13 +1,58 @@
 # -*- coding: utf-8 -*-
 
+"""
+Storage of simulation results in HDF5 files and memory mapped frame stores.
+
+The :code:`h5py` package is imported on first use, importing it takes longer
+than most short simulations.
+"""
+
+import json
 from datetime import datetime
 from pathlib import Path
 
-import h5py
 import numpy as np
 
+from microtex.numerics.resampling import halve
+from microtex.profiling import count, stage
+from microtex.rng import as_stream
+from microtex.storage._cache import Cache_Entry as Cache_Entry
+from microtex.storage._cache import Result_Cache as Result_Cache
+from microtex.storage._codecs import Codec as Codec
+from microtex.storage._codecs import Delta_Codec as Delta_Codec
+from microtex.storage._codecs import Quantized_Codec as Quantized_Codec
+from microtex.storage._codecs import Raw_Codec as Raw_Codec
+from microtex.storage._codecs import codec_from_attrs, fast_compression, make_codec
+from microtex.storage._history import HISTORY, History_Buffer, history_options, chunk_reads, create_history, fields_reads
+from microtex.storage._history import rechunk_history as rechunk_history
+from microtex.storage._memmap import Attributes as Attributes
+from microtex.storage._memmap import MemmapReader as MemmapReader
+from microtex.storage._memmap import MemmapWriter as MemmapWriter
+from microtex.storage._memmap import hdf5_to_memmap as hdf5_to_memmap
+from microtex.storage._memmap import memmap_to_hdf5 as memmap_to_hdf5
+
 
-__all__ = tuple(["HDF5Writer", "HDF5Reader"])
+__all__ = tuple(
+    [
+        "HDF5Writer",
+        "HDF5Reader",
+        "MemmapWriter",
+        "MemmapReader",
+        "hdf5_to_memmap",
+        "memmap_to_hdf5",
+        "rechunk_history",
+        "open_reader",
+        "search_simulations",
+        "Attributes",
+        "Result_Cache",
+        "Cache_Entry",
+        "Codec",
+        "Raw_Codec",
+        "Quantized_Codec",
+        "Delta_Codec",
+        "make_codec",
+    ]
+)
 
 
 class HDF5Writer:
@@ -19,7 +64,19 @@ class HDF5Writer:
         data: initial array
         shape: dataset shape (not counting main/batch axis)
         dtype: numpy dtype (default np.float32)
-        compression: compression filter (default 'gzip')
+        compression: compression filter (default 'gzip', with a codec a fast
+                     shuffling compressor, see :code:`fast_compression`)
+        codec: field codec name ('raw', 'quantized', 'delta') or instance
+        codec_params: keyword arguments of the codec e.g. dict(bits=8)
+        pyramid: downsampling factors of preview levels stored next to every frame
+                 as block means in 'pyramid/<factor>' datasets (in the decoded dtype),
+                 ``True`` for those of (2, 4, 8) not exceeding the grid size
+        rng: the :code:`Random_Stream` of the run (or a seed or a seeded generator,
+             see :code:`as_stream`), its seed lineage is stored in the
+             'rng_entropy' and 'rng_spawn_key' attributes
+        history: also write the time-major 'history' dataset, ``True`` or
+                 dict(tile=32, time_chunk=64), see :code:`rechunk_history`;
+                 `time_chunk` frames are buffered, call :code:`flush` after the last append
 
     Usage:
         # create store according to initial array field_i
@@ -28,50 +85,162 @@ class HDF5Writer:
         hdf5_store.append(field_1, timestep=1)
         hdf5_store.append(field_2, timestep=2)
 
+        # 16-bit quantized differences of frames, error below 1e-4
+        HDF5Writer('/tmp/hdf5_store.h5', field_i, config, codec='delta', codec_params=dict(error=1e-4))
+
+        # previews at 1/2, 1/4 and 1/8 resolution, see HDF5Reader.get_field(resolution=...)
+        HDF5Writer('/tmp/hdf5_store.h5', field_i, config, pyramid=True)
+
+        # fast point histories, see HDF5Reader.history
+        hdf5_store = HDF5Writer('/tmp/hdf5_store.h5', field_i, config, history=dict(time_chunk=256))
+        ...
+        hdf5_store.flush()
+
     """
 
     def __init__(self, filename, data, config, **kwargs):
+        import h5py
+
         self.filename = filename
         self.shape = data.shape
         self.i = 1
         dtype = kwargs.get('dtype', np.float32)
-        compression = kwargs.get('compression', 'gzip') 
+        codec = kwargs.get('codec')
+        self.codec = make_codec(codec, **{'dtype': dtype, **kwargs.get('codec_params', {})})
+        if codec is None:
+            filters = dict(compression=kwargs.get('compression', 'gzip'), chunks=True)
+        else:
+            # one chunk per frame, a random read decompresses a single frame
+            filters = dict(fast_compression(), chunks=(1,) + self.shape)
+            if 'compression' in kwargs:
+                filters = dict(compression=kwargs['compression'], shuffle=True, chunks=filters['chunks'])
+        pyramid = kwargs.get('pyramid') or ()
+        if pyramid is True:
+            # the default levels of small grids stop at a single cell
+            pyramid = tuple(f for f in (2, 4, 8) if f <= min(self.shape))
+        self.pyramid = tuple(sorted(int(f) for f in pyramid))
+        if any(f < 2 or f & (f - 1) for f in self.pyramid):
+            raise ValueError("The pyramid factors must be powers of two.")
+        if any(f > min(self.shape) for f in self.pyramid):
+            raise ValueError(f"The pyramid factors must not exceed the grid size {min(self.shape)}.")
+        history = history_options(kwargs['history']) if kwargs.get('history') else None
+        self.history = History_Buffer(history['time_chunk']) if history else None
+        rng = as_stream(kwargs['rng']) if kwargs.get('rng') is not None else None
 
         with h5py.File(self.filename, mode="w") as h5f:
             dset = h5f.create_dataset(
                 "fields",
                 maxshape=(None,) + self.shape,
-                dtype=dtype,
-                compression=compression,
-                chunks=True,
-                data=data[np.newaxis, :, :],
+                dtype=self.codec.stored_dtype,
+                data=self.codec.encode(data, 0)[np.newaxis, :, :],
+                **filters,
             )
+            if codec is not None:
+                dset.attrs["codec"] = self.codec.name
+                dset.attrs["codec_params"] = json.dumps(self.codec.params)
+            for factor, level in self._levels(data):
+                h5f.create_dataset(
+                    f"pyramid/{factor}",
+                    maxshape=(None,) + level.shape,
+                    dtype=self.codec.dtype,
+                    data=level[np.newaxis],
+                    chunks=(1,) + level.shape,
+                    **fast_compression(),
+                )
+            if self.pyramid:
+                dset.attrs["pyramid"] = list(self.pyramid)
+            if self.history is not None:
+                create_history(h5f, self.shape, self.codec.dtype, **history)
+                self.history.append(h5f, self.codec.roundtrip(data))
             for key in config.keys():
                 dset.attrs[key] = getattr(config, key)
+            if rng is not None:
+                dset.attrs.update(rng.to_attrs())
             dset.attrs["timesteps"] = [0]
             timenow = datetime.now().isoformat()
             dset.attrs["created"] = timenow
             dset.attrs["modified"] = timenow
 
+    @classmethod
+    def open(cls, filename):
+        """
+        Reopen a file written by :code:`HDF5Writer` to append further frames,
+        e.g. to continue a run. History frames which were not flushed are
+        restored from the fields.
+        """
+        import h5py
+
+        self = cls.__new__(cls)
+        self.filename = filename
+        with h5py.File(self.filename, mode="r") as h5f:
+            dset = h5f["fields"]
+            self.shape = dset.shape[1:]
+            self.i = dset.shape[0]
+            self.codec = codec_from_attrs(dset.attrs, dset.dtype)
+            self.pyramid = tuple(int(f) for f in dset.attrs.get("pyramid", ()))
+            if isinstance(self.codec, Delta_Codec):
+                # the next difference is taken to the last stored frame
+                self.codec._previous = self.codec.quantize(self.codec.read(dset, -1))
+            self.history = None
+            if HISTORY in h5f:
+                history = h5f[HISTORY]
+                self.history = History_Buffer(int(history.attrs["time_chunk"]))
+                for n in range(history.shape[2], self.i):
+                    self.history.frames.append(self.codec.read(dset, n))
+        return self
+
     def append(self, field, timestep=None):
+        import h5py
+
         if timestep is None:
             timestep = self.i
-        with h5py.File(self.filename, mode="a") as h5f:
+        with stage("io.append"), h5py.File(self.filename, mode="a") as h5f:
             dset = h5f["fields"]
+            encoded = self.codec.encode(field, self.i)
+            count("io.bytes_written", encoded.nbytes)
             dset.resize((self.i + 1,) + self.shape)
-            dset[self.i] = field
+            dset[self.i] = encoded
+            for factor, level in self._levels(field):
+                pyramid = h5f[f"pyramid/{factor}"]
+                pyramid.resize(self.i + 1, axis=0)
+                pyramid[self.i] = level
+            if self.history is not None:
+                self.history.append(h5f, self.codec.roundtrip(field))
             dset.attrs["timesteps"] = np.append(dset.attrs["timesteps"], timestep)
             dset.attrs["modified"] = datetime.now().isoformat()
             h5f.flush()
             self.i += 1
 
+    def flush(self):
+        """
+        Write the frames buffered for the 'history' dataset.
+        """
+        import h5py
+
+        if self.history is not None and self.history.frames:
+            with h5py.File(self.filename, mode="a") as h5f:
+                self.history.flush(h5f)
+
+    def _levels(self, field):
+        # each level halves the previous one, the work per frame is dominated
+        # by the first reduction
+        level, factor = np.asarray(field), 1
+        for target in self.pyramid:
+            while factor < target:
+                level, factor = halve(level), 2 * factor
+            yield factor, level
+
     def set_attr(self, key, value):
+        import h5py
+
         with h5py.File(self.filename, mode="a") as h5f:
             dset = h5f["fields"]
             dset.attrs[key] = value
             h5f.flush()
 
     def del_attr(self, key):
+        import h5py
+
         with h5py.File(self.filename, mode="a") as h5f:
             dset = h5f["fields"]
             if key in dset.attrs:
@@ -86,10 +255,19 @@ class HDF5Reader:
     Params:
         filename: filepath of HDF5 file
 
+    The frames are decoded with the codec recorded by :code:`HDF5Writer`, the
+    raw h5py file of the context manager gives the stored (encoded) arrays.
+    With a `resolution` the coarsest stored pyramid level whose larger side has
+    at least `resolution` cells is read (the full frames if there is none).
+
     Usage:
         df = HDF5Reader('/tmp/hdf5_store.h5')
         print(df.attrs)
         field = df.get_field(32)
+        fields = df.get_field(slice(0, 10))
+        preview = df.get_field(-1, resolution=256)
+        c = df.history(10, 20)                                   # all frames of a point
+        window = df.region(slice(0, 32), slice(0, 32), slice(0, None, 10))
 
         # or as context manager
 
@@ -99,17 +277,119 @@ class HDF5Reader:
 
     """
     def __init__(self, filename):
+        import h5py
+
         self.filename = filename
         with h5py.File(self.filename, 'r') as h5f:
             dset = h5f['fields']
             self.attrs = dict(dset.attrs)
+            self.shape = dset.shape[1:]
+            self.codec = codec_from_attrs(self.attrs, dset.dtype)
         self.file = None
 
-    def get_field(self, timestep):
+    @property
+    def levels(self):
+        """
+        The downsampling factors of the stored pyramid levels.
+        """
+        return tuple(int(f) for f in self.attrs.get("pyramid", ()))
+
+    def level_for(self, resolution):
+        """
+        Returns the factor of the coarsest level with at least `resolution`
+        cells along the larger side (1 for the full frames).
+        """
+        if resolution is None:
+            return 1
+        size = max(self.shape)
+        return max((f for f in self.levels if size // f >= resolution), default=1)
+
+    def get_field(self, timestep, resolution=None):
+        import h5py
+
+        factor = self.level_for(resolution)
+        with stage("io.read"), h5py.File(self.filename, 'r') as h5f:
+            if factor > 1:
+                return h5f[f'pyramid/{factor}'][timestep]
+            return self.codec.read(h5f['fields'], timestep)
+
+    def _selection(self, x, y, frames):
+        selection = []
+        for index, n in zip((x, y, frames), self.shape + (self.frames,)):
+            if isinstance(index, slice):
+                selected = range(n)[index]
+                if selected.step < 0:
+                    raise ValueError("Negative steps are not supported.")
+            else:
+                selected = range(n)[index : index + 1 if index != -1 else None]
+                if not selected:
+                    raise IndexError(f"Index {index} is out of range of {n}.")
+            selection.append(selected)
+        return selection
+
+    @property
+    def frames(self):
+        return len(self.attrs["timesteps"])
+
+    def query_reads(self, x, y, frames=slice(None)):
+        """
+        Returns the chunk reads of a :code:`region` query from the 'fields'
+        dataset only and with the frames stored in the 'history' dataset read
+        from there (``None`` without history).
+        """
+        import h5py
+
+        rx, ry, selected = self._selection(x, y, frames)
         with h5py.File(self.filename, 'r') as h5f:
-            return h5f['fields'][timestep]
+            return self._query_reads(h5f, rx, ry, selected)
+
+    def _query_reads(self, h5f, rx, ry, selected):
+        fields = h5f['fields']
+        reads = {'fields': fields_reads(fields, self.codec, selected, (rx, ry)), 'history': None}
+        if HISTORY in h5f:
+            history = h5f[HISTORY]
+            covered = len(range(selected.start, min(selected.stop, history.shape[2]), selected.step))
+            reads['history'] = chunk_reads(history.chunks, (rx, ry, selected[:covered])) + fields_reads(
+                fields, self.codec, selected[covered:], (rx, ry)
+            )
+        return reads
+
+    def region(self, x, y, frames=slice(None)):
+        """
+        Returns the values of the cells ``[x, y]`` (integers or slices) of the
+        `frames` (slice) with the time axis first, read from the layout which
+        needs fewer chunk reads.
+        """
+        import h5py
+
+        rx, ry, selected = self._selection(x, y, frames)
+        index = tuple(slice(r.start, r.stop, r.step) if isinstance(i, slice) else r[0] for i, r in zip((x, y), (rx, ry)))
+        with stage("io.read"), h5py.File(self.filename, 'r') as h5f:
+            reads = self._query_reads(h5f, rx, ry, selected)
+            covered = 0
+            if reads['history'] is not None and reads['history'] < reads['fields']:
+                covered = len(range(selected.start, min(selected.stop, h5f[HISTORY].shape[2]), selected.step))
+            parts = []
+            if covered:
+                early = selected[:covered]
+                count("io.history_reads", reads['history'])
+                parts.append(np.moveaxis(h5f[HISTORY][index + (slice(early.start, early[-1] + 1, early.step),)], -1, 0))
+            late = selected[covered:]
+            if late or not parts:
+                late = slice(late.start, late.stop, late.step)
+                parts.append(self.codec.read_region(h5f['fields'], late, index))
+            return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def history(self, x, y, frames=slice(None)):
+        """
+        Returns the time history of the cell ``[x, y]`` over the `frames` (slice),
+        see :code:`region`.
+        """
+        return self.region(int(x), int(y), frames)
 
     def __enter__(self):
+        import h5py
+
         self.file = h5py.File(self.filename, 'r')
         return self.file
 
@@ -117,16 +397,26 @@ class HDF5Reader:
         self.file.close()
 
 
+def open_reader(source):
+    """
+    Returns a reader of a stored simulation (``.mmap`` frame store or HDF5 file),
+    reader objects are passed through.
+    """
+    if hasattr(source, "get_field"):
+        return source
+    return MemmapReader(source) if Path(source).suffix == ".mmap" else HDF5Reader(source)
+
+
 def search_simulations(wdir, **kwargs):
     """Search for HDF5 simulation files using attributes"""
     res = []
     for p in Path(wdir).iterdir():
         if p.is_file():
             try:
-                df = HDF5Reader(p)
+                df = MemmapReader(p) if p.suffix == ".mmap" else HDF5Reader(p)
                 if all(item in df.attrs.items() for item in kwargs.items()):
                     res.append(p)
-            except OSError:
+            except (OSError, ValueError):
                 pass
 
     return res
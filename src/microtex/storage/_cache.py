@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+
+"""
+Content-addressed cache of simulation results.
+
+A run is identified by the SHA-256 of everything which determines its
+frames: the canonical configuration, the solver (name, parameters and the
+microtex version), the random seed lineage or the initial field and the
+snapshot schedule. The step count is not part of the key, a cached run of
+`M` steps holds every frame of the shorter runs with the same key. A request
+of `N` steps is a hit when a run of ``M >= N`` steps is cached, otherwise the
+longest cached run is the prefix to resume from. The snapshot schedule must
+not depend on `N` (e.g. an interval), else the prefixes differ.
+
+Layout: one directory per key holding ``<steps>.h5`` results and their
+``<steps>.json`` records (size, SHA-256, metadata). The records' modification
+times are the last use, the least recently used results are evicted when the
+cache exceeds its size. The size of a result is checked on every lookup, the
+SHA-256 of the content with ``verify=True``; damaged results are removed.
+
+.. code-block::python
+
+    cache = Result_Cache('/scratch/cache', max_bytes=500 * 2**30)
+    key = cache.key(config, Cahn_Hilliard_2D_AB_Solver, seed=stream, schedule=dict(every=1000))
+
+    def run(prefix, filename):
+        # write the run of 100_000 steps to filename, which holds a copy of the prefix result if given
+        if prefix is None:
+            writer = HDF5Writer(filename, config.noisy_field(rng=stream), config)
+        else:
+            writer = HDF5Writer.open(filename)
+        ...
+
+    entry = cache.get_or_run(key, 100_000, run)
+    reader = HDF5Reader(entry.path)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from microtex.profiling import stage
+
+__all__ = tuple(["Cache_Entry", "Result_Cache", "solver_identity", "file_digest"])
+
+
+def file_digest(path, block: int = 2**22) -> str:
+    """
+    Returns the SHA-256 hex digest of the file content.
+    """
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(block), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def solver_identity(solver) -> Dict:
+    """
+    Returns the identity of a solver: the qualified name of the function or
+    class and the simple public attributes of a solver instance.
+    """
+    import microtex
+
+    if isinstance(solver, str):
+        name, params = solver, {}
+    elif isinstance(solver, type) or callable(solver) and hasattr(solver, "__qualname__"):
+        name, params = f"{solver.__module__}.{solver.__qualname__}", {}
+    else:
+        kind = type(solver)
+        name = f"{kind.__module__}.{kind.__qualname__}"
+        params = {
+            k: v
+            for k, v in vars(solver).items()
+            if not k.startswith("_") and (v is None or isinstance(v, (bool, int, float, str)))
+        }
+    return {"name": name, "params": params, "version": microtex.__version__}
+
+
+def _seed_identity(seed):
+    from microtex.rng import as_stream
+
+    if seed is None:
+        # a run from fresh entropy is not reproducible, it must not share the key of other runs
+        raise ValueError("A cached run needs its seed, Random_Stream or initial field.")
+    if isinstance(seed, np.ndarray):
+        data = np.ascontiguousarray(seed)
+        return {"field": hashlib.sha256(data.tobytes()).hexdigest(), "shape": list(data.shape), "dtype": data.dtype.str}
+    return as_stream(seed).lineage
+
+
+@dataclass
+class Cache_Entry:
+    """
+    A cached result of `steps` steps.
+    """
+
+    key: str
+    steps: int
+    path: Path
+    size: int
+    sha256: str
+    created: float
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def record(self) -> Path:
+        return self.path.with_suffix(".json")
+
+
+class Result_Cache:
+    """
+    Content-addressed cache of HDF5 (or any single file) results.
+
+    Params:
+        directory: the cache directory
+        max_bytes: evict the least recently used results beyond this size (``None`` keeps all)
+        verify: check the SHA-256 of a result on every lookup, not only its size
+    """
+
+    def __init__(self, directory, max_bytes: Optional[int] = None, verify: bool = False) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.verify = verify
+
+    @staticmethod
+    def key(config, solver, seed, schedule=None) -> str:
+        """
+        Returns the cache key of a run.
+
+        Params:
+            config: the model configuration
+            solver: the solver function, class, instance or name
+            seed: the seed, :code:`Random_Stream` (or seeded generator, see
+                  :code:`as_stream`) or initial field of the run
+            schedule: a JSON serializable description of the snapshot schedule
+        """
+        from microtex.modeling._model import _canonical, configuration_digest
+
+        document = {
+            "configuration": configuration_digest(config),
+            "solver": solver_identity(solver),
+            "seed": _seed_identity(seed),
+            "schedule": schedule,
+        }
+        text = json.dumps(_canonical(document), sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def _entries(self, key: str) -> List[Cache_Entry]:
+        entries = []
+        for record in (self.directory / key).glob("*.json"):
+            try:
+                entries.append(self._load(record))
+            except (OSError, ValueError, KeyError):
+                self._remove(record.with_suffix(".h5"))
+        return sorted(entries, key=lambda entry: entry.steps)
+
+    def _load(self, record: Path) -> Cache_Entry:
+        data = json.loads(record.read_text())
+        return Cache_Entry(
+            data["key"], data["steps"], record.with_suffix(".h5"), data["size"], data["sha256"], data["created"],
+            data.get("metadata", {}),
+        )
+
+    def entries(self) -> List[Cache_Entry]:
+        """
+        Returns all cached results.
+        """
+        keys = sorted(p.name for p in self.directory.iterdir() if p.is_dir())
+        return [entry for key in keys for entry in self._entries(key)]
+
+    def size(self) -> int:
+        """
+        Returns the total size of the cached results [bytes].
+        """
+        return sum(entry.size for entry in self.entries())
+
+    def check(self, entry: Cache_Entry, full: bool = None) -> bool:
+        """
+        Returns ``True`` if the result is intact: the size matches and (with
+        `full`, default :code:`verify`) the SHA-256 of the content.
+        """
+        try:
+            if entry.path.stat().st_size != entry.size:
+                return False
+        except OSError:
+            return False
+        if self.verify if full is None else full:
+            with stage("cache.verify"):
+                return file_digest(entry.path) == entry.sha256
+        return True
+
+    def lookup(self, key: str, steps: int) -> Optional[Cache_Entry]:
+        """
+        Returns the shortest cached result of at least `steps` steps (a hit), or
+        else the longest shorter one (the prefix to resume from), ``None`` if
+        nothing of the run is cached. Damaged results are removed.
+        """
+        found = None
+        for entry in self._entries(key):
+            if not self.check(entry):
+                self._remove(entry.path)
+                continue
+            found = entry
+            if entry.steps >= steps:
+                break
+        if found is not None:
+            # the record modification time is the last use
+            os.utime(found.record)
+        return found
+
+    def store(self, key: str, steps: int, source, move: bool = False, metadata: Dict = None) -> Cache_Entry:
+        """
+        Add the result file of `steps` steps, copied (or moved) into the cache.
+        """
+        target = self.directory / key / f"{int(steps)}.h5"
+        target.parent.mkdir(exist_ok=True)
+        temporary = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+        with stage("cache.store"):
+            if move:
+                shutil.move(str(source), temporary)
+            else:
+                shutil.copyfile(source, temporary)
+            entry = Cache_Entry(
+                key, int(steps), target, temporary.stat().st_size, file_digest(temporary), time.time(), metadata or {}
+            )
+            os.replace(temporary, target)
+        # the record is written last, a result without record is not used
+        record = asdict(entry)
+        record["path"] = target.name
+        temporary = entry.record.with_name(f".{entry.record.name}.tmp")
+        temporary.write_text(json.dumps(record))
+        os.replace(temporary, entry.record)
+        if self.max_bytes is not None:
+            self.evict(keep=entry)
+        return entry
+
+    def _remove(self, path: Path) -> None:
+        for p in (path.with_suffix(".json"), path):
+            try:
+                p.unlink()
+            except FileNotFoundError:
+                pass
+        try:
+            path.parent.rmdir()
+        except OSError:
+            pass
+
+    def evict(self, max_bytes: Optional[int] = None, keep: Cache_Entry = None) -> List[Cache_Entry]:
+        """
+        Remove the least recently used results until the cache holds at most
+        `max_bytes` (default :code:`max_bytes`), except for the result `keep`.
+
+        :return: The removed entries.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self.entries(), key=lambda entry: entry.record.stat().st_mtime)
+        total = sum(entry.size for entry in entries)
+        removed = []
+        for entry in entries:
+            if total <= max_bytes:
+                break
+            if keep is not None and entry.path == keep.path:
+                continue
+            self._remove(entry.path)
+            total -= entry.size
+            removed.append(entry)
+        return removed
+
+    def get_or_run(
+        self, key: str, steps: int, run: Callable[[Optional[Cache_Entry], Path], Any], **metadata
+    ) -> Cache_Entry:
+        """
+        Returns the cached result of `steps` steps, or computes it with
+        ``run(prefix, filename)``: write the result of `steps` steps to `filename`.
+        If `prefix` (the entry of the longest cached shorter run) is not ``None``,
+        `filename` is a copy of its result to continue, e.g. with
+        :code:`HDF5Writer.open`. The result is stored with the `metadata`.
+        """
+        entry = self.lookup(key, steps)
+        if entry is not None and entry.steps >= steps:
+            return entry
+        filename = self.directory / f".{key}.{steps}.{os.getpid()}.h5"
+        try:
+            if entry is not None:
+                shutil.copyfile(entry.path, filename)
+            run(entry, filename)
+            return self.store(key, steps, filename, move=True, metadata=metadata)
+        finally:
+            if filename.exists():
+                filename.unlink()
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+
+"""
+Field codecs of the HDF5 storage.
+
+A codec turns a floating point frame into the array stored in the ``fields``
+dataset and back. The codec name and parameters are stored in the dataset
+attributes, so :code:`HDF5Reader` decodes frames transparently.
+
+* ``raw`` stores the frames as they are (the original layout).
+* ``quantized`` maps the values from ``[low, high]`` to ``uint8``/``uint16``,
+  the absolute error is at most half of the quantization step. Concentrations
+  in (0, 1) fit 16 bits with an error below 1e-5, Ising spins ±1 are exact in 8 bits.
+* ``delta`` quantizes as well, but stores the zigzag encoded difference to the
+  previous frame, with an absolute keyframe every `keyframe` frames. Slowly
+  evolving fields have small differences whose high bytes are zero, which the
+  byte shuffle filter groups together for the compressor.
+
+The encoding is plain NumPy. The datasets are compressed with Blosc/LZ4 of the
+optional :code:`hdf5plugin` package when it is installed, otherwise with the
+shuffle and LZF filters bundled with h5py.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+from numpy.typing import NDArray
+
+__all__ = tuple(
+    ["Codec", "Raw_Codec", "Quantized_Codec", "Delta_Codec", "make_codec", "codec_from_attrs", "fast_compression"]
+)
+
+
+def fast_compression() -> Dict:
+    """
+    Returns the keyword arguments of :code:`h5py.Group.create_dataset` for a fast
+    byte shuffling compressor, Blosc/LZ4 if :code:`hdf5plugin` is available else LZF.
+    """
+    try:
+        import hdf5plugin
+    except ImportError:
+        return {"compression": "lzf", "shuffle": True}
+    return dict(hdf5plugin.Blosc(cname="lz4", clevel=5, shuffle=hdf5plugin.Blosc.SHUFFLE))
+
+
+class Codec:
+    """
+    Base class of the field codecs, the identity (``raw``) codec.
+
+    Params:
+        dtype: the dtype of stored and decoded frames
+    """
+
+    name = "raw"
+
+    def __init__(self, dtype=np.float32) -> None:
+        self.dtype = np.dtype(dtype)
+
+    @property
+    def stored_dtype(self) -> np.dtype:
+        """
+        The dtype of the dataset.
+        """
+        return self.dtype
+
+    @property
+    def params(self) -> Dict:
+        """
+        The parameters which recreate the codec with :code:`make_codec`.
+        """
+        return {"dtype": self.dtype.str}
+
+    @property
+    def max_error(self) -> float:
+        """
+        The maximal absolute error of decoded values inside the value range.
+        """
+        return 0.0
+
+    def encode(self, frame: NDArray, index: int) -> NDArray:
+        """
+        Encode the frame stored at `index` (frames are encoded in order).
+        """
+        return np.asarray(frame, dtype=self.dtype)
+
+    def read(self, dset, index) -> NDArray:
+        """
+        Read and decode the frame(s) at `index` (an integer or a slice) of the dataset.
+        """
+        return dset[index]
+
+    def read_region(self, dset, frames: slice, region: tuple) -> NDArray:
+        """
+        Read and decode the `region` (a tuple of integers or slices of the
+        spatial axes) of the frames selected by the slice `frames`.
+        """
+        return dset[(frames,) + region]
+
+    def roundtrip(self, frame: NDArray) -> NDArray:
+        """
+        Returns the frame as it is decoded after encoding, e.g. quantized.
+        """
+        return np.asarray(frame, dtype=self.dtype)
+
+    def reset(self) -> None:
+        """
+        Forget the encoder state e.g. before encoding another sequence.
+        """
+
+
+Raw_Codec = Codec
+
+
+class Quantized_Codec(Codec):
+    """
+    Linear quantization of the values in ``[low, high]`` to unsigned integers.
+
+    Params:
+        bits: 8 or 16 (default the smallest holding all levels, 16 without `error`)
+        low: the lowest stored value, smaller values are clipped
+        high: the highest stored value, greater values are clipped
+        error: the maximal absolute error (up to rounding to `dtype`), the step is twice the error
+        scale: the quantization step (default from `error` or `bits`)
+        dtype: the dtype of decoded frames
+
+    Usage:
+        Quantized_Codec(error=1e-4)                   # concentrations, 5001 levels in 16 bits
+        Quantized_Codec(bits=8, low=-1.0, high=1.0)   # Ising spins, lossless
+    """
+
+    name = "quantized"
+
+    def __init__(self, bits: Optional[int] = None, low=0.0, high=1.0, error: float = None, scale: float = None, dtype=np.float32):
+        super().__init__(dtype)
+        if not high > low:
+            raise ValueError("The value range must not be empty.")
+        self.low, self.high = float(low), float(high)
+        if scale is None:
+            scale = 2.0 * error if error is not None else (self.high - self.low) / (2 ** (bits or 16) - 1)
+        self.scale = float(scale)
+        self.levels = int(np.ceil((self.high - self.low) / self.scale - 1e-9)) + 1
+        needed = next((b for b in (8, 16) if self.levels <= 2**b), None)
+        if needed is None:
+            raise ValueError(f"Error {self.max_error:.3g} needs more than 16 bits for range [{low}, {high}].")
+        if bits not in (None, 8, 16):
+            raise ValueError("Quantization supports 8 or 16 bits.")
+        if bits is not None and bits < needed:
+            raise ValueError(f"{self.levels} levels of step {self.scale:.3g} do not fit {bits} bits.")
+        self.bits = bits or needed
+
+    @property
+    def stored_dtype(self) -> np.dtype:
+        return np.dtype(np.uint8 if self.bits == 8 else np.uint16)
+
+    @property
+    def params(self) -> Dict:
+        return {"bits": self.bits, "low": self.low, "high": self.high, "scale": self.scale, "dtype": self.dtype.str}
+
+    @property
+    def max_error(self) -> float:
+        return self.scale / 2
+
+    def quantize(self, frame: NDArray) -> NDArray:
+        q = (np.asarray(frame, dtype=np.float64) - self.low) / self.scale
+        return np.rint(np.clip(q, 0, self.levels - 1)).astype(self.stored_dtype)
+
+    def dequantize(self, q: NDArray) -> NDArray:
+        return (q * self.scale + self.low).astype(self.dtype)
+
+    def encode(self, frame: NDArray, index: int) -> NDArray:
+        return self.quantize(frame)
+
+    def read(self, dset, index) -> NDArray:
+        return self.dequantize(dset[index])
+
+    def read_region(self, dset, frames: slice, region: tuple) -> NDArray:
+        return self.dequantize(dset[(frames,) + region])
+
+    def roundtrip(self, frame: NDArray) -> NDArray:
+        return self.dequantize(self.quantize(frame))
+
+
+def _zigzag(d: NDArray, bits: int) -> NDArray:
+    # small signed differences to small unsigned integers: 0, -1, 1, -2 -> 0, 1, 2, 3
+    return ((d << 1) ^ (d >> (bits - 1))).astype(f"u{bits // 8}")
+
+
+def _unzigzag(z: NDArray, bits: int) -> NDArray:
+    z = z.astype(f"i{bits // 4}")
+    return (z >> 1) ^ -(z & 1)
+
+
+def _forward(frames: slice, n: int) -> Tuple[int, int, int]:
+    # the differences are accumulated forwards, as h5py the frames are read with positive steps only
+    start, stop, step = frames.indices(n)
+    if step < 0:
+        raise ValueError(f"Step must be >= 1 (got {step}).")
+    return start, stop, step
+
+
+class Delta_Codec(Quantized_Codec):
+    """
+    Quantized temporal differences with periodic keyframes.
+
+    Params:
+        keyframe: interval of frames stored absolutely, a random read decodes
+                  at most `keyframe` frames
+        bits, low, high, error, dtype: see :code:`Quantized_Codec`
+    """
+
+    name = "delta"
+
+    def __init__(self, keyframe: int = 16, **kwargs) -> None:
+        super().__init__(**kwargs)
+        if keyframe < 1:
+            raise ValueError("The keyframe interval must be positive.")
+        self.keyframe = keyframe
+        self._previous = None
+        self._block = None
+
+    @property
+    def params(self) -> Dict:
+        return dict(super().params, keyframe=self.keyframe)
+
+    def reset(self) -> None:
+        self._previous = None
+        self._block = None
+
+    def encode(self, frame: NDArray, index: int) -> NDArray:
+        q = self.quantize(frame)
+        previous, self._previous = self._previous, q
+        if index % self.keyframe == 0:
+            return q
+        if previous is None:
+            raise ValueError("The delta codec must encode the frames in order.")
+        # wrap the difference into the signed n-bit range, zigzag keeps it in n bits
+        d = q.astype(np.int32) - previous.astype(np.int32)
+        d = (d + 2 ** (self.bits - 1)) % 2**self.bits - 2 ** (self.bits - 1)
+        return _zigzag(d, self.bits)
+
+    def _accumulate(self, frames: NDArray) -> NDArray:
+        # frames[0] is a keyframe, the rest are differences
+        d = _unzigzag(frames[1:], self.bits)
+        total = frames[0].astype(np.int64) + np.cumsum(d, axis=0, dtype=np.int64)
+        return np.concatenate([frames[:1], (total % 2**self.bits).astype(self.stored_dtype)])
+
+    def _decode_block(self, dset, first: int) -> NDArray:
+        # the keyframe block starting at `first`, the last decoded block is kept
+        # so that reading the frames in order decodes every block once
+        key = (dset.file.filename, dset.name, first)
+        if self._block is None or self._block[0] != key or len(self._block[1]) < min(self.keyframe, len(dset) - first):
+            self._block = (key, self._accumulate(dset[first : first + self.keyframe]))
+        return self._block[1]
+
+    def read(self, dset, index) -> NDArray:
+        if isinstance(index, slice):
+            start, stop, step = _forward(index, len(dset))
+            if start >= stop:
+                return self.dequantize(dset[start:stop])
+            first = start - start % self.keyframe
+            q = np.concatenate([self._decode_block(dset, k) for k in range(first, stop, self.keyframe)])
+            return self.dequantize(q[start - first : stop - first : step])
+        index = int(index)
+        if index < 0:
+            index += len(dset)
+        if not 0 <= index < len(dset):
+            raise IndexError(f"Frame {index} is out of range of {len(dset)} frames.")
+        first = index - index % self.keyframe
+        return self.dequantize(self._decode_block(dset, first)[index - first])
+
+    def read_region(self, dset, frames: slice, region: tuple) -> NDArray:
+        # the differences are decoded on the region only, from the keyframes on
+        start, stop, step = _forward(frames, len(dset))
+        if start >= stop:
+            return self.dequantize(dset[(slice(start, stop),) + region])
+        first = start - start % self.keyframe
+        q = np.concatenate(
+            [
+                self._accumulate(dset[(slice(k, min(k + self.keyframe, stop)),) + region])
+                for k in range(first, stop, self.keyframe)
+            ]
+        )
+        return self.dequantize(q[start - first : stop - first : step])
+
+
+_CODECS = {codec.name: codec for codec in (Codec, Quantized_Codec, Delta_Codec)}
+
+
+def make_codec(codec: Union[None, str, Codec], **params) -> Codec:
+    """
+    Returns the codec instance of a name (or passes an instance through).
+    """
+    if isinstance(codec, Codec):
+        return codec
+    try:
+        return _CODECS[codec or "raw"](**params)
+    except KeyError:
+        raise ValueError(f"Unknown codec '{codec}', choose one of {sorted(_CODECS)}.") from None
+
+
+def codec_from_attrs(attrs, dtype=np.float32) -> Codec:
+    """
+    Returns the codec of a ``fields`` dataset from its attributes, the raw
+    codec of the dataset `dtype` if there are none.
+    """
+    if "codec" not in attrs:
+        return Codec(dtype)
+    return make_codec(str(attrs["codec"]), **json.loads(attrs["codec_params"]))
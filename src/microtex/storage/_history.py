@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+"""
+Time-major companion layout of the HDF5 ``fields`` dataset.
+
+The ``fields`` dataset is frame-major: a chunk holds (a part of) one frame, so
+the time history of a point or a small window touches a chunk of every frame.
+The optional ``history`` dataset stores the same decoded values transposed to
+``(nx, ny, frames)`` in chunks of ``tile x tile`` cells by `time_chunk` frames,
+a point history reads one chunk per `time_chunk` frames.
+
+The history is written by :code:`HDF5Writer(history=True)`, which buffers
+`time_chunk` frames and writes them as one row of chunks, or afterwards by
+:code:`rechunk_history` within a memory budget. Frames which are not (yet) in
+the history are read from ``fields``, :code:`HDF5Reader.history` and
+:code:`HDF5Reader.region` take whichever layout needs fewer chunk reads.
+
+.. code-block::python
+
+    rechunk_history('run.h5', tile=32, time_chunk=256, memory=2**28)
+    reader = HDF5Reader('run.h5')
+    c = reader.history(10, 20)                                   # (frames,)
+    window = reader.region(slice(0, 32), slice(32, 64), frames=slice(0, None, 10))
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from microtex.profiling import stage
+from microtex.storage._codecs import Delta_Codec, codec_from_attrs, fast_compression
+
+__all__ = tuple(["History_Buffer", "rechunk_history", "chunk_reads"])
+
+
+HISTORY = "history"
+
+
+def history_options(history) -> Dict:
+    """
+    Returns the layout of the 'history' dataset from ``True`` or a dict of `tile` and `time_chunk`.
+    """
+    options = dict(tile=32, time_chunk=64)
+    if isinstance(history, dict):
+        options.update(history)
+    return {key: int(value) for key, value in options.items()}
+
+
+def create_history(h5f, shape: Tuple[int, int], dtype, tile: int = 32, time_chunk: int = 64):
+    """
+    Create the empty ``history`` dataset of frames of `shape` in file `h5f`.
+    """
+    chunks = (min(tile, shape[0]), min(tile, shape[1]), time_chunk)
+    dset = h5f.create_dataset(
+        HISTORY, shape=shape + (0,), maxshape=shape + (None,), dtype=dtype, chunks=chunks, **fast_compression()
+    )
+    dset.attrs["tile"] = tile
+    dset.attrs["time_chunk"] = time_chunk
+    return dset
+
+
+class History_Buffer:
+    """
+    Collect frames and append them to the ``history`` dataset in blocks of
+    `time_chunk` frames, so every chunk is written once.
+
+    The buffer holds up to `time_chunk` frames in memory.
+    """
+
+    def __init__(self, time_chunk: int) -> None:
+        self.time_chunk = time_chunk
+        self.frames = []
+
+    def append(self, h5f, frame: NDArray) -> None:
+        self.frames.append(frame)
+        if len(self.frames) == self.time_chunk:
+            self.flush(h5f)
+
+    def flush(self, h5f) -> None:
+        """
+        Write the buffered frames (a partial block is completed by later writes).
+        """
+        if not self.frames:
+            return
+        with stage("io.history"):
+            dset = h5f[HISTORY]
+            start = dset.shape[2]
+            dset.resize(start + len(self.frames), axis=2)
+            dset[:, :, start:] = np.stack(self.frames, axis=-1)
+        self.frames = []
+
+
+def rechunk_history(filename, tile: int = 32, time_chunk: int = 64, memory: int = 256 * 2**20) -> None:
+    """
+    Build (or rebuild) the ``history`` dataset of an HDF5 file from its ``fields``.
+
+    The frames are transposed in blocks of `time_chunk` frames by bands of rows
+    holding at most `memory` bytes (twice, for the transposed copy), every
+    chunk of the history is written once. With bands narrower than the frames
+    a frame-major chunk is decompressed once per band.
+    """
+    import h5py
+
+    with h5py.File(filename, mode="a") as h5f:
+        fields = h5f["fields"]
+        codec = codec_from_attrs(fields.attrs, fields.dtype)
+        frames, nx, ny = fields.shape
+        if HISTORY in h5f:
+            del h5f[HISTORY]
+        history = create_history(h5f, (nx, ny), codec.dtype, tile, time_chunk)
+        history.resize(frames, axis=2)
+
+        row_bytes = 2 * time_chunk * ny * codec.dtype.itemsize
+        rows = max(tile, memory // row_bytes // tile * tile)
+        for t0 in range(0, frames, time_chunk):
+            t1 = min(t0 + time_chunk, frames)
+            for r0 in range(0, nx, rows):
+                r1 = min(r0 + rows, nx)
+                with stage("io.rechunk"):
+                    block = codec.read_region(fields, slice(t0, t1), (slice(r0, r1), slice(None)))
+                    history[r0:r1, :, t0:t1] = np.moveaxis(block, 0, -1)
+
+
+def _axis_chunks(selection: range, chunk: int) -> int:
+    # number of chunks of size `chunk` holding the selected indices
+    if len(selection) == 0:
+        return 0
+    if abs(selection.step) >= chunk:
+        return len(selection)
+    first, last = sorted((selection[0], selection[-1]))
+    return last // chunk - first // chunk + 1
+
+
+def chunk_reads(chunks: Tuple[int, ...], selection: Tuple[range, ...]) -> int:
+    """
+    Returns the number of chunks of a dataset touched by a selection (one range per axis).
+    """
+    reads = 1
+    for chunk, axis in zip(chunks, selection):
+        reads *= _axis_chunks(axis, chunk)
+    return reads
+
+
+def fields_reads(dset, codec, frames: range, region: Tuple[range, range]) -> int:
+    """
+    Returns the chunk reads of a region of the frames from the ``fields`` dataset.
+    """
+    if isinstance(codec, Delta_Codec) and len(frames):
+        # every touched keyframe block is decoded from its keyframe on
+        frames = range(_axis_chunks(frames, codec.keyframe) * codec.keyframe)
+    return chunk_reads(dset.chunks or dset.shape, (frames,) + region)
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+
+"""
+Memory mapped raw frame store.
+
+The frames are stored uncompressed in one flat binary file, which readers map
+with :code:`np.memmap`. A frame read is a zero-copy view, pages are shared by
+all processes mapping the file and are loaded by the operating system on
+first access, so repeated analyses of large runs do not copy or decompress.
+
+File layout (the offsets are multiples of 4096 bytes)::
+
+    | JSON header (zero padded) | frames[capacity, *shape] | timesteps int64[capacity] |
+
+The header holds the magic, shape, dtype, capacity, number of frames and the
+attributes (configuration, created, modified). The capacity doubles when the
+store is full, only the small timesteps array moves.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime
+from typing import Dict
+
+import numpy as np
+from numpy.typing import NDArray
+
+from microtex.numerics.resampling import block_mean
+from microtex.profiling import count, stage
+
+__all__ = tuple(["MemmapWriter", "MemmapReader", "hdf5_to_memmap", "memmap_to_hdf5", "Attributes"])
+
+
+MAGIC = "microtex-frames"
+VERSION = 1
+_ALIGN = 4096
+
+
+def _align(n: int) -> int:
+    return -(-n // _ALIGN) * _ALIGN
+
+
+def _jsonable(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, bytes):
+        return value.decode()
+    return value
+
+
+def _read_header(filename: os.PathLike) -> Dict:
+    with open(filename, "rb") as f:
+        buffer = f.read(_ALIGN)
+        while buffer and b"\0" not in buffer[-_ALIGN:]:
+            more = f.read(_ALIGN)
+            if not more:
+                break
+            buffer += more
+    try:
+        header = json.loads(buffer.split(b"\0", 1)[0])
+    except ValueError:
+        header = None
+    if not isinstance(header, dict) or header.get("magic") != MAGIC:
+        raise ValueError(f"{filename} is not a microtex frame store.")
+    if header["version"] > VERSION:
+        raise ValueError(f"Unsupported frame store version {header['version']}.")
+    return header
+
+
+def _offsets(header: Dict):
+    frame_bytes = int(np.prod(header["shape"])) * np.dtype(header["dtype"]).itemsize
+    frames = header["header_size"]
+    timesteps = frames + _align(header["capacity"] * frame_bytes)
+    return frames, timesteps
+
+
+class Attributes(dict):
+    """
+    Attributes which quack like a configuration, e.g. for :code:`HDF5Writer`
+    or the analysers.
+    """
+
+    def __getattr__(self, key):
+        try:
+            return self[key]
+        except KeyError:
+            raise AttributeError(key) from None
+
+
+class MemmapWriter:
+    """
+    Write frames into a preallocated memory mapped file.
+
+    Params:
+        filename: filepath of the frame store
+        data: initial array
+        config: configuration whose :code:`keys()` are stored as attributes
+        dtype: numpy dtype (default np.float32)
+        capacity: number of preallocated frames (default 64, doubled when full)
+        timestep: timestep of the initial array
+
+    Usage:
+        store = MemmapWriter('/tmp/run.mmap', field_0, config, capacity=1000)
+        store.append(field_1, timestep=1)
+    """
+
+    def __init__(self, filename, data, config, dtype=np.float32, capacity: int = 64, timestep: int = 0) -> None:
+        self.filename = filename
+        self.shape = tuple(data.shape)
+        attrs = {key: _jsonable(getattr(config, key)) for key in config.keys()} if config is not None else {}
+        timenow = datetime.now().isoformat()
+        attrs.setdefault("created", timenow)
+        attrs["modified"] = timenow
+        self.header = {
+            "magic": MAGIC,
+            "version": VERSION,
+            "shape": list(self.shape),
+            "dtype": np.dtype(dtype).str,
+            "capacity": max(int(capacity), 1),
+            "count": 0,
+            "attrs": attrs,
+        }
+        # room for the header to grow (modified time, appended attributes)
+        self.header["header_size"] = _align(len(json.dumps(self.header)) + 1024)
+        with open(self.filename, "wb"):
+            pass
+        self._map()
+        self.i = 0
+        self._store(data, timestep)
+
+    @property
+    def dtype(self) -> np.dtype:
+        return np.dtype(self.header["dtype"])
+
+    def _map(self) -> None:
+        frames, timesteps = _offsets(self.header)
+        capacity = self.header["capacity"]
+        self.frames = np.memmap(self.filename, self.dtype, "r+", frames, (capacity,) + self.shape)
+        self.timesteps = np.memmap(self.filename, np.int64, "r+", timesteps, (capacity,))
+
+    def _write_header(self) -> None:
+        text = json.dumps(self.header).encode()
+        if len(text) >= self.header["header_size"]:
+            raise ValueError("The attributes do not fit the frame store header.")
+        with open(self.filename, "r+b") as f:
+            f.write(text.ljust(self.header["header_size"], b"\0"))
+
+    def _grow(self) -> None:
+        timesteps = np.array(self.timesteps)
+        self.frames.flush()
+        del self.frames, self.timesteps
+        self.header["capacity"] *= 2
+        self._map()
+        self.timesteps[: len(timesteps)] = timesteps
+
+    def _store(self, field: NDArray, timestep: int) -> None:
+        if field.shape != self.shape:
+            raise ValueError(f"The frame shape {field.shape} differs from {self.shape}.")
+        if self.i == self.header["capacity"]:
+            self._grow()
+        self.frames[self.i] = field
+        self.timesteps[self.i] = timestep
+        self.i += 1
+        self.header["count"] = self.i
+        self.header["attrs"]["modified"] = datetime.now().isoformat()
+        self.frames.flush()
+        self.timesteps.flush()
+        self._write_header()
+
+    def append(self, field: NDArray, timestep: int = None) -> None:
+        if timestep is None:
+            timestep = self.i
+        count("io.bytes_written", field.size * self.dtype.itemsize)
+        with stage("io.append"):
+            self._store(field, timestep)
+
+    def set_attr(self, key, value) -> None:
+        self.header["attrs"][key] = _jsonable(value)
+        self._write_header()
+
+    def del_attr(self, key) -> None:
+        if self.header["attrs"].pop(key, None) is not None:
+            self._write_header()
+
+
+class MemmapReader:
+    """
+    Zero-copy reader of a memory mapped frame store, compatible with :code:`HDF5Reader`.
+
+    Params:
+        filename: filepath of the frame store
+
+    The frames are read-only views of the mapped file, copy them (``np.array``)
+    to modify them or to keep them after the file is rewritten.
+
+    Usage:
+        df = MemmapReader('/tmp/run.mmap')
+        print(df.attrs)
+        field = df.get_field(32)
+        mean = df.fields[:, 64:128].mean(axis=(1, 2))
+
+        with MemmapReader('/tmp/run.mmap') as fields:
+            ...
+    """
+
+    def __init__(self, filename) -> None:
+        self.filename = filename
+        self.header = _read_header(filename)
+        frames, timesteps = _offsets(self.header)
+        n, shape = self.header["count"], tuple(self.header["shape"])
+        dtype = np.dtype(self.header["dtype"])
+        self.fields = np.memmap(filename, dtype, "r", frames, (self.header["capacity"],) + shape)[:n]
+        self.timesteps = np.memmap(filename, np.int64, "r", timesteps, (self.header["capacity"],))[:n]
+        self.attrs = dict(self.header["attrs"], timesteps=np.asarray(self.timesteps))
+
+    def __len__(self) -> int:
+        return len(self.fields)
+
+    def get_field(self, timestep, resolution=None) -> NDArray:
+        """
+        Returns the frame(s), with a `resolution` block means by the largest power
+        of two leaving at least `resolution` cells along the larger side.
+        """
+        with stage("io.read"):
+            if resolution is None:
+                return self.fields[timestep]
+            factor = 1
+            while max(self.fields.shape[1:]) // (2 * factor) >= resolution:
+                factor *= 2
+            return block_mean(self.fields[timestep], factor)
+
+    def __enter__(self) -> np.memmap:
+        return self.fields
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        return False
+
+
+def hdf5_to_memmap(source, destination, batch: int = 16) -> MemmapReader:
+    """
+    Convert a :code:`HDF5Writer` file (any codec) to a frame store.
+    """
+    from microtex.storage import HDF5Reader
+
+    reader = HDF5Reader(source)
+    skip = ("timesteps", "codec", "codec_params")
+    attrs = Attributes((key, value) for key, value in reader.attrs.items() if key not in skip)
+    timesteps = np.asarray(reader.attrs["timesteps"])
+    writer = None
+    for start in range(0, len(timesteps), batch):
+        for n, frame in enumerate(reader.get_field(slice(start, start + batch)), start=start):
+            if writer is None:
+                capacity = len(timesteps)
+                writer = MemmapWriter(destination, frame, attrs, frame.dtype, capacity, int(timesteps[n]))
+            else:
+                writer.append(frame, int(timesteps[n]))
+    return MemmapReader(destination)
+
+
+def memmap_to_hdf5(source, destination, **kwargs):
+    """
+    Convert a frame store to a :code:`HDF5Writer` file, `kwargs` are passed to the writer
+    (e.g. dtype, compression, codec).
+    """
+    from microtex.storage import HDF5Reader, HDF5Writer
+
+    reader = MemmapReader(source)
+    attrs = Attributes((key, value) for key, value in reader.header["attrs"].items())
+    kwargs.setdefault("dtype", reader.fields.dtype)
+    writer = HDF5Writer(destination, reader.fields[0], attrs, **kwargs)
+    for n in range(1, len(reader)):
+        writer.append(reader.fields[n], int(reader.timesteps[n]))
+    writer.set_attr("timesteps", np.asarray(reader.timesteps))
+    for key in ("created", "modified"):
+        if key in attrs:
+            writer.set_attr(key, attrs[key])
+    return HDF5Reader(destination)
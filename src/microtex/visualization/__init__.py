@@ -1,22 +1,64 @@
 # -*- coding: utf-8 -*-
 
-import matplotlib.animation as animation
-import matplotlib.cm as cm
-import matplotlib.pyplot as plt
-from matplotlib.colors import Normalize
-from mpl_toolkits.axes_grid1 import make_axes_locatable
+"""
+Plotting helpers. Matplotlib is imported by the functions on first call.
+"""
 
 from microtex.storage import HDF5Reader  # used by `plot_field_grid()``
+from microtex.visualization._colormaps import apply_lut as apply_lut
+from microtex.visualization._colormaps import colormap_lut as colormap_lut
+from microtex.visualization._colormaps import to_rgb as to_rgb
+from microtex.visualization._movie import export_movie as export_movie
+from microtex.visualization._movie import write_movie as write_movie
+from microtex.numerics.resampling import block_mean as block_mean
+from microtex.visualization._raster import encode_png as encode_png
+from microtex.visualization._raster import montage as montage
+from microtex.visualization._raster import render_field as render_field
+from microtex.visualization._raster import save_field_grid as save_field_grid
+from microtex.visualization._raster import save_png as save_png
+from microtex.visualization._raster import value_range as value_range
+
+__all__ = tuple(
+    [
+        "plot_field_2d",
+        "plot_field_grid",
+        "plot_density_vs_free_energy",
+        "make_animation",
+        "export_movie",
+        "write_movie",
+        "colormap_lut",
+        "apply_lut",
+        "to_rgb",
+        "render_field",
+        "block_mean",
+        "value_range",
+        "montage",
+        "encode_png",
+        "save_png",
+        "save_field_grid",
+    ]
+)
 
-__all__ = tuple(["plot_field_2d", "plot_field_grid", "lot_density_vs_free_energy"])
+# Fields with more cells are drawn as one raster image instead of a quad per cell.
+RASTER_THRESHOLD = 512 * 512
 
 
 def plot_field_2d(data, size=(10, 10), colors="bwr", minmax=(0, 1)):
+    import matplotlib.pyplot as plt
+
     fig, axs = plt.subplots(figsize=size)
     # figsize=size, constrained_layout=True
-    psm = axs.pcolormesh(
-        data, cmap=colors, rasterized=True, vmin=minmax[0], vmax=minmax[1]
-    )
+    if data.size > RASTER_THRESHOLD:
+        import matplotlib.cm as cm
+        from matplotlib.colors import Normalize
+
+        image = render_field(data, colors, minmax, max_size=2048, origin="lower")
+        axs.imshow(image, extent=(0, data.shape[1], 0, data.shape[0]), interpolation="nearest")
+        psm = cm.ScalarMappable(norm=Normalize(*minmax), cmap=colors)
+    else:
+        psm = axs.pcolormesh(
+            data, cmap=colors, rasterized=True, vmin=minmax[0], vmax=minmax[1]
+        )
     fig.colorbar(psm, ax=axs)
     plt.show()
 
@@ -39,41 +81,44 @@ def plot_density_vs_free_energy(c0, T0, omega, **kwargs):
     plt.show()
 
 
-def make_animation(frames, frame_count, heigh, width):
-    # Create an animation from the given frames.
-
-    figure = mp.figure()
-
-    mp.title("LIFE", y=1.02, fontsize=12)
-
-    frames_ = [
-        [mp.imshow(frame, cmap="gray", interpolation="nearest", animated=True)]
-        for frame in frames
-    ]
-
-    movie = mpa.ArtistAnimation(figure, frames_, blit=True, repeat=True)
-
-    movie.save(f"LIFE_frames({frame_count})_size({height},{width}).mp4", fps=25)
-
-    mp.show()
+def make_animation(frames, frame_count, height, width, filename=None, fps=25, cmap="gray", **kwargs):
+    """
+    Create a movie from the given frames, the frames are streamed to the encoder
+    (see :code:`write_movie` for the keyword arguments).
+    """
+    if filename is None:
+        filename = f"LIFE_frames({frame_count})_size({height},{width}).mp4"
+    return write_movie(frames, filename, fps=fps, cmap=cmap, **kwargs)
 
 
-def plot_field_grid(h5file, steps, nrows=2, ncols=2, filename=None, cmap='viridis', **kwargs):
+def plot_field_grid(h5file, steps, nrows=2, ncols=2, filename=None, cmap='viridis', resolution=None, **kwargs):
     """
     Plot 2x2 grid of fields with common colorbar.
+
+    With a `resolution` the fields are read from the nearest stored pyramid
+    level, see :code:`HDF5Reader.get_field`.
+
+    Large fields are rendered with :code:`render_field`, see :code:`save_field_grid`
+    for exports without matplotlib.
     """
+    import matplotlib.cm as cm
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import Normalize
+
     assert len(steps) == nrows * ncols, 'Number of steps must equal to number of axes.'
     normalizer = Normalize(0, 1)
-    im = cm.ScalarMappable(norm=normalizer)
+    im = cm.ScalarMappable(norm=normalizer, cmap=cmap)
     fig, axes = plt.subplots(nrows=nrows, ncols=ncols, **kwargs)
 
-    with HDF5Reader(h5file) as df:
-        dset = df["fields"]
-        attrs = dict(dset.attrs)
-        for ax, step in zip(axes.flat, steps):
-            ax.imshow(dset[step], cmap=cm.get_cmap(cmap), norm=normalizer)
-            ax.set_title(f'Time: {attrs["timesteps"][step]}')
-            ax.set_axis_off()
+    df = HDF5Reader(h5file)
+    for ax, step in zip(axes.flat, steps):
+        field = df.get_field(step, resolution=resolution)
+        if field.size > RASTER_THRESHOLD:
+            ax.imshow(render_field(field, cmap, (0, 1), max_size=1024), interpolation="nearest")
+        else:
+            ax.imshow(field, cmap=cmap, norm=normalizer)
+        ax.set_title(f'Time: {df.attrs["timesteps"][step]}')
+        ax.set_axis_off()
 
     fig.colorbar(im, ax=axes.ravel().tolist())
     if filename is not None:
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+"""
+Colormap lookup tables mapping normalized values to 8-bit RGB.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Sequence
+
+import numpy as np
+from numpy.typing import NDArray
+
+__all__ = tuple(["colormap_lut", "apply_lut", "to_rgb"])
+
+
+# The 256 colours of matplotlib's viridis, 16 RGB triples per line.
+_VIRIDIS = bytes.fromhex(
+    "44015444025645045745055946075a46085c460a5d460b5e470d60470e61471063471164471365481467481668481769"
+    "48186a481a6c481b6d481c6e481d6f481f70482071482173482374482475482576482677482878482979472a7a472c7a"
+    "472d7b472e7c472f7d46307e46327e46337f463480453581453781453882443983443a83443b84433d84433e85423f85"
+    "4240864241864142874144874045884046883f47883f48893e49893e4a893e4c8a3d4d8a3d4e8a3c4f8a3c508b3b518b"
+    "3b528b3a538b3a548c39558c39568c38588c38598c375a8c375b8d365c8d365d8d355e8d355f8d34608d34618d33628d"
+    "33638d32648e32658e31668e31678e31688e30698e306a8e2f6b8e2f6c8e2e6d8e2e6e8e2e6f8e2d708e2d718e2c718e"
+    "2c728e2c738e2b748e2b758e2a768e2a778e2a788e29798e297a8e297b8e287c8e287d8e277e8e277f8e27808e26818e"
+    "26828e26828e25838e25848e25858e24868e24878e23888e23898e238a8d228b8d228c8d228d8d218e8d218f8d21908d"
+    "21918c20928c20928c20938c1f948c1f958b1f968b1f978b1f988b1f998a1f9a8a1e9b8a1e9c891e9d891f9e891f9f88"
+    "1fa0881fa1881fa1871fa28720a38620a48621a58521a68522a78522a88423a98324aa8325ab8225ac8226ad8127ad81"
+    "28ae8029af7f2ab07f2cb17e2db27d2eb37c2fb47c31b57b32b67a34b67935b77937b87838b9773aba763bbb753dbc74"
+    "3fbc7340bd7242be7144bf7046c06f48c16e4ac16d4cc26c4ec36b50c46a52c56954c56856c66758c7655ac8645cc863"
+    "5ec96260ca6063cb5f65cb5e67cc5c69cd5b6ccd5a6ece5870cf5773d05675d05477d1537ad1517cd2507fd34e81d34d"
+    "84d44b86d54989d5488bd6468ed64590d74393d74195d84098d83e9bd93c9dd93ba0da39a2da37a5db36a8db34aadc32"
+    "addc30b0dd2fb2dd2db5de2bb8de29bade28bddf26c0df25c2df23c5e021c8e020cae11fcde11dd0e11cd2e21bd5e21a"
+    "d8e219dae319dde318dfe318e2e418e5e419e7e419eae51aece51befe51cf1e51df4e61ef6e620f8e621fbe723fde725"
+)
+
+# The colormaps available without matplotlib, interpolated linearly between their colours.
+_TABLES = {
+    "gray": [(0, 0, 0), (255, 255, 255)],
+    "bwr": [(0, 0, 255), (255, 255, 255), (255, 0, 0)],
+    "viridis": np.frombuffer(_VIRIDIS, np.uint8).reshape(256, 3),
+}
+
+
+@lru_cache(maxsize=32)
+def colormap_lut(name: str = "viridis", n: int = 256) -> NDArray:
+    """
+    Returns the ``(n, 3)`` uint8 lookup table of a colormap.
+
+    'gray', 'bwr' and 'viridis' are built in (as in matplotlib), the other
+    colormaps are taken from matplotlib, which is imported only for them.
+    The table is read-only and cached.
+    """
+    if name in _TABLES:
+        colours = np.asarray(_TABLES[name], dtype=np.float64)
+        x = np.linspace(0.0, 1.0, len(colours))
+        t = np.linspace(0.0, 1.0, n)
+        lut = np.stack([np.interp(t, x, colours[:, k]) for k in range(3)], axis=1)
+    else:
+        try:
+            import matplotlib
+        except ImportError:
+            raise ValueError(f"Colormap '{name}' needs matplotlib, choose one of {sorted(_TABLES)}.") from None
+        lut = matplotlib.colormaps[name](np.linspace(0.0, 1.0, n))[:, :3] * 255.0
+    lut = np.rint(lut).astype(np.uint8)
+    lut.flags.writeable = False
+    return lut
+
+
+def apply_lut(field: NDArray, lut: NDArray, vmin: float, vmax: float) -> NDArray:
+    """
+    Map the field values from ``[vmin, vmax]`` through the lookup table,
+    NaN (e.g. missing frames) gets the lowest colour.
+
+    :return: The ``(*field.shape, 3)`` uint8 RGB image.
+    """
+    n = len(lut)
+    scale = (n - 1) / (vmax - vmin) if vmax > vmin else 0.0
+    index = np.asarray(field, dtype=np.float32) - np.float32(vmin)
+    index *= np.float32(scale)
+    np.nan_to_num(index, copy=False, nan=0.0)
+    np.clip(index, 0, n - 1, out=index)
+    index += np.float32(0.5)
+    return np.take(lut, index.astype(np.intp), axis=0)
+
+
+def to_rgb(field: NDArray, cmap: str = "viridis", minmax: Sequence[float] = (0.0, 1.0)) -> NDArray:
+    """
+    Returns the uint8 RGB image of the field coloured by the named colormap.
+    """
+    return apply_lut(field, colormap_lut(cmap), *minmax)
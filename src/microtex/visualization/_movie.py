@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+
+"""
+Streaming movie export of stored simulations.
+
+The frames are read from the store a chunk at a time, coloured through a
+colormap lookup table into uint8 RGB by a pool of worker threads, and written
+to an encoder: an ``ffmpeg`` process reading raw video from a pipe when
+ffmpeg is installed, or else a numbered image sequence. While the encoder
+writes one chunk the workers render the next, at most two chunks are held in
+memory whatever the length of the run.
+
+.. code-block::python
+
+    from microtex.visualization import export_movie
+
+    export_movie('run.h5', 'run.mp4', fps=30, cmap='viridis', scale=2)
+    export_movie('run.h5', 'frames/', encoder='images')   # image sequence
+"""
+
+from __future__ import annotations
+
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Sequence
+
+import numpy as np
+from numpy.typing import NDArray
+
+from microtex.profiling import stage
+from microtex.storage import open_reader
+from microtex.visualization._colormaps import apply_lut, colormap_lut
+from microtex.visualization._raster import save_png
+
+__all__ = tuple(["export_movie", "write_movie", "FFmpeg_Encoder", "Image_Sequence_Encoder"])
+
+
+class FFmpeg_Encoder:
+    """
+    Pipe raw RGB frames into an ffmpeg process (H.264 in yuv420p by default).
+    """
+
+    def __init__(self, filename, width: int, height: int, fps: float = 25, codec: str = "libx264", ffmpeg=None):
+        ffmpeg = ffmpeg or shutil.which("ffmpeg")
+        if ffmpeg is None:
+            raise RuntimeError("ffmpeg was not found.")
+        command = [
+            ffmpeg, "-loglevel", "error", "-y",
+            "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+            # yuv420p needs even dimensions
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+            "-c:v", codec, "-pix_fmt", "yuv420p", str(filename),
+        ]
+        self.filename = filename
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def write(self, image: NDArray) -> None:
+        try:
+            self.process.stdin.write(np.ascontiguousarray(image).tobytes())
+        except BrokenPipeError:
+            # ffmpeg exited early (e.g. unknown codec or unwritable path)
+            self.process.wait()
+            raise self._error() from None
+
+    def close(self) -> None:
+        self.process.stdin.close()
+        if self.process.wait() != 0:
+            raise self._error()
+
+    def _error(self) -> RuntimeError:
+        return RuntimeError(f"ffmpeg failed: {self.process.stderr.read().decode(errors='replace')}")
+
+
+class Image_Sequence_Encoder:
+    """
+    Write the frames as numbered PNG images ``frame_00000.png`` into a directory.
+    """
+
+    suffix = ".png"
+
+    def __init__(self, directory, width: int = None, height: int = None, fps: float = None):
+        self.filename = Path(directory)
+        self.filename.mkdir(parents=True, exist_ok=True)
+        self.i = 0
+
+    def write(self, image: NDArray) -> None:
+        save_png(self.filename / f"frame_{self.i:05d}{self.suffix}", image, level=1)
+        self.i += 1
+
+    def close(self) -> None:
+        pass
+
+
+def _encoder(filename, width, height, fps, encoder):
+    if encoder == "auto":
+        encoder = "ffmpeg" if shutil.which("ffmpeg") and Path(filename).suffix else "images"
+    if encoder == "ffmpeg":
+        return FFmpeg_Encoder(filename, width, height, fps)
+    if encoder == "images":
+        return Image_Sequence_Encoder(filename)
+    raise ValueError(f"Unknown encoder '{encoder}'.")
+
+
+def _chunks(frames: Iterable[NDArray], size: int):
+    chunk = []
+    for frame in frames:
+        chunk.append(frame)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_movie(
+    frames: Iterable[NDArray],
+    filename,
+    fps: float = 25,
+    cmap: str = "viridis",
+    minmax: Sequence[float] = (0.0, 1.0),
+    scale: int = 1,
+    encoder: str = "auto",
+    chunk: int = 16,
+    workers: int = None,
+):
+    """
+    Colour and encode an iterable of 2D frames, see :code:`export_movie`.
+
+    :return: The path of the movie or image directory.
+    """
+    lut = colormap_lut(cmap)
+    vmin, vmax = minmax
+
+    def render(frame):
+        image = apply_lut(frame, lut, vmin, vmax)
+        if scale > 1:
+            image = image.repeat(scale, axis=0).repeat(scale, axis=1)
+        return image
+
+    sink = None
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = None
+        for frames_chunk in _chunks(frames, chunk):
+            rendered = pool.map(render, frames_chunk)
+            if pending is not None:
+                sink = _write_chunk(pending, sink, filename, fps, encoder)
+            pending = rendered
+        if pending is not None:
+            sink = _write_chunk(pending, sink, filename, fps, encoder)
+    if sink is None:
+        raise ValueError("There are no frames to export.")
+    sink.close()
+    return sink.filename
+
+
+def _write_chunk(images, sink, filename, fps, encoder):
+    with stage("movie.encode"):
+        for image in images:
+            if sink is None:
+                sink = _encoder(filename, image.shape[1], image.shape[0], fps, encoder)
+            sink.write(image)
+    return sink
+
+
+def export_movie(
+    source,
+    filename,
+    fps: float = 25,
+    cmap: str = "viridis",
+    minmax: Sequence[float] = (0.0, 1.0),
+    frames: slice = slice(None),
+    scale: int = 1,
+    encoder: str = "auto",
+    chunk: int = 16,
+    workers: int = None,
+    resolution: int = None,
+):
+    """
+    Export the frames of a stored simulation as a movie with constant memory.
+
+    Params:
+        source: HDF5 file, ``.mmap`` frame store or a reader
+        filename: the movie file (e.g. 'run.mp4') or the image directory
+        fps: frames per second
+        cmap: colormap name
+        minmax: the values mapped to the ends of the colormap
+        frames: the exported frames (slice)
+        scale: integer upscaling of the frames (nearest neighbour)
+        encoder: 'ffmpeg', 'images' or 'auto' (ffmpeg if installed and `filename` has a suffix)
+        chunk: the number of frames read and rendered at once
+        workers: the number of rendering threads
+        resolution: read the pyramid level nearest to the resolution (see :code:`HDF5Reader.get_field`)
+
+    :return: The path of the movie or image directory.
+    """
+    reader = open_reader(source)
+    start, stop, step = frames.indices(len(reader.attrs["timesteps"]))
+
+    def read():
+        for first in range(start, stop, chunk * step):
+            with stage("movie.read"):
+                block = reader.get_field(slice(first, min(first + chunk * step, stop), step), resolution=resolution)
+            yield from block
+
+    return write_movie(read(), filename, fps, cmap, minmax, scale, encoder, chunk, workers)
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+
+"""
+Matplotlib-free raster rendering of fields to PNG.
+
+A field is normalized (fixed range, min/max or percentiles), optionally
+reduced by block means, coloured through a colormap lookup table and encoded
+as PNG with :code:`zlib` and :code:`struct`. No figure is created, a 2048x2048
+field downsampled to 512x512 is saved in about 0.1 s.
+
+.. code-block::python
+
+    from microtex.visualization import save_png, render_field, montage
+
+    save_png('field.png', render_field(field, cmap='viridis', percentile=1))
+    save_png('grid.png', montage([render_field(f) for f in fields], ncols=4))
+"""
+
+from __future__ import annotations
+
+import struct
+import zlib
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from microtex.numerics.resampling import block_mean
+from microtex.profiling import stage
+from microtex.visualization._colormaps import apply_lut, colormap_lut
+
+__all__ = tuple(
+    ["encode_png", "save_png", "value_range", "render_field", "montage", "save_field_grid"]
+)
+
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+def encode_png(image: NDArray, level: int = 6) -> bytes:
+    """
+    Encode a uint8 gray ``(h, w)``, RGB ``(h, w, 3)`` or RGBA ``(h, w, 4)`` image as PNG.
+
+    The rows use the 'up' filter (difference to the previous row), which
+    compresses smooth fields well.
+    """
+    image = np.asarray(image)
+    if image.dtype != np.uint8:
+        raise ValueError("The image must be uint8.")
+    if image.ndim == 2:
+        image = image[:, :, np.newaxis]
+    height, width, channels = image.shape
+    color = {1: 0, 3: 2, 4: 6}.get(channels)
+    if color is None:
+        raise ValueError(f"Unsupported number of channels {channels}.")
+    rows = image.reshape(height, width * channels)
+    filtered = np.empty((height, width * channels + 1), dtype=np.uint8)
+    filtered[:, 0] = 2
+    filtered[0, 1:] = rows[0]
+    np.subtract(rows[1:], rows[:-1], out=filtered[1:, 1:])
+    header = struct.pack(">IIBBBBB", width, height, 8, color, 0, 0, 0)
+    return b"".join(
+        [
+            b"\x89PNG\r\n\x1a\n",
+            _chunk(b"IHDR", header),
+            _chunk(b"IDAT", zlib.compress(filtered.tobytes(), level)),
+            _chunk(b"IEND", b""),
+        ]
+    )
+
+
+def save_png(path, image: NDArray, level: int = 6) -> None:
+    """
+    Write a uint8 image as PNG, see :code:`encode_png`.
+    """
+    with stage("render.png"):
+        data = encode_png(image, level)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def value_range(
+    field: NDArray, minmax: Optional[Sequence[float]] = None, percentile: Optional[float] = None
+) -> Tuple[float, float]:
+    """
+    Returns the normalization range ``(vmin, vmax)``: the given `minmax`, the
+    `percentile` and ``100 - percentile`` percentiles, or the minimum and maximum
+    (of the values which are not NaN).
+    """
+    if minmax is not None:
+        return float(minmax[0]), float(minmax[1])
+    if percentile is not None:
+        low, high = np.nanpercentile(field, [percentile, 100.0 - percentile])
+        return float(low), float(high)
+    return float(np.nanmin(field)), float(np.nanmax(field))
+
+
+def render_field(
+    field: NDArray,
+    cmap: str = "viridis",
+    minmax: Optional[Sequence[float]] = None,
+    percentile: Optional[float] = None,
+    downsample: int = 1,
+    max_size: Optional[int] = None,
+    origin: str = "upper",
+) -> NDArray:
+    """
+    Render a 2D field to a uint8 RGB image.
+
+    Params:
+        field: the 2D array
+        cmap: colormap name
+        minmax: fixed normalization range (default min/max of the field)
+        percentile: normalize between the percentiles instead of min/max (e.g. 1)
+        downsample: block-mean downsampling factor
+        max_size: downsample (at least) until both sides are at most `max_size`
+        origin: 'upper' puts row 0 at the top, 'lower' at the bottom (as :code:`pcolormesh`)
+    """
+    with stage("render.field"):
+        if max_size is not None:
+            downsample = max(downsample, -(-max(field.shape) // max_size))
+        field = block_mean(np.asarray(field), downsample)
+        vmin, vmax = value_range(field, minmax, percentile)
+        image = apply_lut(field, colormap_lut(cmap), vmin, vmax)
+        return image[::-1] if origin == "lower" else image
+
+
+def montage(images: Sequence[NDArray], ncols: int = None, pad: int = 2, background: int = 255) -> NDArray:
+    """
+    Arrange equally sized images in a grid, row by row.
+    """
+    images = [np.asarray(image) for image in images]
+    if not images:
+        raise ValueError("There are no images.")
+    ncols = ncols or int(np.ceil(np.sqrt(len(images))))
+    nrows = -(-len(images) // ncols)
+    h, w = images[0].shape[:2]
+    grid = np.full(
+        (nrows * h + (nrows + 1) * pad, ncols * w + (ncols + 1) * pad) + images[0].shape[2:],
+        background,
+        dtype=np.uint8,
+    )
+    for n, image in enumerate(images):
+        if image.shape != images[0].shape:
+            raise ValueError("The images must have the same shape.")
+        row, col = divmod(n, ncols)
+        y, x = pad + row * (h + pad), pad + col * (w + pad)
+        grid[y : y + h, x : x + w] = image
+    return grid
+
+
+def save_field_grid(
+    source,
+    steps: Sequence[int],
+    filename,
+    ncols: int = None,
+    cmap: str = "viridis",
+    minmax: Optional[Sequence[float]] = (0.0, 1.0),
+    percentile: Optional[float] = None,
+    downsample: int = 1,
+    max_size: Optional[int] = None,
+    resolution: Optional[int] = None,
+) -> NDArray:
+    """
+    Save a montage of the fields of a stored simulation (HDF5 file, ``.mmap``
+    frame store or reader) at `steps` as PNG, the NumPy-only counterpart of
+    :code:`plot_field_grid`. With a `resolution` the fields are read from the
+    pyramid level nearest to it, see :code:`HDF5Reader.get_field`.
+
+    :return: The montage image.
+    """
+    from microtex.storage import open_reader
+
+    reader = open_reader(source)
+    images = [
+        render_field(reader.get_field(step, resolution=resolution), cmap, minmax, percentile, downsample, max_size)
+        for step in steps
+    ]
+    grid = montage(images, ncols)
+    save_png(filename, grid)
+    return grid
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+from pathlib import Path
+
+import numpy as np
+
+
+def mass_and_energy(config):
+    from microtex.analysis import Domain_Analyser_2D
+
+    analyser = Domain_Analyser_2D(config)
+    return lambda frame: {"mass": analyser.calculate_mass(frame), "energy": analyser.calculate_free_energy(frame)}
+
+
+def test_map_reduce_resumes_from_checkpoints(tmp_path):
+    from microtex.analysis import map_reduce
+    from microtex.modeling.cahn_hilliard import Configuration
+    from microtex.storage import HDF5Writer, MemmapWriter
+
+    rng = np.random.default_rng(0)
+    frames = rng.uniform(0.3, 0.7, size=(3, 5, 8, 8))
+    for n, writer in enumerate((HDF5Writer, HDF5Writer, MemmapWriter)):
+        name = f"run{n}.mmap" if writer is MemmapWriter else f"run{n}.h5"
+        store = writer(tmp_path / name, frames[n, 0], Configuration(nx=8, ny=8, T=600 + 10 * (n == 1)))
+        for k in range(1, 5):
+            store.append(frames[n, k], timestep=10 * k)
+
+    output = tmp_path / "out" / "table.npz"
+    table = map_reduce(tmp_path, mass_and_energy, output, query=dict(T=600), frames=slice(1, None), chunk=3, workers=2,
+                       keep_parts=True)
+    assert [Path(name).name for name in table["path"]] == ["run0.h5"] * 4 + ["run2.mmap"] * 4
+    assert table["timestep"].tolist() == [10, 20, 30, 40] * 2
+    np.testing.assert_allclose(table["mass"][4:], frames[2, 1:].mean(axis=(1, 2)), rtol=1e-6)
+
+    # a lost checkpoint is recomputed, the others are reused
+    parts = sorted((output.parent / "table.npz.parts").iterdir())
+    assert len(parts) == 4
+    parts[0].unlink()
+    again = map_reduce(tmp_path, mass_and_energy, output, query=dict(T=600), frames=slice(1, None), chunk=3, workers=0)
+    with np.load(output) as stored:
+        for name in ("mass", "energy", "frame", "timestep"):
+            np.testing.assert_array_equal(stored[name], table[name])
+            np.testing.assert_array_equal(again[name], table[name])
+    assert not (output.parent / "table.npz.parts").exists()
+
+    # checkpoints are not reused at another resolution or after the run changed
+    from microtex.analysis import make_tasks
+
+    task = make_tasks([tmp_path / "run0.h5"], chunk=2)[0]
+    key = task.key(mass_and_energy)
+    assert key == task.key(mass_and_energy, None) != task.key(mass_and_energy, 4)
+    HDF5Writer.open(tmp_path / "run0.h5").append(frames[0, 0])
+    assert task.key(mass_and_energy) != key
+
+    # stale checkpoints of the changed run and files of crashed workers are removed
+    map_reduce(tmp_path, mass_and_energy, output, query=dict(T=600), chunk=3, workers=0, keep_parts=True)
+    HDF5Writer.open(tmp_path / "run0.h5").append(frames[0, 1])
+    (output.parent / "table.npz.parts" / "lost.npz.123.tmp.npz").write_bytes(b"")
+    table = map_reduce(tmp_path, mass_and_energy, output, query=dict(T=600), chunk=3, workers=0)
+    assert len(table["path"]) == 7 + 5
+    assert not (output.parent / "table.npz.parts").exists()
+
+
+def test_batched_length_estimators():
+    from microtex.analysis import FFT_Analyser_2D, characteristic_lengths, coarsening_exponent
+    from microtex.modeling.cahn_hilliard import Configuration
+
+    x = np.arange(64)
+    wavelengths = np.array([8.0, 16.0, 32.0])
+    frames = np.stack([0.5 + 0.1 * np.cos(2 * np.pi * x[:, None] / L) * np.cos(2 * np.pi * x[None, :] / L)
+                       for L in wavelengths])
+
+    analyser = FFT_Analyser_2D(Configuration(nx=64, ny=64))
+    analyser.analyze_domain(frames[1])
+    scales, spectra = analyser.analyze_frames(frames)
+    np.testing.assert_allclose(spectra[1], analyser.Abins)
+    np.testing.assert_allclose(scales, analyser.power_spectrum()[0])
+
+    # the checkerboard of period L has |k| = sqrt(2) / L and its autocorrelation vanishes at L / 4
+    lengths = characteristic_lengths(frames, spacing=2.0)
+    np.testing.assert_allclose(lengths["peak"], 2.0 * wavelengths / np.sqrt(2), rtol=0.1)
+    np.testing.assert_allclose(lengths["autocorrelation"], 2.0 * wavelengths / 4, rtol=0.1)
+
+    t = np.array([10.0, 100.0, 1e3, 1e4, 1e5])
+    fit = coarsening_exponent(t, np.stack([3 * t ** (1 / 3), 2 * t ** 0.25], axis=1))
+    np.testing.assert_allclose(fit["exponent"], [1 / 3, 0.25])
+    np.testing.assert_allclose(fit["prefactor"], [3.0, 2.0])
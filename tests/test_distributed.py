@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+
+def test_distributed_run_matches_serial(tmp_path):
+    from microtex.distributed import run_local
+    from microtex.modeling.cahn_hilliard import Cahn_Hilliard_2D_AB_Solver, Configuration
+    from microtex.storage import HDF5Reader
+
+    config = Configuration(nx=30, ny=16)
+    field = config.noisy_field()
+    serial = field.copy()
+    for _ in range(10):
+        serial = Cahn_Hilliard_2D_AB_Solver(serial, config)
+
+    result, _ = run_local(3, field, config, 10, filename=tmp_path / "run.h5", samples=[10])
+
+    np.testing.assert_array_equal(result, serial)
+    df = HDF5Reader(tmp_path / "run.h5")
+    assert list(df.attrs["timesteps"]) == [0, 10]
+    np.testing.assert_allclose(df.get_field(1), serial, rtol=1e-6)
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+
+import subprocess
+import sys
+
+
+def test_core_packages_do_not_import_heavy_dependencies():
+    code = (
+        "import sys, microtex.modeling.cahn_hilliard, microtex.storage, microtex.visualization;"
+        "print(' '.join(sys.modules))"
+    )
+    modules = set(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True).stdout.split())
+    assert "microtex.storage" in modules
+    assert not modules & {"h5py", "scipy", "matplotlib", "IPython", "tqdm"}
+
+
+def test_import_time_budget():
+    import importlib.util
+    from pathlib import Path
+
+    path = Path(__file__).parents[1] / "benchmarks" / "importtime.py"
+    spec = importlib.util.spec_from_file_location("importtime", path)
+    importtime = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(importtime)
+    # relative to numpy, the time of a slower or loaded machine scales alike
+    assert importtime.main(["--relative", "0.3"]) == 0
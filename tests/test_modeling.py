@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+
+def test_configuration_hash_and_digest():
+    from microtex.modeling import Configuration as AbstractConfiguration
+    from microtex.modeling import configuration_digest
+    from microtex.modeling.cahn_hilliard import Configuration
+
+    assert Configuration(nx=64) == Configuration(nx=64.0)
+    assert hash(Configuration(nx=64)) == hash(Configuration(nx=64.0))
+    assert Configuration(nx=64).digest == Configuration(nx=64.0).digest
+    assert Configuration(nx=64).digest != Configuration(nx=64, T=601).digest
+    # stable between runs
+    assert len(configuration_digest(Configuration())) == 64
+
+    class Ising_Configuration(AbstractConfiguration):
+        pass
+
+    a = Ising_Configuration("ising", J=1.0, neighbours=[1, 2])
+    b = Ising_Configuration("ising", J=1, neighbours=[1, 2])
+    assert a == b and hash(a) == hash(b) and {a: 1}[b] == 1
+    assert a != Ising_Configuration("ising", J=2.0, neighbours=[1, 2])
+    assert configuration_digest(Ising_Configuration("ising", T=600.5)) != configuration_digest(
+        Ising_Configuration("ising", T="600.5"))
+
+
+def test_plans_are_cached_and_shared():
+    from microtex.modeling.cahn_hilliard import Configuration, Cahn_Hilliard_2D_AB_Solver, get_plan
+
+    config = Configuration(nx=16, ny=16)
+    plan = get_plan(config)
+    assert get_plan(Configuration(nx=16, ny=16)) is plan
+    assert get_plan(config, (20, 16)) is not plan
+    assert plan.workspace()["mu"].shape == (16, 16)
+
+    field = config.noisy_field()
+    np.testing.assert_array_equal(Cahn_Hilliard_2D_AB_Solver(field, config), plan.step(field))
+
+
+def test_out_of_core_solver_matches_in_memory(tmp_path):
+    from microtex.modeling.cahn_hilliard import (
+        Cahn_Hilliard_2D_AB_Out_Of_Core_Solver,
+        Cahn_Hilliard_2D_AB_Solver,
+        Configuration,
+    )
+
+    config = Configuration(nx=23, ny=16)
+    field = config.noisy_field(rng=3)
+    solver = Cahn_Hilliard_2D_AB_Out_Of_Core_Solver(config, tmp_path, band_rows=5)
+    solver.initialize(field)
+    state = solver.run(4)
+    for _ in range(4):
+        field = Cahn_Hilliard_2D_AB_Solver(field, config)
+
+    np.testing.assert_array_equal(state, field)
+    assert solver.steps_done == 4 and not state.flags.writeable
+    np.testing.assert_array_equal(np.load(solver.files[0], mmap_mode="r"), field)
+
+
+def test_allen_cahn_solver_relaxes_to_regular_solution_phases():
+    from microtex.analysis import Domain_Analyser_2D
+    from microtex.modeling.allen_cahn import Allen_Cahn_2D_Model, Allen_Cahn_2D_Solver, Configuration
+
+    config = Configuration(nx=32, ny=32)
+    model = Allen_Cahn_2D_Model(domain=config.noisy_field(0.1, rng=3), solver=Allen_Cahn_2D_Solver, c=config)
+    *_, state = model.solve(2000)
+    # not conserved: both phases reach the binodal compositions of omega / RT = 3.2
+    assert state.min() < 0.06 and state.max() > 0.94
+    assert Domain_Analyser_2D(config).calculate_energy(state) < 2000
+
+
+def test_multicomponent_step_matches_conservative_reference():
+    from microtex.modeling.cahn_hilliard import Cahn_Hilliard_2D_Multicomponent_Solver, Multicomponent_Configuration
+    from microtex.quantities import R
+
+    config = Multicomponent_Configuration(nx=12, ny=10, dy=3.0e-9, Q=(240000.0, 235000.0, 245000.0))
+    field = config.noisy_field(0.1, rng=4)
+    assert field.shape == (3, 12, 10) and field.flags.c_contiguous
+
+    RT, h = R * config.T, (config.dy, config.dx)
+    laplacian = lambda a: sum((np.roll(a, 1, n) + np.roll(a, -1, n) - 2 * a) / h[n] ** 2 for n in (0, 1))
+    omega = np.asarray(config.omega)
+    mu = np.stack(
+        [RT * np.log(field[a]) + np.tensordot(omega[a], field, 1) - config.kappa[a] * laplacian(field[a]) for a in range(3)]
+    )
+    x = config.D[:, None, None] * field
+    M = (np.eye(3)[:, :, None, None] * x[:, None] - x[:, None] * x[None, :] / x.sum(axis=0)) / RT
+    rate = sum(
+        np.einsum("abij,bij->aij", 0.5 * (M + np.roll(M, s, n + 2)), np.roll(mu, s, n + 1) - mu) / h[n] ** 2
+        for n in (0, 1)
+        for s in (1, -1)
+    )
+    expected = field + config.dt * rate
+    result = Cahn_Hilliard_2D_Multicomponent_Solver(field, config)
+    np.testing.assert_allclose(result - field, expected - field, rtol=1e-9, atol=1e-12 * np.abs(rate).max() * config.dt)
+
+    # the loop template runs as plain Python too, its helpers are module level functions
+    from microtex.modeling.cahn_hilliard import _multicomponent
+
+    plan = _multicomponent.Cahn_Hilliard_2D_Multicomponent_Plan(config, dtype=np.float64)
+    out = np.empty_like(field)
+    _multicomponent._step_2d(field, mu, out, plan.h2, plan.mobility, plan.D, plan.RT, True, plan.dt)
+    np.testing.assert_allclose(out - field, expected - field, rtol=1e-9, atol=1e-12 * np.abs(rate).max() * config.dt)
+
+
+def test_multicomponent_model_separates_three_conserved_phases():
+    from microtex.modeling.cahn_hilliard import (
+        Cahn_Hilliard_2D_Multicomponent_Model,
+        Cahn_Hilliard_2D_Multicomponent_Solver,
+        Multicomponent_Configuration,
+    )
+
+    w = 22000.0
+    with pytest.raises(ValueError):
+        Multicomponent_Configuration(omega=[[0, w, w], [w, 0, w], [w, 0, 0]])
+
+    config = Multicomponent_Configuration(nx=48, ny=48, omega=[[0, w, w], [w, 0, w], [w, w, 0]], precision="float32")
+    field = config.noisy_field(rng=5)
+    model = Cahn_Hilliard_2D_Multicomponent_Model(domain=field, solver=Cahn_Hilliard_2D_Multicomponent_Solver, c=config)
+    *_, state = model.solve(3000)
+    assert state.dtype == np.float32
+    mean = lambda a: a.mean(axis=(1, 2), dtype=np.float64)
+    np.testing.assert_allclose(mean(state), mean(field), atol=1e-5)
+    np.testing.assert_allclose(state.sum(axis=0), 1.0, atol=1e-5)
+    # every component is enriched somewhere beyond 0.9
+    assert np.all(state.max(axis=(1, 2)) > 0.9)
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+
+def test_periodic_laplacian_matches_stencil():
+    from microtex.numerics.operators import biharmonic_2d, laplacian_2d
+
+    field = np.random.rand(6, 5)
+    dx, dy = 0.3, 0.7
+    expected = (
+        (np.roll(field, -1, axis=1) - 2 * field + np.roll(field, 1, axis=1)) / dx**2
+        + (np.roll(field, -1, axis=0) - 2 * field + np.roll(field, 1, axis=0)) / dy**2
+    )
+    L = laplacian_2d(6, 5, dx, dy)
+    np.testing.assert_allclose(L @ field.ravel(), expected.ravel(), atol=1e-10)
+    assert laplacian_2d(6, 5, dx, dy) is L
+    assert biharmonic_2d(6, 5, dx, dy).shape == (30, 30)
+
+
+def test_implicit_solver_is_stable_for_large_time_step():
+    from microtex.modeling.cahn_hilliard import (
+        Cahn_Hilliard_2D_AB_Implicit_Solver,
+        Cahn_Hilliard_2D_AB_Solver,
+        Configuration,
+    )
+
+    config = Configuration(nx=32, ny=32, dt=1)
+    field = config.noisy_field()
+    explicit = Cahn_Hilliard_2D_AB_Solver(field, config)
+    implicit = Cahn_Hilliard_2D_AB_Implicit_Solver()(field, config)
+    np.testing.assert_allclose(implicit, explicit, atol=1e-6)
+
+    large = Configuration(nx=32, ny=32, dt=60000)
+    for method in ("lu", "cg"):
+        solver = Cahn_Hilliard_2D_AB_Implicit_Solver(method=method)
+        state = field
+        for _ in range(20):
+            state = solver(state, large)
+        assert np.all((state > 0) & (state < 1))
+
+
+def test_multigrid_converges_independently_of_grid_size():
+    from microtex.numerics.multigrid import Biharmonic_Multigrid_2D, Helmholtz_2D, Multigrid_2D
+
+    for n in (16, 64):
+        f = np.random.rand(n, n)
+        for cycle in ("V", "FAS"):
+            mg = Multigrid_2D(Helmholtz_2D(n, n, 1.0, 1.0, 1.0, 10.0), cycle=cycle)
+            u, report = mg.solve(f, tol=1e-10)
+            assert report.converged and report.convergence_factor < 0.2
+            np.testing.assert_allclose(mg.levels[0].apply(u), f, atol=1e-8)
+
+        # b^2 < 4a gives complex conjugate factors
+        mg = Biharmonic_Multigrid_2D(n, n, 1.0, 1.0, a=4.0, b=1.0)
+        u, report = mg.solve(f, tol=1e-10)
+        assert report.converged and u.dtype == np.float64
+        np.testing.assert_allclose(mg.apply(u), f, atol=1e-8)
+
+
+def test_multigrid_rejects_grids_that_do_not_coarsen():
+    from microtex.numerics.multigrid import Helmholtz_2D, Multigrid_2D
+
+    # 130 = 2 * 65: coarsening stops at a 65x65 level
+    with pytest.raises(ValueError, match="65x65"):
+        Multigrid_2D(Helmholtz_2D(130, 130, 1.0, 1.0, 1.0, 10.0))
+    mg = Multigrid_2D(Helmholtz_2D(130, 130, 1.0, 1.0, 1.0, 10.0), max_direct=65 * 65)
+    assert mg.levels[-1].shape == (65, 65)
+
+
+def test_implicit_solver_multigrid_matches_lu():
+    from microtex.modeling.cahn_hilliard import Cahn_Hilliard_2D_AB_Implicit_Solver, Configuration
+
+    config = Configuration(nx=32, ny=32, dt=6000)
+    field = config.noisy_field()
+    expected = Cahn_Hilliard_2D_AB_Implicit_Solver("lu")(field, config)
+    for method in ("multigrid", "mgcg"):
+        result = Cahn_Hilliard_2D_AB_Implicit_Solver(method)(field, config)
+        np.testing.assert_allclose(result, expected, atol=1e-9)
+
+
+def test_stencil_engine_matches_rolled_differences_in_1d_2d_3d():
+    from microtex.numerics.stencil import biharmonic, gradient_dot, laplacian
+
+    def rolled_laplacian(a, h):
+        return sum((np.roll(a, -1, n) - 2 * a + np.roll(a, 1, n)) / h[n] ** 2 for n in range(a.ndim))
+
+    rng = np.random.default_rng(0)
+    for shape in [(7,), (6, 5), (4, 5, 6)]:
+        a, b = rng.random(shape), rng.random(shape)
+        h = (0.3, 0.7, 1.1)[: len(shape)]
+        grad = sum(
+            (np.roll(a, -1, n) - np.roll(a, 1, n)) * (np.roll(b, -1, n) - np.roll(b, 1, n)) / (4 * h[n] ** 2)
+            for n in range(len(shape))
+        )
+        np.testing.assert_allclose(laplacian(a, spacing=h), rolled_laplacian(a, h), atol=1e-12)
+        np.testing.assert_allclose(gradient_dot(a, b, spacing=h), grad, atol=1e-12)
+        np.testing.assert_allclose(biharmonic(a, spacing=h), rolled_laplacian(rolled_laplacian(a, h), h), atol=1e-9)
+
+    single = rng.random((8, 8)).astype(np.float32)
+    out = np.empty_like(single)
+    assert laplacian(single, spacing=0.5, out=out) is out and out.dtype == np.float32
+    with pytest.raises(ValueError):
+        laplacian(single, out=single)
+    with pytest.raises(ValueError):
+        gradient_dot(single, out[::-1], out=out)
+
+
+def _halved_laplacian(value, lap, params):
+    return 0.5 * lap
+
+
+def test_stencil_kernels_are_loaded_from_the_disk_cache(tmp_path, monkeypatch):
+    from microtex.numerics.stencil import fused_laplacian, laplacian
+
+    monkeypatch.setenv("MICROTEX_KERNEL_CACHE", str(tmp_path))
+    field = np.random.rand(9)
+    first = fused_laplacian(_halved_laplacian)
+    np.testing.assert_allclose(first(field, spacing=0.5), 0.5 * laplacian(field, spacing=0.5))
+    assert len(list(tmp_path.glob("microtex_halved_laplacian_laplacian_1d_*.py"))) == 1
+
+    # a second kernel of the same source (as in another process) loads both precisions
+    stats = fused_laplacian(_halved_laplacian).loop(1).stats
+    assert sum(stats.cache_hits.values()) == 2 and not stats.cache_misses
+
+
+def test_stencil_kernels_without_cache_directory(tmp_path, monkeypatch):
+    from microtex.numerics import stencil
+
+    (tmp_path / "file").write_text("")
+    monkeypatch.setenv("MICROTEX_KERNEL_CACHE", str(tmp_path / "file" / "kernels"))
+    field = np.random.rand(3, 4)
+    kernel = stencil.fused_laplacian(_halved_laplacian)
+    np.testing.assert_allclose(kernel(field), 0.5 * stencil.laplacian(field))
+    # only the kernels of the models are compiled by warmup
+    assert kernel not in stencil._KERNELS and stencil.laplacian in stencil._KERNELS
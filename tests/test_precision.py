@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+
+def test_single_precision_is_kept_through_solver_and_analysis():
+    from microtex.analysis import FFT_Analyser_2D, validate_precision
+    from microtex.modeling.cahn_hilliard import Cahn_Hilliard_2D_AB_Solver, Configuration
+
+    config = Configuration(nx=32, ny=32, precision="float32")
+    field = Cahn_Hilliard_2D_AB_Solver(config.noisy_field(), config)
+    assert field.dtype == np.float32
+
+    analyser = FFT_Analyser_2D(config)
+    analyser.analyze_domain(field)
+    assert np.all(np.isfinite(analyser.Abins))
+
+    report = validate_precision(config, steps=20, samples=2)
+    assert report.steps == [10, 20]
+    assert max(report.rel_l2_error) < 1e-5
+    assert report.bytes_per_field["float32"] * 2 == report.bytes_per_field["float64"]
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+
+def test_profiler_records_solver_stages(tmp_path):
+    from microtex.modeling.cahn_hilliard import Cahn_Hilliard_2D_AB_Solver, Configuration
+    from microtex.profiling import Profiler, active_profiler, stage
+
+    config = Configuration(nx=32, ny=32)
+    field = config.noisy_field()
+    Cahn_Hilliard_2D_AB_Solver(field, config)
+    assert active_profiler() is None and stage("x") is stage("y")
+
+    with Profiler(track_allocations=True) as profiler:
+        for _ in range(3):
+            field = Cahn_Hilliard_2D_AB_Solver(field, config)
+
+    stats = profiler.stats()
+    assert stats["ch.step"]["calls"] == 3
+    assert stats["ch.step"]["self"] < stats["ch.step"]["total"]
+    assert stats["ch.flux"]["allocations"]["peak_bytes"] > 0
+    assert profiler.counters["cells"] == 3 * 32 * 32
+    assert profiler.cell_updates_per_second() > 0
+
+    profiler.to_chrome_trace(tmp_path / "trace.json")
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+    assert {"ch.step", "ch.flux"} <= {event["name"] for event in events}
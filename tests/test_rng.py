@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+
+def test_streams_are_reproducible_and_recorded(tmp_path):
+    from microtex.modeling.cahn_hilliard import Configuration
+    from microtex.rng import Random_Stream
+    from microtex.storage import HDF5Reader, HDF5Writer
+
+    config = Configuration(nx=8, ny=8)
+    replicas = Random_Stream().spawn(3)
+    fields = [config.noisy_field(rng=replica) for replica in replicas]
+    assert not np.array_equal(fields[0], fields[1])
+
+    HDF5Writer(tmp_path / "run.h5", fields[2], config, rng=replicas[2])
+    stream = Random_Stream.from_attrs(HDF5Reader(tmp_path / "run.h5").attrs)
+    assert stream.spawn_key == replicas[2].spawn_key
+    np.testing.assert_array_equal(config.noisy_field(rng=stream), fields[2])
+
+    # seeds and seeded generators are recorded as streams
+    for rng in (5, np.random.default_rng(5)):
+        HDF5Writer(tmp_path / "seeded.h5", fields[2], config, rng=rng)
+        stream = Random_Stream.from_attrs(HDF5Reader(tmp_path / "seeded.h5").attrs)
+        np.testing.assert_array_equal(stream.generator.random(3), np.random.default_rng(5).random(3))
+    with pytest.raises(TypeError):
+        HDF5Writer(tmp_path / "legacy.h5", fields[2], config, rng=np.random.RandomState(5))
+
+
+def test_kawasaki_conserves_magnetisation():
+    from microtex.modeling.ising_lattice._model import Ising_Lattice_2D_AB_Model
+
+    model = Ising_Lattice_2D_AB_Model(16, 2.0, "kawasaki", 1, (1.0, 4.0), 0, 1, rng=7)
+    magnetisation = model.state.sum()
+    for _ in range(5):
+        state = model.solve()
+    assert state.sum() == magnetisation
+    assert not np.array_equal(state, Ising_Lattice_2D_AB_Model(16, 2.0, "kawasaki", 1, (1.0, 4.0), 0, 1, rng=7).state)
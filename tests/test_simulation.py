@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+from uuid import uuid4
+
+import numpy as np
+
+
+def test_simulation_stops_early_and_records_reason():
+    from microtex.modeling.cahn_hilliard import (
+        Cahn_Hilliard_2D_AB_Model,
+        Cahn_Hilliard_2D_AB_Solver,
+        Configuration,
+    )
+    from microtex.simulation import L2_Change_Rate, Simulation
+
+    config = Configuration(nx=16, ny=16)
+    model = Cahn_Hilliard_2D_AB_Model(config.noisy_field(rng=0), Cahn_Hilliard_2D_AB_Solver, c=config)
+    # the change rate per step decays from 8.4e-5 (step 20) to 2.7e-5 (step 40) and 2.0e-5 (step 50)
+    simulation = Simulation(uuid4(), "ch", model, config, criteria=[L2_Change_Rate(2.2e-5, every=10)])
+    states = list(simulation.run(1000))
+    assert len(states) == simulation.steps_done == 50
+    assert simulation.stop_reason.startswith("L2 change rate")
+
+    simulation = Simulation(uuid4(), "ch", model, config)
+    list(simulation.run(5, stop_function=lambda step, state: False))
+    assert simulation.stop_reason == "step limit 5 reached"
+
+
+def test_change_rate_and_plateau_criteria():
+    from microtex.analysis import FFT_Analyser_2D
+    from microtex.modeling.cahn_hilliard import Configuration
+    from microtex.simulation import Energy_Plateau, L2_Change_Rate, Structure_Factor_Stagnation
+
+    # the field relaxes exponentially towards 1, the change rate halves every 10 steps
+    base = np.random.default_rng(0).uniform(size=(32, 32))
+    relaxing = lambda n: 1.0 + base * 0.5 ** (n / 10)
+    for sample in (None, 64):
+        criterion = L2_Change_Rate(1e-3, every=10, sample=sample)
+        stopped = next(n for n in range(1, 1000) if criterion.update(n, relaxing(n)))
+        assert 60 <= stopped <= 80 and criterion.rate < 1e-3
+    travelling = L2_Change_Rate(1e-3, every=10)
+    assert not any(travelling.update(n, np.sin(6 * base + 0.05 * n)) for n in range(1, 1000))
+
+    energy = Energy_Plateau(np.sum, rtol=1e-4, window=3, every=10)
+    stopped = next(n for n in range(1, 1000) if energy.update(n, relaxing(n)))
+    assert 120 <= stopped <= 160 and energy.reason.startswith("free energy")
+    decreasing = Energy_Plateau(np.sum, rtol=1e-4, window=3, every=10)
+    assert not any(decreasing.update(n, base - 0.01 * n) for n in range(1, 1000))
+
+    # cosine patterns of a fixed and of a coarsening wavelength
+    x = np.arange(64)
+    pattern = lambda L: 0.5 + 0.1 * np.cos(2 * np.pi * x[:, None] / L) * np.cos(2 * np.pi * x[None, :] / L)
+    analyser = FFT_Analyser_2D(Configuration(nx=64, ny=64))
+    fixed = Structure_Factor_Stagnation(analyser, window=3, every=1)
+    assert [fixed.update(n, pattern(16)) for n in range(1, 5)] == [False, False, False, True]
+    growing = Structure_Factor_Stagnation(analyser, window=3, every=1)
+    assert not any(growing.update(n, pattern(L)) for n, L in enumerate((4, 8, 16, 32, 64), 1))
+
+
+def test_autocorrelation_equilibration_of_stationary_series():
+    from microtex.simulation import Autocorrelation_Equilibration, integrated_autocorrelation_time
+
+    rng = np.random.default_rng(1)
+    assert integrated_autocorrelation_time(rng.normal(size=1000)) < 2.0
+
+    drifting = Autocorrelation_Equilibration(observable=float, window=100)
+    assert not any(drifting.update(n, float(n)) for n in range(1, 300))
+
+    stationary = Autocorrelation_Equilibration(observable=float, window=100)
+    assert any(stationary.update(n, x) for n, x in enumerate(rng.normal(size=300), 1))
+
+
+def test_snapshot_scheduler_policies():
+    from microtex.modeling import make_samples
+    from microtex.simulation import Change_Snapshots, Geometric_Snapshots, Interval_Snapshots, Snapshot_Scheduler
+
+    samples = make_samples(1, 100, 30)
+    assert samples == sorted(set(samples))
+
+    field = np.zeros((64, 64))
+    scheduler = Snapshot_Scheduler(Geometric_Snapshots(1, 100, 5), Interval_Snapshots(40))
+    assert [n for n in range(1, 101) if scheduler(n, field)] == sorted(make_samples(1, 100, 5) + [40, 80])
+    assert scheduler.steps == [1, 3, 10, 32, 40, 80, 100]
+
+    scheduler = Snapshot_Scheduler(Change_Snapshots(0.1, sample=100), max_interval=50)
+    saved = [n for n in range(1, 101) if scheduler(n, np.full((64, 64), 0.03 * n if n < 30 else 0.9))]
+    assert saved == [5, 9, 13, 17, 21, 25, 29, 79]
+
+    # the reference is the initial state, a change in a single cell is seen
+    scheduler = Snapshot_Scheduler(Change_Snapshots(0.1))
+    scheduler.start(np.zeros((64, 64)))
+    assert scheduler(1, np.full((64, 64), 0.2))
+    spike = np.full((64, 64), 0.2)
+    spike[33, 17] = 1.0
+    assert not scheduler(2, np.full((64, 64), 0.2)) and scheduler(3, spike)
+
+
+def _run_job(config):
+    if config.T == 700:
+        raise RuntimeError("diverged")
+    return {"mass": config.c0}
+
+
+def test_job_queue_workers_leases_and_restart(tmp_path):
+    import multiprocessing as mp
+    import time
+
+    from microtex.modeling.cahn_hilliard import Configuration
+    from microtex.simulation import Job_Queue
+
+    queue = Job_Queue(tmp_path / "jobs.sqlite", lease=5, max_attempts=2)
+    configs = [Configuration(T=T, c0=c0) for T in (600, 700) for c0 in (0.3, 0.4, 0.5)]
+    queue.submit_many(configs)
+    assert queue.counts() == {"pending": 6, "running": 0, "done": 0, "failed": 0}
+
+    workers = [mp.Process(target=queue.work, args=(_run_job,)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert queue.counts() == {"pending": 0, "running": 0, "done": 3, "failed": 3}
+    assert sorted(r["mass"] for r in queue.results().values()) == [0.3, 0.4, 0.5]
+    assert "diverged" in next(iter(queue.errors().values()))
+
+    # a restarted campaign runs the new configurations only
+    queue.submit_many(configs + [Configuration(T=650)])
+    assert queue.state(Configuration(T=650)) == "pending" and queue.state(configs[0]) == "done"
+
+    # the job of a worker without heartbeats is leased again
+    short = Job_Queue(tmp_path / "jobs.sqlite", lease=0.05)
+    lost = short.acquire("a")
+    assert short.acquire("b") is None
+    time.sleep(0.1)
+    job = short.acquire("b")
+    assert job.digest == lost.digest and job.attempts == 2
+    assert not short.heartbeat(lost) and short.complete(job, 1)
+    assert short.acquire() is None
+
+
+def test_job_queue_fails_jobs_with_unserializable_results(tmp_path):
+    from microtex.modeling.cahn_hilliard import Configuration
+    from microtex.simulation import Job_Queue
+
+    queue = Job_Queue(tmp_path / "jobs.sqlite", max_attempts=1)
+    queue.submit_many([Configuration(T=600)])
+    assert queue.work(lambda config: {"field": np.zeros(2)}) == 1
+    assert queue.counts() == {"pending": 0, "running": 0, "done": 0, "failed": 1}
+    assert "JSON serializable" in next(iter(queue.errors().values()))
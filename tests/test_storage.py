@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize(
+    "codec, params, error",
+    [
+        (None, {}, 1e-7),
+        ("quantized", {}, 1e-5),
+        ("quantized", dict(bits=8, low=-1.0, high=1.0), 0.0),
+        ("delta", dict(keyframe=4, error=1e-3), 1.001e-3),
+    ],
+)
+def test_codecs_roundtrip(tmp_path, codec, params, error):
+    from microtex.modeling.cahn_hilliard import Configuration
+    from microtex.storage import HDF5Reader, HDF5Writer
+
+    config = Configuration(nx=16, ny=16)
+    rng = np.random.default_rng(0)
+    if params.get("low") == -1.0:
+        frames = rng.choice([-1.0, 1.0], size=(11, 16, 16))
+    else:
+        frames = np.cumsum(rng.uniform(-0.01, 0.01, size=(11, 16, 16)), axis=0) + 0.5
+
+    writer = HDF5Writer(tmp_path / "run.h5", frames[0], config, codec=codec, codec_params=params)
+    for frame in frames[1:]:
+        writer.append(frame)
+
+    reader = HDF5Reader(tmp_path / "run.h5")
+    for n in (7, 0, 10, -1, 5):
+        assert np.abs(reader.get_field(n) - frames[n]).max() <= error
+    assert np.abs(reader.get_field(slice(2, 11, 3)) - frames[2:11:3]).max() <= error
+
+
+def test_delta_codec_dtype_and_negative_steps(tmp_path):
+    from microtex.modeling.cahn_hilliard import Configuration
+    from microtex.storage import HDF5Reader, HDF5Writer
+
+    config = Configuration(nx=8, ny=8)
+    writer = HDF5Writer(tmp_path / "run.h5", np.zeros((8, 8)), config, codec="delta", codec_params=dict(keyframe=2),
+                        dtype=np.float64)
+    for n in range(1, 5):
+        writer.append(np.full((8, 8), n / 8))
+
+    reader = HDF5Reader(tmp_path / "run.h5")
+    assert reader.get_field(slice(1, None, 2)).dtype == np.float64
+    assert reader.get_field(slice(3, 3)).shape == (0, 8, 8)
+    with pytest.raises(ValueError):
+        reader.get_field(slice(None, None, -1))
+
+
+def test_reopen_keeps_raw_dtype(tmp_path):
+    from microtex.modeling.cahn_hilliard import Configuration
+    from microtex.storage import HDF5Reader, HDF5Writer
+
+    config = Configuration(nx=8, ny=8)
+    HDF5Writer(tmp_path / "run.h5", np.zeros((8, 8)), config, dtype=np.float64)
+    HDF5Writer.open(tmp_path / "run.h5").append(np.full((8, 8), 0.1))
+
+    reader = HDF5Reader(tmp_path / "run.h5")
+    assert reader.codec.dtype == np.float64
+    np.testing.assert_array_equal(reader.get_field(-1), np.full((8, 8), 0.1))
+
+
+def test_memmap_store_and_conversion(tmp_path):
+    from microtex.modeling.cahn_hilliard import Configuration
+    from microtex.storage import HDF5Reader, HDF5Writer, MemmapReader, MemmapWriter, hdf5_to_memmap, memmap_to_hdf5
+
+    config = Configuration(nx=8, ny=8)
+    frames = np.random.default_rng(0).uniform(size=(5, 8, 8)).astype(np.float32)
+    writer = MemmapWriter(tmp_path / "run.mmap", frames[0], config, capacity=2)
+    for n, frame in enumerate(frames[1:], 1):
+        writer.append(frame, timestep=10 * n)
+
+    reader = MemmapReader(tmp_path / "run.mmap")
+    assert isinstance(reader.get_field(3), np.memmap)
+    np.testing.assert_array_equal(reader.get_field(slice(None)), frames)
+    assert reader.attrs["timesteps"].tolist() == [0, 10, 20, 30, 40]
+    assert reader.attrs["nx"] == 8 and reader.attrs["precision"] == "float64"
+
+    memmap_to_hdf5(tmp_path / "run.mmap", tmp_path / "run.h5", codec="quantized")
+    h5 = HDF5Reader(tmp_path / "run.h5")
+    assert h5.attrs["timesteps"].tolist() == [0, 10, 20, 30, 40]
+    back = hdf5_to_memmap(tmp_path / "run.h5", tmp_path / "back.mmap", batch=2)
+    assert np.abs(back.get_field(slice(None)) - frames).max() < 1e-5
+    assert back.attrs["timesteps"].tolist() == [0, 10, 20, 30, 40]
+
+
+def test_pyramid_levels(tmp_path):
+    from microtex.modeling.cahn_hilliard import Configuration
+    from microtex.numerics.resampling import block_mean
+    from microtex.storage import HDF5Reader, HDF5Writer
+
+    config = Configuration(nx=32, ny=32)
+    frames = np.random.default_rng(0).uniform(size=(3, 32, 32))
+    writer = HDF5Writer(tmp_path / "run.h5", frames[0], config, pyramid=True, codec="quantized")
+    for frame in frames[1:]:
+        writer.append(frame)
+
+    reader = HDF5Reader(tmp_path / "run.h5")
+    assert reader.levels == (2, 4, 8)
+    assert reader.get_field(2, resolution=32).shape == (32, 32)
+    assert reader.get_field(2, resolution=10).shape == (16, 16)
+    assert reader.get_field(2, resolution=8).shape == (8, 8)
+    np.testing.assert_allclose(reader.get_field(1, resolution=4), block_mean(frames[1], 8), rtol=1e-6)
+    assert reader.get_field(slice(None), resolution=1).shape == (3, 4, 4)
+
+    # levels in the decoded dtype, factors up to the grid size
+    small = np.random.default_rng(1).uniform(size=(4, 4))
+    HDF5Writer(tmp_path / "small.h5", small, config, pyramid=True, dtype=np.float64)
+    reader = HDF5Reader(tmp_path / "small.h5")
+    assert reader.levels == (2, 4)
+    np.testing.assert_array_equal(reader.get_field(0, resolution=1), [[small.mean()]])
+    with pytest.raises(ValueError):
+        HDF5Writer(tmp_path / "small.h5", small, config, pyramid=(16,))
+
+
+@pytest.mark.parametrize("codec", [None, "delta"])
+def test_history_layout_queries(tmp_path, codec):
+    from microtex.modeling.cahn_hilliard import Configuration
+    from microtex.storage import HDF5Reader, HDF5Writer, rechunk_history
+
+    config = Configuration(nx=20, ny=12)
+    rng = np.random.default_rng(1)
+    frames = (np.cumsum(rng.uniform(-0.01, 0.01, size=(23, 20, 12)), axis=0) + 0.5).astype(np.float32)
+    params = dict(keyframe=4, error=1e-4) if codec else {}
+    writer = HDF5Writer(tmp_path / "run.h5", frames[0], config, codec=codec, codec_params=params,
+                        history=dict(tile=8, time_chunk=8))
+    for frame in frames[1:]:
+        writer.append(frame)
+
+    reader = HDF5Reader(tmp_path / "run.h5")
+    decoded = reader.get_field(slice(None))
+    # 16 frames are in the history, the 7 buffered ones are read from the fields
+    reads = reader.query_reads(3, 5)
+    assert reads["history"] < reads["fields"]
+    np.testing.assert_array_equal(reader.history(3, 5), decoded[:, 3, 5])
+    np.testing.assert_array_equal(reader.region(slice(2, 11), slice(None), slice(1, None, 3)), decoded[1::3, 2:11])
+
+    writer.flush()
+    np.testing.assert_array_equal(reader.history(-1, 0, slice(5, 20)), decoded[5:20, -1, 0])
+    rechunk_history(tmp_path / "run.h5", tile=4, time_chunk=16, memory=1024)
+    np.testing.assert_array_equal(reader.region(slice(8, 12), 7), decoded[:, 8:12, 7])
+    assert reader.query_reads(slice(None), slice(None), slice(0, 1))["history"] > reader.query_reads(
+        slice(None), slice(None), slice(0, 1))["fields"]
+
+
+def test_result_cache_prefix_resume_eviction_and_integrity(tmp_path):
+    from microtex.modeling.cahn_hilliard import Cahn_Hilliard_2D_AB_Solver, Configuration
+    from microtex.rng import Random_Stream
+    from microtex.storage import HDF5Reader, HDF5Writer, Result_Cache
+
+    config = Configuration(nx=8, ny=8)
+    stream = Random_Stream(5)
+    cache = Result_Cache(tmp_path / "cache", verify=True)
+    key = cache.key(config, Cahn_Hilliard_2D_AB_Solver, seed=stream, schedule=dict(every=2))
+    assert key == cache.key(Configuration(nx=8.0, ny=8), Cahn_Hilliard_2D_AB_Solver, Random_Stream(5), dict(every=2))
+    assert key != cache.key(config, Cahn_Hilliard_2D_AB_Solver, seed=Random_Stream(6), schedule=dict(every=2))
+    assert key == cache.key(config, Cahn_Hilliard_2D_AB_Solver, seed=5, schedule=dict(every=2))
+    with pytest.raises(ValueError):
+        cache.key(config, Cahn_Hilliard_2D_AB_Solver, seed=None)
+
+    calls = []
+
+    def run(prefix, filename):
+        calls.append(None if prefix is None else prefix.steps)
+        if prefix is None:
+            field, start = config.noisy_field(rng=Random_Stream(5)), 0
+            writer = HDF5Writer(filename, field, config, codec="delta", codec_params=dict(keyframe=3))
+        else:
+            reader = HDF5Reader(filename)
+            field, start = reader.get_field(-1).astype(np.float64), int(reader.attrs["timesteps"][-1])
+            writer = HDF5Writer.open(filename)
+        for step in range(start + 1, steps + 1):
+            field = Cahn_Hilliard_2D_AB_Solver(field, config)
+            if step % 2 == 0:
+                writer.append(field, timestep=step)
+
+    steps = 4
+    first = cache.get_or_run(key, 4, run)
+    steps = 8
+    second = cache.get_or_run(key, 8, run)
+    assert cache.get_or_run(key, 6, run).path == second.path
+    assert calls == [None, 4]
+    reader = HDF5Reader(second.path)
+    assert reader.attrs["timesteps"].tolist() == [0, 2, 4, 6, 8]
+    np.testing.assert_array_equal(reader.get_field(slice(0, 3)), HDF5Reader(first.path).get_field(slice(None)))
+
+    # a damaged result is dropped, the last used results are kept
+    with open(second.path, "r+b") as f:
+        f.seek(100)
+        f.write(b"damaged")
+    assert cache.lookup(key, 8).path == first.path
+    assert len(cache.entries()) == 1
+    cache.evict(max_bytes=0)
+    assert cache.entries() == [] and cache.lookup(key, 4) is None
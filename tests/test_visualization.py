@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+import struct
+import zlib
+
+import numpy as np
+
+
+def read_png(path):
+    """Decode the 8-bit RGB PNG files written by `save_png` (filter 'up' only)."""
+    data = path.read_bytes()
+    width, height = struct.unpack(">II", data[16:24])
+    idat, offset = b"", 8
+    while offset < len(data):
+        (length,) = struct.unpack(">I", data[offset : offset + 4])
+        if data[offset + 4 : offset + 8] == b"IDAT":
+            idat += data[offset + 8 : offset + 8 + length]
+        offset += length + 12
+    rows = np.frombuffer(zlib.decompress(idat), np.uint8).reshape(height, width * 3 + 1)
+    assert (rows[:, 0] == 2).all()
+    return np.cumsum(rows[:, 1:], axis=0, dtype=np.uint8).reshape(height, width, 3)
+
+
+def test_export_movie_streams_image_sequence(tmp_path):
+    from microtex.modeling.cahn_hilliard import Configuration
+    from microtex.storage import HDF5Writer
+    from microtex.visualization import colormap_lut, export_movie
+
+    config = Configuration(nx=6, ny=4)
+    writer = HDF5Writer(tmp_path / "run.h5", np.zeros((4, 6)), config)
+    for n in range(1, 10):
+        writer.append(np.full((4, 6), n / 9))
+
+    directory = export_movie(tmp_path / "run.h5", tmp_path / "frames", cmap="gray", frames=slice(1, None, 2), chunk=2, encoder="images")
+    images = sorted(directory.iterdir())
+    assert len(images) == 5
+    assert images[-1].read_bytes().startswith(b"\x89PNG")
+    # the last exported frame is 1.0, the top of the gray colormap
+    assert (read_png(images[-1]) == colormap_lut("gray")[-1]).all()
+
+
+def test_render_field_and_montage(tmp_path):
+    from microtex.visualization import block_mean, colormap_lut, montage, render_field, save_png
+
+    field = np.arange(16.0).reshape(4, 4)
+    np.testing.assert_array_equal(block_mean(field, 2), [[2.5, 4.5], [10.5, 12.5]])
+    image = render_field(field, cmap="gray", downsample=2)
+    assert image.shape == (2, 2, 3)
+    assert (image[0, 0] == colormap_lut("gray")[0]).all() and (image[1, 1] == colormap_lut("gray")[-1]).all()
+
+    grid = montage([image] * 3, ncols=2, pad=1)
+    assert grid.shape == (7, 7, 3)
+    save_png(tmp_path / "grid.png", grid)
+    np.testing.assert_array_equal(read_png(tmp_path / "grid.png"), grid)
+
+
+def test_builtin_colormaps_do_not_import_matplotlib():
+    import subprocess
+    import sys
+
+    code = (
+        "import sys, numpy as np; from microtex.visualization import render_field;"
+        "[render_field(np.zeros((4, 4)), cmap=cmap) for cmap in ('gray', 'bwr', 'viridis')];"
+        "print('matplotlib' in sys.modules)"
+    )
+    assert subprocess.run([sys.executable, "-c", code], capture_output=True, text=True).stdout.strip() == "False"
+
+
+def test_missing_values_get_the_lowest_colour():
+    from microtex.visualization import colormap_lut, render_field
+
+    field = np.array([[np.nan, 0.0], [0.5, 1.0]])
+    image = render_field(field, cmap="gray")
+    lut = colormap_lut("gray")
+    assert (image[0, 0] == lut[0]).all() and (image[1, 1] == lut[-1]).all()
+    assert (render_field(field, cmap="gray", percentile=1)[0, 0] == lut[0]).all()
+
+
+def test_ffmpeg_encoder_reports_an_early_exit(tmp_path):
+    import pytest
+
+    from microtex.visualization._movie import FFmpeg_Encoder
+
+    ffmpeg = tmp_path / "ffmpeg"
+    ffmpeg.write_text("#!/bin/sh\necho \"Unknown encoder 'nope'\" >&2\nexit 1\n")
+    ffmpeg.chmod(0o755)
+    sink = FFmpeg_Encoder(tmp_path / "run.mp4", 512, 512, codec="nope", ffmpeg=str(ffmpeg))
+    # larger than the pipe buffer, the write fails once ffmpeg has exited
+    with pytest.raises(RuntimeError, match="Unknown encoder 'nope'"):
+        sink.write(np.zeros((512, 512, 3), np.uint8))